@@ -0,0 +1,69 @@
+"""Compares the streaming manifest parser against the xmltodict path.
+
+Usage:
+    python -m benchmarks.bench_parse [--segments 10800] [--tracks 8] [--rounds 5]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import xmltodict
+
+from benchmarks import stand_in
+from seg_gen import manifest_parser
+
+
+def chunked(body, chunk_size=64 * 1024):
+    """Splits body into chunks like Transport.stream does."""
+
+    return [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+
+
+def measure(function, body, rounds):
+    """Returns (best seconds, peak bytes) of function(body)."""
+
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function(body)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    function(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, default=10800, help='segments per timeline')
+    parser.add_argument('--tracks', type=int, default=8, help='video bitrates and audio tracks')
+    parser.add_argument('--repeat-density', type=float, default=0.0)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    manifests = [
+        ('dash', stand_in.synthetic_mpd(
+            video_representations=args.tracks, audio_tracks=args.tracks,
+            segments=args.segments, repeat_density=args.repeat_density)),
+        ('smooth', stand_in.synthetic_smooth(
+            video_quality_levels=args.tracks, audio_tracks=args.tracks,
+            segments=args.segments, repeat_density=args.repeat_density)),
+        ]
+
+    print('{:<8} {:>10} {:<12} {:>10} {:>12}'.format(
+        'format', 'size', 'parser', 'seconds', 'peak MiB'))
+    for name, body in manifests:
+        for parser_name, function in [
+                ('xmltodict', xmltodict.parse),
+                ('streaming', lambda body: manifest_parser.parse_manifest(chunked(body)))]:
+            seconds, peak = measure(function, body, args.rounds)
+            print('{:<8} {:>10} {:<12} {:>10.4f} {:>12.2f}'.format(
+                name, len(body), parser_name, seconds, peak / 2**20))
+
+
+if __name__ == '__main__':
+    main()
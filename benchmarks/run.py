@@ -0,0 +1,300 @@
+"""Benchmarks every stage of the segment generation pipeline against local stand-ins.
+
+Stages:
+    listing -- IsmUrls against stand_in.StubS3Client
+    fetch -- manifest downloads from stand_in.StandInOrigin
+    parse -- streaming manifest parser on the downloaded bodies
+    expand -- timeline expansion into segment URLs
+    pipeline -- SegGen.get_format_segment_urls end to end
+    probe -- SegGen.probe_segments with HEAD and ranged GET requests
+
+The stand-in origin runs in the benchmark process, so network stages also
+measure its share of the GIL. Compare runs with the same arguments only.
+
+Usage:
+    python -m benchmarks.run [--isms 200] [--segments 1800] [--latency 0.005]
+                             [--stages listing,fetch]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import m3u8
+
+from benchmarks import stand_in
+import seg_gen
+from seg_gen import dash
+from seg_gen import hls_parser
+from seg_gen import manifest_parser
+from seg_gen import metrics
+from seg_gen import probe
+from seg_gen import s3_ism_urls
+from seg_gen import smooth
+from seg_gen import timeline
+from seg_gen import transport
+from seg_gen import workers
+
+STAGES = ('listing', 'fetch', 'parse', 'expand', 'pipeline', 'probe')
+# tracemalloc slows allocation heavy stages down several times, --no-memory disables it
+TRACE_MEMORY = True
+
+
+class Result():
+    """Measurements of one benchmark run."""
+
+    def __init__(self, name, items, unit, seconds, peak, latencies=None):
+        self.name = name
+        self.items = items
+        self.unit = unit
+        self.seconds = seconds
+        self.peak = peak
+        self.latencies = sorted(latencies or [])
+
+    def percentile(self, share):
+        if not self.latencies:
+            return None
+        return self.latencies[min(len(self.latencies) - 1, int(len(self.latencies) * share))]
+
+    def row(self):
+        p50 = self.percentile(0.5)
+        p99 = self.percentile(0.99)
+        return '{:<26} {:>10} {:<9} {:>9.3f} {:>12.0f} {:>9} {:>9} {:>9.2f}'.format(
+            self.name, self.items, self.unit, self.seconds,
+            self.items / self.seconds if self.seconds else 0,
+            '-' if p50 is None else '{:.2f}'.format(p50 * 1000),
+            '-' if p99 is None else '{:.2f}'.format(p99 * 1000),
+            self.peak / 2**20)
+
+
+def measure(name, unit, function):
+    """Runs function once and measures duration and, unless disabled, peak memory.
+
+    Arguments:
+        name {string} -- Name of the benchmark
+        unit {string} -- Unit of the items function returns
+        function {callable} -- Returns (number of items, list of latencies or None)
+
+    Returns:
+        Result -- Measurements
+    """
+
+    if TRACE_MEMORY:
+        tracemalloc.start()
+    start = time.perf_counter()
+    items, latencies = function()
+    seconds = time.perf_counter() - start
+    peak = 0
+    if TRACE_MEMORY:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return Result(name, items, unit, seconds, peak, latencies)
+
+
+def bench_listing(args):
+    keys = stand_in.synthetic_ism_keys(args.s3_keys, folders=args.s3_folders)
+    results = list()
+    for list_workers in sorted({1, args.workers}):
+        s3 = stand_in.StubS3Client(keys, latency=args.s3_latency)
+        ism_urls = s3_ism_urls.IsmUrls(s3_client=s3, list_workers=list_workers)
+
+        def run():
+            return sum(1 for _ in ism_urls.get_matching_s3_keys('bench')), None
+
+        results.append(measure('listing workers={}'.format(list_workers), 'keys', run))
+    return results
+
+
+def manifest_urls(origin, isms):
+    base_urls = ['{}vod/asset{:07d}.ism/'.format(origin.url, i) for i in range(isms)]
+    return [
+        ('mpd', [url + '.mpd' for url in base_urls]),
+        ('m3u8', [url + 'media-video=400000.m3u8' for url in base_urls]),
+        ('manifest', [url + 'manifest' for url in base_urls]),
+        ]
+
+
+def bench_fetch(args, origin):
+    results = list()
+    shared = transport.Transport(pool_size=max(10, args.workers))
+    for kind, urls in manifest_urls(origin, args.isms):
+        def fetch(url):
+            start = time.perf_counter()
+            content = shared.get_content(url)
+            return len(content), time.perf_counter() - start
+
+        def run():
+            fetched = workers.ordered_map(fetch, urls, workers=args.workers)
+            return len(fetched), [latency for _, latency in fetched]
+
+        results.append(measure('fetch {}'.format(kind), 'manifests', run))
+    return results
+
+
+def bench_parse(args, origin):
+    results = list()
+    for kind, body in [('mpd', origin.get_manifest('/a.ism/.mpd')),
+                       ('manifest', origin.get_manifest('/a.ism/manifest'))]:
+        def run():
+            segments = 0
+            for _ in range(args.rounds):
+                parsed = manifest_parser.parse_manifest([body])
+                segments += sum(len(track.runs) * len(track.representations)
+                                for track in parsed.tracks)
+            return segments, None
+
+        results.append(measure('parse {}'.format(kind), 'elements', run))
+
+    media = origin.get_manifest('/a.ism/media-video=400000.m3u8')
+
+    def run_m3u8():
+        segments = 0
+        for _ in range(args.rounds):
+            segments += len(m3u8.loads(media.decode('utf-8'), uri=origin.url).segments)
+        return segments, None
+
+    results.append(measure('parse m3u8', 'segments', run_m3u8))
+
+    def run_hls_parser():
+        segments = 0
+        for _ in range(args.rounds):
+            segments += len(hls_parser.parse_playlist([media], origin.url).segment_uris)
+        return segments, None
+
+    results.append(measure('parse m3u8 fast path', 'segments', run_hls_parser))
+    return results
+
+
+def bench_expand(args, origin):
+    results = list()
+    mpd = manifest_parser.parse_manifest([origin.get_manifest('/a.ism/.mpd')])
+    smooth_manifest = manifest_parser.parse_manifest([origin.get_manifest('/a.ism/manifest')])
+    base_url = origin.url + 'vod/a.ism/'
+
+    def run_dash():
+        segments = 0
+        for _ in range(args.rounds):
+            segments += len(timeline.expand_timelines(dash.Dash().get_mpd_timelines(base_url, mpd)))
+        return segments, None
+
+    def run_smooth():
+        segments = 0
+        for _ in range(args.rounds):
+            segments += len(timeline.expand_timelines(
+                smooth.Smooth().get_smooth_timelines(base_url, smooth_manifest)))
+        return segments, None
+
+    results.append(measure('expand dash all tracks', 'segments', run_dash))
+    results.append(measure('expand smooth all tracks', 'segments', run_smooth))
+    return results
+
+
+def bench_pipeline(args, origin):
+    collector = metrics.MetricsCollector() if args.stage_metrics else None
+    s3 = stand_in.StubS3Client(
+        stand_in.synthetic_ism_keys(args.isms, folders=args.s3_folders), latency=args.s3_latency)
+    generator = seg_gen.SegGen(
+        origin.url, bucket_name='bench', s3_client=s3, workers=args.workers,
+        list_workers=args.workers, metrics=collector)
+
+    def run():
+        return len(generator.get_format_segment_urls(hls=True, dash=True, smooth=True)), None
+
+    results = [measure('pipeline workers={}'.format(args.workers), 'segments', run)]
+    if collector is not None:
+        print(collector.format_summary())
+
+    single = seg_gen.SegGen(
+        origin.url, bucket_name='bench', s3_client=s3, workers=args.workers,
+        list_workers=args.workers, source_manifest='dash')
+
+    def run_single():
+        return len(single.get_format_segment_urls(hls=True, dash=True, smooth=True)), None
+
+    results.append(measure('pipeline source=dash', 'segments', run_single))
+
+    fan_out = seg_gen.SegGen(
+        [origin.url] + ['http://edge{}.example.com/'.format(i) for i in range(3)],
+        bucket_name='bench', s3_client=s3, workers=args.workers, list_workers=args.workers,
+        source_manifest='dash')
+
+    def run_fan_out():
+        return len(fan_out.get_format_segment_urls(hls=True, dash=True, smooth=True)), None
+
+    results.append(measure('pipeline endpoints=4', 'segments', run_fan_out))
+    return results
+
+
+def bench_probe(args, origin):
+    s3 = stand_in.StubS3Client(
+        stand_in.synthetic_ism_keys(args.isms, folders=args.s3_folders), latency=args.s3_latency)
+    generator = seg_gen.SegGen(
+        origin.url, bucket_name='bench', s3_client=s3, workers=args.workers,
+        list_workers=args.workers)
+    results = list()
+    for method, range_bytes in [('HEAD', None), ('GET', 1)]:
+        report = probe.ProbeReport()
+
+        def run():
+            generator.probe_segments(method=method, range_bytes=range_bytes,
+                                     probe_workers=args.workers, rate=args.probe_rate,
+                                     report=report, hls=True)
+            stats = report.by_format()['hls']
+            return stats.count, None
+
+        name = 'probe {}'.format(method if range_bytes is None else 'ranged ' + method)
+        results.append(measure(name, 'segments', run))
+        print(report.format_summary())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help='comma separated subset of ' + ','.join(STAGES))
+    parser.add_argument('--isms', type=int, default=200, help='isms fetched per stage')
+    parser.add_argument('--segments', type=int, default=1800, help='segments per timeline')
+    parser.add_argument('--tracks', type=int, default=5, help='video bitrates per manifest')
+    parser.add_argument('--audio-tracks', type=int, default=2)
+    parser.add_argument('--repeat-density', type=float, default=0.0,
+                        help='share of segments folded into @r runs')
+    parser.add_argument('--latency', type=float, default=0.005, help='origin latency in seconds')
+    parser.add_argument('--s3-keys', type=int, default=100000)
+    parser.add_argument('--s3-folders', type=int, default=50)
+    parser.add_argument('--s3-latency', type=float, default=0.02,
+                        help='latency of a list_objects_v2 page in seconds')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=3, help='repetitions of CPU bound stages')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='do not trace peak memory, for accurate timings')
+    parser.add_argument('--probe-rate', type=float, default=None,
+                        help='maximum probes per second of the probe stage')
+    parser.add_argument('--stage-metrics', action='store_true',
+                        help='print the per stage metrics of the pipeline run')
+    args = parser.parse_args()
+
+    global TRACE_MEMORY
+    TRACE_MEMORY = not args.no_memory
+    stages = args.stages.split(',')
+
+    print('{:<26} {:>10} {:<9} {:>9} {:>12} {:>9} {:>9} {:>9}'.format(
+        'benchmark', 'items', 'unit', 'seconds', 'items/s', 'p50 ms', 'p99 ms', 'peak MiB'))
+
+    if 'listing' in stages:
+        for result in bench_listing(args):
+            print(result.row())
+
+    with stand_in.StandInOrigin(segments=args.segments, tracks=args.tracks,
+                               audio_tracks=args.audio_tracks,
+                               repeat_density=args.repeat_density,
+                               latency=args.latency) as origin:
+        for stage, bench in [('fetch', bench_fetch), ('parse', bench_parse),
+                             ('expand', bench_expand), ('pipeline', bench_pipeline),
+                             ('probe', bench_probe)]:
+            if stage in stages:
+                for result in bench(args, origin):
+                    print(result.row())
+
+
+if __name__ == '__main__':
+    main()
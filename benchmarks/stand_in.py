@@ -0,0 +1,544 @@
+"""Local stand-ins and synthetic data to test and benchmark seg_gen without AWS and USO.
+Used by the benchmarks and by tests/, not part of the seg_gen package.
+"""
+
+import bisect
+import datetime
+import hashlib
+import http.server
+import logging
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+def _timeline_xml(tag, segments, duration, repeat_density, jitter=1):
+    """Builds S or c elements of a synthetic timeline.
+
+    Arguments:
+        tag {string} -- S for DASH, c for Smooth
+        segments {int} -- Number of segments of the timeline
+        duration {int} -- Duration of a segment
+        repeat_density {float} -- 1.0 compresses everything into one run,
+                                  0.0 writes one element per segment
+
+    Keyword Arguments:
+        jitter {int} -- Added to the duration of every second run (default: {1})
+
+    Returns:
+        list -- List of XML element strings
+    """
+
+    run_length = max(1, int(segments * repeat_density))
+    elements = list()
+    written = 0
+    start = 0
+    while written < segments:
+        count = min(run_length, segments - written)
+        # Alternate durations so neighbouring runs can not be merged
+        seg_duration = duration if len(elements) % 2 == 0 else duration + jitter
+        element = '<{} t="{}" d="{}"'.format(tag, start, seg_duration)
+        if count > 1:
+            element += ' r="{}"'.format(count - 1)
+        elements.append(element + '/>')
+        start += seg_duration * count
+        written += count
+    return elements
+
+
+def synthetic_mpd(video_representations=5, audio_tracks=2, segments=1800, repeat_density=0.0,
+                  duration=2000, timescale=1000):
+    """Builds a synthetic MPD in the layout USO uses.
+
+    Keyword Arguments:
+        video_representations {int} -- Number of video bitrates (default: {5})
+        audio_tracks {int} -- Number of audio AdaptationSets (default: {2})
+        segments {int} -- Segments per timeline (default: {1800})
+        repeat_density {float} -- Share of segments folded into @r runs, see
+                                  _timeline_xml (default: {0.0})
+        duration {int} -- Segment duration in timescale units (default: {2000})
+        timescale {int} -- Timescale of the timelines (default: {1000})
+
+    Returns:
+        bytes -- MPD XML
+    """
+
+    # Runs alternate by 1 ms, like the Smooth timeline, so both describe the same fragments
+    timeline = '\n'.join(_timeline_xml(
+        'S', segments, duration, repeat_density, jitter=max(1, timescale // 1000)))
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" '
+        'profiles="urn:mpeg:dash:profile:isoff-live:2011">',
+        '<Period id="1" start="PT0S">',
+        '<BaseURL>dash/</BaseURL>',
+        ]
+    for audio in range(audio_tracks):
+        parts.extend([
+            '<AdaptationSet id="{}" group="1" contentType="audio" lang="en" '
+            'mimeType="audio/mp4">'.format(audio + 1),
+            '<AudioChannelConfiguration '
+            'schemeIdUri="urn:mpeg:dash:23003:3:audio_channel_configuration:2011" value="2"/>',
+            '<Role schemeIdUri="urn:mpeg:dash:role:2011" value="main"/>',
+            '<SegmentTemplate timescale="{}" initialization="media-$RepresentationID$.dash" '
+            'media="media-$RepresentationID$-$Time$.dash">'.format(timescale),
+            '<SegmentTimeline>', timeline, '</SegmentTimeline>',
+            '</SegmentTemplate>',
+            '<Representation id="audio_{}=128000" bandwidth="128000" codecs="mp4a.40.2" '
+            'audioSamplingRate="48000"/>'.format(audio),
+            '</AdaptationSet>',
+            ])
+    parts.extend([
+        '<AdaptationSet id="{}" group="2" contentType="video" mimeType="video/mp4" '
+        'par="16:9" maxWidth="1920" maxHeight="1080">'.format(audio_tracks + 1),
+        '<Role schemeIdUri="urn:mpeg:dash:role:2011" value="main"/>',
+        '<SegmentTemplate timescale="{}" initialization="media-$RepresentationID$.dash" '
+        'media="media-$RepresentationID$-$Time$.dash">'.format(timescale),
+        '<SegmentTimeline>', timeline, '</SegmentTimeline>',
+        '</SegmentTemplate>',
+        ])
+    for rung in range(video_representations):
+        bitrate = 400000 * (rung + 1)
+        parts.append(
+            '<Representation id="video={0}" bandwidth="{0}" codecs="avc1.4D401F" '
+            'width="1280" height="720" scanType="progressive"/>'.format(bitrate))
+    parts.extend(['</AdaptationSet>', '</Period>', '</MPD>'])
+    return '\n'.join(parts).encode('utf-8')
+
+
+def synthetic_smooth(video_quality_levels=5, audio_tracks=2, segments=1800, repeat_density=0.0,
+                     duration=20000000):
+    """Builds a synthetic Smooth Streaming manifest in the layout USO uses.
+
+    Keyword Arguments:
+        video_quality_levels {int} -- Number of video bitrates (default: {5})
+        audio_tracks {int} -- Number of audio StreamIndexes (default: {2})
+        segments {int} -- Segments per timeline (default: {1800})
+        repeat_density {float} -- Share of segments folded into @r runs, see
+                                  _timeline_xml (default: {0.0})
+        duration {int} -- Fragment duration in 100ns units (default: {20000000})
+
+    Returns:
+        bytes -- Smooth manifest XML
+    """
+
+    timeline = '\n'.join(_timeline_xml('c', segments, duration, repeat_density, jitter=10000))
+    total = segments * duration
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<SmoothStreamingMedia MajorVersion="2" MinorVersion="2" TimeScale="10000000" '
+        'Duration="{}">'.format(total),
+        ]
+    for audio in range(audio_tracks):
+        parts.extend([
+            '<StreamIndex Type="audio" QualityLevels="1" TimeScale="10000000" Name="audio_{0}" '
+            'Chunks="{1}" Url="QualityLevels({{bitrate}})/Fragments(audio_{0}={{start time}})">'
+            .format(audio, segments),
+            '<QualityLevel Index="0" Bitrate="128000" CodecPrivateData="1190" SamplingRate="48000" '
+            'Channels="2" BitsPerSample="16" PacketSize="4" AudioTag="255" FourCC="AACL"/>',
+            timeline,
+            '</StreamIndex>',
+            ])
+    parts.append(
+        '<StreamIndex Type="video" QualityLevels="{0}" TimeScale="10000000" Name="video" '
+        'Chunks="{1}" Url="QualityLevels({{bitrate}})/Fragments(video={{start time}})" '
+        'MaxWidth="1920" MaxHeight="1080">'.format(video_quality_levels, segments))
+    for rung in range(video_quality_levels):
+        parts.append(
+            '<QualityLevel Index="{0}" Bitrate="{1}" FourCC="AVC1" MaxWidth="1280" '
+            'MaxHeight="720" CodecPrivateData="000000016764001FACD9405005BB011000000300100000'
+            '03032F1831963"/>'.format(rung, 400000 * (rung + 1)))
+    parts.extend([timeline, '</StreamIndex>', '</SmoothStreamingMedia>'])
+    return '\n'.join(parts).encode('utf-8')
+
+
+def synthetic_master_m3u8(video_variants=5, audio_tracks=2):
+    """Builds a synthetic HLS master playlist in the layout USO uses.
+
+    Keyword Arguments:
+        video_variants {int} -- Number of video variants (default: {5})
+        audio_tracks {int} -- Number of audio renditions (default: {2})
+
+    Returns:
+        bytes -- Master playlist
+    """
+
+    lines = ['#EXTM3U', '#EXT-X-VERSION:4', '## Created with Unified Streaming Platform',
+             '#EXT-X-INDEPENDENT-SEGMENTS']
+    for audio in range(audio_tracks):
+        lines.append(
+            '#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="audio-aacl-128",LANGUAGE="en",NAME="English {0}",'
+            'DEFAULT={1},AUTOSELECT=YES,CHANNELS="2",URI="media-audio_{0}=128000.m3u8"'
+            .format(audio, 'YES' if audio == 0 else 'NO'))
+    for rung in range(video_variants):
+        bitrate = 400000 * (rung + 1)
+        lines.append(
+            '#EXT-X-STREAM-INF:BANDWIDTH={},AVERAGE-BANDWIDTH={},CODECS="mp4a.40.2,avc1.4D401F",'
+            'RESOLUTION=1280x720,FRAME-RATE=25,AUDIO="audio-aacl-128",CLOSED-CAPTIONS=NONE'
+            .format(bitrate + 140000, bitrate + 130000))
+        lines.append('media-video={}.m3u8'.format(bitrate))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def synthetic_media_m3u8(name='media-video=400000', segments=1800, duration=2):
+    """Builds a synthetic HLS VOD media playlist in the layout USO uses.
+
+    Keyword Arguments:
+        name {string} -- Name of the rendition, segments are called name-N.ts
+                         (default: {'media-video=400000'})
+        segments {int} -- Number of segments (default: {1800})
+        duration {int} -- Segment duration in seconds (default: {2})
+
+    Returns:
+        bytes -- Media playlist
+    """
+
+    lines = ['#EXTM3U', '#EXT-X-VERSION:4', '## Created with Unified Streaming Platform',
+             '#EXT-X-PLAYLIST-TYPE:VOD', '#EXT-X-MEDIA-SEQUENCE:1', '#EXT-X-INDEPENDENT-SEGMENTS',
+             '#EXT-X-TARGETDURATION:{}'.format(duration)]
+    for number in range(1, segments + 1):
+        lines.append('#EXTINF:{}, no desc'.format(duration))
+        lines.append('{}-{}.ts'.format(name, number))
+    lines.append('#EXT-X-ENDLIST')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def synthetic_ism_keys(count, folders=10, extra_files=1):
+    """Builds S3 keys of a synthetic VOD library.
+
+    Arguments:
+        count {int} -- Number of .ism keys
+
+    Keyword Arguments:
+        folders {int} -- Number of top level folders the assets are spread over (default: {10})
+        extra_files {int} -- Number of non .ism keys (.ismv, .isma, ...) per asset (default: {1})
+
+    Returns:
+        list -- Sorted list of keys
+    """
+
+    keys = list()
+    for i in range(count):
+        asset = 'vod{:02d}/asset{:07d}/asset{:07d}'.format(i % folders, i, i)
+        keys.append(asset + '.ism')
+        for extra in range(extra_files):
+            keys.append(asset + '-{}.ismv'.format(extra))
+    return sorted(keys)
+
+
+class StubS3Client():
+    """In-memory stand-in for the list_objects_v2 call of a boto3 S3 client.
+    Supports Prefix, Delimiter, MaxKeys, StartAfter and ContinuationToken.
+    Example:
+
+    from benchmarks import stand_in
+    from seg_gen import s3_ism_urls
+    s3 = stand_in.StubS3Client(stand_in.synthetic_ism_keys(1000), latency=0.01)
+    ism_urls = s3_ism_urls.IsmUrls(s3_client=s3, list_workers=8)
+    keys = list(ism_urls.get_matching_s3_keys('bucket'))
+    """
+
+    def __init__(self, keys, latency=0.0):
+        """Init method
+
+        Arguments:
+            keys {list} -- Keys stored in the stub bucket
+
+        Keyword Arguments:
+            latency {float} -- Seconds every list_objects_v2 call sleeps (default: {0.0})
+        """
+
+        self.keys = sorted(keys)
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._last_modified = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def add_keys(self, keys):
+        """Adds keys to the stub bucket.
+
+        Arguments:
+            keys {list} -- Keys to add
+        """
+
+        with self._lock:
+            self.keys = sorted(set(self.keys).union(keys))
+
+    def _object(self, key):
+        return {
+            'Key': key,
+            'ETag': '"' + hashlib.md5(key.encode('utf-8')).hexdigest() + '"',
+            'LastModified': self._last_modified,
+            'Size': len(key),
+            'StorageClass': 'STANDARD',
+            }
+
+    def list_objects_v2(self, Bucket, Prefix='', Delimiter=None, MaxKeys=1000,
+                        ContinuationToken=None, StartAfter=None, **kwargs):
+        """Lists the keys of the stub bucket like S3 does.
+
+        Returns:
+            dict -- list_objects_v2 response
+        """
+
+        with self._lock:
+            self.calls += 1
+            keys = self.keys
+        if self.latency:
+            time.sleep(self.latency)
+
+        start_key = ContinuationToken or StartAfter or ''
+        position = bisect.bisect_right(keys, start_key) if start_key else 0
+        position = max(position, bisect.bisect_left(keys, Prefix))
+
+        contents = list()
+        common_prefixes = list()
+        last = None
+        truncated = False
+        while position < len(keys) and keys[position].startswith(Prefix):
+            if len(contents) + len(common_prefixes) >= MaxKeys:
+                truncated = True
+                break
+            key = keys[position]
+            cut = key.find(Delimiter, len(Prefix)) if Delimiter else -1
+            if cut >= 0:
+                common = key[:cut + len(Delimiter)]
+                common_prefixes.append({'Prefix': common})
+                # Skip all keys of the common prefix
+                position = bisect.bisect_left(keys, common + '\U0010ffff')
+                last = keys[position - 1]
+                continue
+            contents.append(self._object(key))
+            last = key
+            position += 1
+
+        response = {
+            'IsTruncated': truncated,
+            'Name': Bucket,
+            'Prefix': Prefix,
+            'MaxKeys': MaxKeys,
+            'KeyCount': len(contents) + len(common_prefixes),
+            }
+        if contents:
+            response['Contents'] = contents
+        if common_prefixes:
+            response['CommonPrefixes'] = common_prefixes
+        if Delimiter:
+            response['Delimiter'] = Delimiter
+        if truncated:
+            response['NextContinuationToken'] = last
+        return response
+
+
+class _StandInHandler(http.server.BaseHTTPRequestHandler):
+    """Request handler of StandInOrigin."""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, Nagle would delay small bodies
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def __send(self, status, body=b'', headers=None, send_body=True):
+        self.send_response(status)
+        for name, value in (headers or dict()).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body and body:
+            self.wfile.write(body)
+
+    def __handle(self, send_body):
+        origin = self.server.origin
+        origin.count_request(self.path)
+        if origin.latency:
+            time.sleep(origin.latency)
+
+        path = self.path.split('?', 1)[0]
+        body = origin.get_manifest(path)
+        if body is None:
+            if origin.is_missing(path):
+                self.__send(404, send_body=send_body)
+                return
+            body = origin.segment_body
+            content_range = None
+            byte_range = self.headers.get('Range')
+            if byte_range and byte_range.startswith('bytes='):
+                first, _, last = byte_range[6:].partition('-')
+                first = int(first or 0)
+                last = min(int(last) if last else len(body) - 1, len(body) - 1)
+                content_range = 'bytes {}-{}/{}'.format(first, last, len(body))
+                body = body[first:last + 1]
+            if content_range:
+                self.__send(206, body, {'Content-Range': content_range}, send_body)
+            else:
+                self.__send(200, body, {'Content-Type': 'video/mp4'}, send_body)
+            return
+
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if origin.etags and self.headers.get('If-None-Match') == etag:
+            self.__send(304, headers={'ETag': etag}, send_body=False)
+            return
+        headers = {'Content-Type': 'application/octet-stream'}
+        if origin.etags:
+            headers['ETag'] = etag
+        self.__send(200, body, headers, send_body)
+
+    def do_GET(self):
+        self.__handle(True)
+
+    def do_HEAD(self):
+        self.__handle(False)
+
+
+class _StandInServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class StandInOrigin():
+    """Local HTTP server that behaves like USO for every .ism path.
+    Serves synthetic .mpd, .m3u8 and Smooth manifests and small segment bodies,
+    with configurable manifest size, @r density and latency.
+    Example:
+
+    from benchmarks import stand_in
+    from seg_gen import SegGen
+    with stand_in.StandInOrigin(segments=3600, latency=0.005) as origin:
+        seg_gen = SegGen(origin.url, bucket_name='bucket',
+                         s3_client=stand_in.StubS3Client(stand_in.synthetic_ism_keys(100)))
+        segments = seg_gen.get_format_segment_urls(hls=True, dash=True, smooth=True)
+    """
+
+    def __init__(self, segments=1800, tracks=5, audio_tracks=2, repeat_density=0.0, latency=0.0,
+                 etags=True, segment_size=1024, missing_share=0.0):
+        """Init method
+
+        Keyword Arguments:
+            segments {int} -- Segments per timeline and playlist (default: {1800})
+            tracks {int} -- Number of video bitrates (default: {5})
+            audio_tracks {int} -- Number of audio tracks (default: {2})
+            repeat_density {float} -- Share of segments folded into @r runs (default: {0.0})
+            latency {float} -- Seconds every request sleeps before answering (default: {0.0})
+            etags {bool} -- Send ETags and answer If-None-Match with 304 (default: {True})
+            segment_size {int} -- Size of segment bodies in bytes (default: {1024})
+            missing_share {float} -- Share of segment paths answered with 404, the same
+                                     paths on every request (default: {0.0})
+        """
+
+        self.segments = segments
+        self.tracks = tracks
+        self.audio_tracks = audio_tracks
+        self.repeat_density = repeat_density
+        self.latency = latency
+        self.etags = etags
+        self.segment_body = b'\0' * segment_size
+        self.missing_share = missing_share
+        self.requests = dict()
+        self._lock = threading.Lock()
+        self._manifests = dict()
+        self._server = None
+        self._thread = None
+        self.url = None
+
+    def count_request(self, path):
+        """Counts a request by its type (mpd, m3u8, manifest or segment).
+
+        Arguments:
+            path {string} -- Requested path
+        """
+
+        if path.endswith('.mpd'):
+            kind = 'mpd'
+        elif path.endswith('.m3u8'):
+            kind = 'm3u8'
+        elif path.endswith('/manifest'):
+            kind = 'manifest'
+        else:
+            kind = 'segment'
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def is_missing(self, path):
+        """Returns whether the segment of path is answered with 404.
+
+        Arguments:
+            path {string} -- Requested path without query
+
+        Returns:
+            bool -- True for a stable missing_share of all segment paths
+        """
+
+        return (self.missing_share > 0 and
+                zlib.crc32(path.encode('utf-8')) % 10000 < self.missing_share * 10000)
+
+    def get_manifest(self, path):
+        """Returns the manifest body of path, built once per manifest type.
+
+        Arguments:
+            path {string} -- Requested path
+
+        Returns:
+            bytes -- Manifest body, None if path is a segment
+        """
+
+        if path.endswith('.ism/.mpd'):
+            key = 'mpd'
+        elif path.endswith('.ism/.m3u8'):
+            key = 'master'
+        elif path.endswith('.m3u8'):
+            key = path.rsplit('/', 1)[1][:-len('.m3u8')]
+        elif path.endswith('.ism/manifest'):
+            key = 'manifest'
+        else:
+            return None
+
+        with self._lock:
+            body = self._manifests.get(key)
+        if body is not None:
+            return body
+
+        if key == 'mpd':
+            body = synthetic_mpd(self.tracks, self.audio_tracks, self.segments, self.repeat_density)
+        elif key == 'master':
+            body = synthetic_master_m3u8(self.tracks, self.audio_tracks)
+        elif key == 'manifest':
+            body = synthetic_smooth(
+                self.tracks, self.audio_tracks, self.segments, self.repeat_density)
+        else:
+            body = synthetic_media_m3u8(key, self.segments)
+        with self._lock:
+            self._manifests[key] = body
+        return body
+
+    def start(self):
+        """Starts the server on a free local port.
+
+        Returns:
+            string -- URL of the server ending with /
+        """
+
+        self._server = _StandInServer(('127.0.0.1', 0), _StandInHandler)
+        self._server.origin = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.url = 'http://127.0.0.1:{}/'.format(self._server.server_address[1])
+        return self.url
+
+    def stop(self):
+        """Stops the server.
+        """
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
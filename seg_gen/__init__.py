@@ -1,18 +1,42 @@
+import importlib
 import logging
 import sys
-from . import s3_ism_urls
-from . import dash
-from . import hls
-from . import smooth
 
 __version__ = '0.0.1'
 
-logging.basicConfig(
-    level=logging.ERROR,
-    format='%(levelname)s: %(asctime)s - %(funcName)s at %(lineno)d %(message)s'
-)
+# Submodules are imported on first access, so e.g. users of seg_gen.hls do not
+# import boto3 or the DASH and Smooth parsers
+_SUBMODULES = (
+    'cache', 'checkpoint', 'dash', 'endpoints', 'hls', 'hls_parser', 'ism_index', 'live',
+    'manifest_parser', 'metrics', 'probe', 'resilience', 's3_ism_urls', 'sampler', 'smooth',
+    'templates', 'timeline', 'transport', 'url_table', 'uso', 'workers',
+    )
 
 logger = logging.getLogger(__name__)
+# Logging is configured by the application, seg_gen only emits records
+logger.addHandler(logging.NullHandler())
+
+
+def __getattr__(name):
+    """Imports submodules on first access, e.g. seg_gen.hls.
+
+    Arguments:
+        name {string} -- Name of the attribute
+
+    Returns:
+        module -- Imported submodule
+
+    Raises:
+        AttributeError -- name is not a submodule
+    """
+
+    if name in _SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
 
 
 class SegGen():
@@ -25,12 +49,105 @@ class SegGen():
         """Initialization method.
 
         Arguments:
-            uso_endpoint_url {string} -- URL of USO
+            uso_endpoint_url {string} -- URL of USO, or a list of URLs of USO origins and
+                                         CDN edges serving the same isms. Manifests are
+                                         only fetched from the first one, the segment
+                                         URLs of the others are rewritten from it
             bucket_name {string} -- Name of AWS S3 bucket to search for .ism files
             **kwargs {dict} -- Keyword Arguments that is supported
+
+        Supported keyword arguments:
+            aws_profile {string} -- Profilename in AWS config/credentials file
+            access_key_id {string} -- AWS AccessKeyId
+            secret_access_key {string} -- AWS SecretAccessKeyId
+            count {int} -- Number of ism files to use, -1 means all (default: {-1})
+            workers {int} -- Number of manifests fetched in parallel, 1 disables
+                             concurrency (default: {1})
+            workers_per_origin {int} -- Maximum parallel manifest fetches against
+                                        the same origin (default: {None})
+            transport {Transport} -- HTTP transport shared by all format clients
+                                     (default: {None})
+            pool_size {int} -- Keep-alive connections per origin of the transport
+                               created when none is given (default: {max(10, workers)})
+            cache_path {string} -- Path of a persistent manifest cache used by the
+                                   transport created when none is given (default: {None})
+            cache_size {int} -- Maximum bytes of the manifest cache (default: {256 MiB})
+            connect_timeout {float} -- Connect timeout of manifest requests in seconds
+                                       of the transport created when none is given
+                                       (default: {5.0})
+            read_timeout {float} -- Read timeout of manifest requests in seconds
+                                    (default: {30.0})
+            retries {int} -- Retries of manifest requests after connection errors,
+                             timeouts and 429/5xx responses (default: {2})
+            backoff {float} -- Upper bound of the first wait between retries in
+                               seconds, doubled per retry (default: {0.5})
+            breaker_failures {int} -- Consecutive failures after which requests to an
+                                      origin fail fast, 0 disables the circuit
+                                      breaker (default: {5})
+            breaker_reset {float} -- Seconds until a failing origin is tried again
+                                     (default: {30.0})
+            all_tracks {bool} -- Generate segments of every representation and track
+                                 instead of a single video rendition (default: {False})
+            list_workers {int} -- Number of S3 common prefixes listed in parallel
+                                  (default: {1})
+            s3_client {object} -- S3 client to use instead of creating one with boto3
+                                  (default: {None})
+            index_path {string} -- Path of a local index of ism keys, isms are served
+                                   from the index after listing only new keys
+                                   (default: {None})
+            refresh_index {string} -- incremental lists keys after the last indexed key,
+                                      full reconciles the whole prefix, none uses the
+                                      index as is (default: {incremental})
+            shard_index {int} -- Index of this worker in a distributed run (default: {0})
+            shard_count {int} -- Number of workers in a distributed run, every worker
+                                 only generates segments of its share of the isms
+                                 (default: {1})
+            metrics {MetricsCollector} -- Hook that records per stage durations and
+                                          counters, see seg_gen.metrics (default: {None})
+            failures {FailureReport} -- Report of the manifests that could not be
+                                        fetched or expanded, see seg_gen.resilience
+                                        (default: {None})
+            source_manifest {string} -- dash or smooth, fetch only this manifest per ism
+                                        and synthesize the URLs of the other formats
+                                        with uso_scheme, None fetches the manifests of
+                                        every format (default: {None})
+            uso_scheme {UsoScheme} -- URL scheme used with source_manifest
+                                      (default: {uso.UsoScheme(dash_timescale=dash_timescale)})
+            dash_timescale {int} -- Timescale of the DASH timelines USO packages, needed
+                                    with source_manifest smooth, see uso.UsoScheme
+                                    (default: {None})
+            endpoint_order {string} -- Order of the segments of several endpoints,
+                                       per_endpoint returns all segments of an
+                                       endpoint before the next one, interleaved
+                                       returns every segment for all endpoints
+                                       before the next segment (default: {per_endpoint})
+            checkpoint_path {string} -- Path of a local checkpoint, the segments of every
+                                        completed ism and format are stored in it and a
+                                        restarted run skips them and continues listing
+                                        after the last completed ism. A completed run
+                                        is replayed from it as well, even if the
+                                        manifests changed since (default: {None})
+            reset_checkpoint {bool} -- Discard the stored progress at checkpoint_path
+                                       before the first run, see clear_checkpoint
+                                       (default: {False})
         """
 
-        self.uso_endpoint_url = uso_endpoint_url
+        self.endpoints = [uso_endpoint_url]
+        if isinstance(uso_endpoint_url, (list, tuple)):
+            self.endpoints = list(uso_endpoint_url)
+        if not self.endpoints:
+            logger.error('uso_endpoint_url must contain at least one URL')
+            sys.exit(127)
+        self.uso_endpoint_url = self.endpoints[0]
+
+        self.endpoint_order = 'per_endpoint'
+        if 'endpoint_order' in kwargs:
+            self.endpoint_order = kwargs['endpoint_order']
+
+        if self.endpoint_order not in ('per_endpoint', 'interleaved'):
+            logger.error('endpoint_order must be per_endpoint or interleaved')
+            sys.exit(127)
+
         self.bucket_name = bucket_name
         self.prefix = prefix
         self.aws_profile = None
@@ -49,7 +166,206 @@ class SegGen():
         if 'count' in kwargs:
             self.count = kwargs['count']
         else:
-            count = -1
+            self.count = -1
+
+        self.workers = 1
+        self.workers_per_origin = None
+
+        if 'workers' in kwargs:
+            self.workers = kwargs['workers']
+
+        if 'workers_per_origin' in kwargs:
+            self.workers_per_origin = kwargs['workers_per_origin']
+
+        from . import workers
+        self._origin_limiter = workers.OriginLimiter(self.workers_per_origin)
+
+        self.list_workers = 1
+        self.s3_client = None
+        self._s3_ism_obj = None
+
+        if 'list_workers' in kwargs:
+            self.list_workers = kwargs['list_workers']
+
+        if 's3_client' in kwargs:
+            self.s3_client = kwargs['s3_client']
+
+        self.index_path = None
+        self.refresh_index = 'incremental'
+
+        if 'index_path' in kwargs:
+            self.index_path = kwargs['index_path']
+
+        if 'refresh_index' in kwargs:
+            self.refresh_index = kwargs['refresh_index']
+
+        self.checkpoint_path = None
+        if 'checkpoint_path' in kwargs:
+            self.checkpoint_path = kwargs['checkpoint_path']
+
+        self.reset_checkpoint = False
+        if 'reset_checkpoint' in kwargs:
+            self.reset_checkpoint = kwargs['reset_checkpoint']
+
+        self.shard_index = 0
+        self.shard_count = 1
+
+        if 'shard_index' in kwargs:
+            self.shard_index = kwargs['shard_index']
+
+        if 'shard_count' in kwargs:
+            self.shard_count = kwargs['shard_count']
+
+        if not 0 <= self.shard_index < self.shard_count:
+            logger.error('shard_index must be between 0 and shard_count - 1')
+            sys.exit(127)
+
+        self.all_tracks = False
+        if 'all_tracks' in kwargs:
+            self.all_tracks = kwargs['all_tracks']
+
+        from . import metrics
+        self.metrics = metrics.NULL_METRICS
+        if 'metrics' in kwargs and kwargs['metrics'] is not None:
+            self.metrics = kwargs['metrics']
+
+        self.source_manifest = None
+        self.uso_scheme = None
+        if 'source_manifest' in kwargs:
+            self.source_manifest = kwargs['source_manifest']
+
+        if self.source_manifest not in (None, 'dash', 'smooth'):
+            logger.error('source_manifest must be dash or smooth')
+            sys.exit(127)
+
+        if 'uso_scheme' in kwargs:
+            self.uso_scheme = kwargs['uso_scheme']
+        elif self.source_manifest:
+            from . import uso
+            self.uso_scheme = uso.UsoScheme(dash_timescale=kwargs.get('dash_timescale'))
+
+        # Smooth manifests always use 10000000, the DASH timescale cannot be derived
+        if self.source_manifest == 'smooth' and not self.uso_scheme.dash_timescale:
+            logger.error('source_manifest smooth needs the dash_timescale of the packager')
+            sys.exit(127)
+
+        from . import resilience
+        self.failures = resilience.FailureReport()
+        if 'failures' in kwargs and kwargs['failures'] is not None:
+            self.failures = kwargs['failures']
+
+        if 'transport' in kwargs:
+            self.transport = kwargs['transport']
+        else:
+            from . import transport
+            pool_size = max(10, self.workers)
+            if 'pool_size' in kwargs:
+                pool_size = kwargs['pool_size']
+            manifest_cache = None
+            if 'cache_path' in kwargs:
+                cache_size = 256 * 2**20
+                if 'cache_size' in kwargs:
+                    cache_size = kwargs['cache_size']
+                from . import cache
+                manifest_cache = cache.ManifestCache(kwargs['cache_path'], max_bytes=cache_size)
+            timeout = (kwargs.get('connect_timeout', 5.0), kwargs.get('read_timeout', 30.0))
+            retry = resilience.RetryPolicy(
+                retries=kwargs.get('retries', 2), backoff=kwargs.get('backoff', 0.5))
+            breaker = resilience.CircuitBreaker(
+                failures=kwargs.get('breaker_failures', 5),
+                reset_timeout=kwargs.get('breaker_reset', 30.0))
+            self.transport = transport.Transport(
+                pool_size=pool_size, cache=manifest_cache, metrics=self.metrics,
+                timeout=timeout, retry=retry, breaker=breaker)
+
+    def _get_s3_ism_obj(self):
+        """Returns the IsmUrls object, it is created once so its S3 client is reused.
+
+        Returns:
+            IsmUrls -- Object to list ism keys
+        """
+
+        if self._s3_ism_obj is None:
+            from . import s3_ism_urls
+            self._s3_ism_obj = s3_ism_urls.IsmUrls(
+                aws_profile=self.aws_profile,
+                aws_access_key_id=self.access_key_id,
+                aws_secret_access_key=self.secret_access_key,
+                s3_client=self.s3_client,
+                list_workers=self.list_workers,
+                metrics=self.metrics
+                )
+        return self._s3_ism_obj
+
+    def _get_indexed_keys(self, s3_ism_obj, count=-1, start_after=None):
+        """Refreshes the local ism index and yields its keys.
+
+        Arguments:
+            s3_ism_obj {IsmUrls} -- Object used to list new keys
+
+        Keyword Arguments:
+            count {int} -- Number of keys, -1 yields all (default: {-1})
+            start_after {string} -- Only yield keys after this key (default: {None})
+
+        Yields:
+            string -- AWS S3 bucket key of .ism-files
+        """
+
+        from . import ism_index
+        index = ism_index.IsmIndex(self.index_path, self.bucket_name, self.prefix)
+        try:
+            if self.refresh_index in ('incremental', 'full'):
+                index.refresh(s3_ism_obj, full=self.refresh_index == 'full')
+            for ism_key in index.get_keys(count, start_after):
+                yield ism_key
+        finally:
+            index.close()
+
+    def _iter_ism_keys(self, start_after=None, listed=0):
+        """Yields the isms of this shard while the S3 listing is still running.
+
+        Keyword Arguments:
+            start_after {string} -- Only list keys after this key (default: {None})
+            listed {int} -- Number of keys listed up to start_after, they count
+                            towards count (default: {0})
+
+        Yields:
+            tuple -- (number of keys listed up to the ism, ism key, callable ism URL)
+        """
+
+        from . import workers
+        count = self.count
+        if count > 0:
+            count = max(0, count - listed)
+        if count == 0:
+            return
+
+        s3_ism_obj = self._get_s3_ism_obj()
+        if self.index_path:
+            ism_keys = self._get_indexed_keys(s3_ism_obj, count, start_after)
+        else:
+            ism_keys = s3_ism_obj.get_matching_s3_keys(
+                bucket=self.bucket_name, prefix=self.prefix, count=count,
+                start_after=start_after)
+        for ism_key in ism_keys:
+            listed += 1
+            # count applies before sharding, so all shards together cover the same
+            # isms as a single process
+            if (self.shard_count > 1 and
+                    workers.get_shard(ism_key, self.shard_count) != self.shard_index):
+                continue
+            for base_url in s3_ism_obj.create_ism_url(self.uso_endpoint_url, [ism_key]):
+                yield listed, ism_key, base_url
+
+    def _iter_ism_path(self):
+        """Yields ism paths for specified count while the S3 listing is still running.
+
+        Yields:
+            string -- Callable ism URL.
+        """
+
+        for _, _, base_url in self._iter_ism_keys():
+            yield base_url
 
     def _get_ism_path(self):
         """Gets ism paths for specified count.
@@ -58,26 +374,243 @@ class SegGen():
             list -- List of ism keys.
         """
 
-        s3_ism_obj = s3_ism_urls.IsmUrls(
-            aws_profile=self.aws_profile,
-            aws_access_key_id=self.access_key_id,
-            aws_secret_access_key=self.secret_access_key
-            )
+        return list(self._iter_ism_path())
+
+    def _get_dash_ism_segments(self, dash_client, base_url):
+        """Generates DASH segments of a single ism.
 
-        i = self.count
-        ism_keys = list()
-        for ism_key in s3_ism_obj.get_matching_s3_keys(bucket=self.bucket_name, prefix=self.prefix):
-            if i == -1:
-                ism_keys.append(ism_key)
-            elif i == 0:
-                break
+        Arguments:
+            dash_client {Dash} -- Client used to fetch the .mpd
+            base_url {string} -- Base URL of the ism
+
+        Returns:
+            list -- List of DASH segments
+        """
+
+        # Getting DASH/.mpd URLs
+        dash_url = dash_client.get_callable_url(base_url)
+        with self._origin_limiter.acquire(dash_url):
+            dash_mpd = dash_client.get_mpd_manifest(dash_url)
+        if self.all_tracks:
+            if dash_mpd is None:
+                return []
+            from . import timeline
+            dash_timelines = dash_client.get_mpd_timelines(base_url, dash_mpd)
+            with self.metrics.timer('dash_expand'):
+                return timeline.expand_timelines(dash_timelines)
+        return dash_client.get_mpd_segment_urls(base_url, dash_mpd)
+
+    def _get_hls_ism_segments(self, hls_client, base_url):
+        """Generates HLS segments of a single ism.
+
+        Arguments:
+            hls_client {Hls} -- Client used to fetch the .m3u8 playlists
+            base_url {string} -- Base URL of the ism
+
+        Returns:
+            list -- List of HLS segments
+        """
+
+        # Getting HLS/.m3u8 URLs
+        hls_master_url = hls_client.get_master_url(base_url)
+        with self._origin_limiter.acquire(hls_master_url):
+            if self.all_tracks:
+                hls_segments = list()
+                for hls_playlist in hls_client.get_playlists(hls_master_url):
+                    hls_segments.extend(hls_client.get_segments(hls_playlist))
+                return hls_segments
+            hls_video_playlist = hls_client.get_video_playlist(hls_master_url)
+            return hls_client.get_segments(hls_video_playlist)
+
+    def _get_smooth_ism_segments(self, smooth_client, base_url):
+        """Generates Smooth segments of a single ism.
+
+        Arguments:
+            smooth_client {Smooth} -- Client used to fetch the manifest
+            base_url {string} -- Base URL of the ism
+
+        Returns:
+            list -- List of Smooth segments
+        """
+
+        # Getting Smooth/manifest URLs
+        smooth_master_url = smooth_client.get_smooth_url(base_url)
+        with self._origin_limiter.acquire(smooth_master_url):
+            smooth_xml = smooth_client.get_smooth_manifest(smooth_master_url)
+        if self.all_tracks:
+            if smooth_xml is None:
+                return []
+            from . import timeline
+            smooth_timelines = smooth_client.get_smooth_timelines(base_url, smooth_xml)
+            with self.metrics.timer('smooth_expand'):
+                return timeline.expand_timelines(smooth_timelines)
+        return smooth_client.get_smooth_segment_urls(base_url, smooth_xml)
+
+    def _get_source_client(self):
+        """Creates the client of source_manifest.
+
+        Returns:
+            object -- Dash or Smooth client
+        """
+
+        if self.source_manifest == 'dash':
+            from . import dash
+            return dash.Dash(transport=self.transport, metrics=self.metrics, failures=self.failures)
+        from . import smooth
+        return smooth.Smooth(transport=self.transport, metrics=self.metrics, failures=self.failures)
+
+    def _get_source_timelines(self, client, format_name, base_url, manifest):
+        """Returns the timelines of format_name out of the source manifest of an ism,
+        read from it for the format of the manifest and synthesized for the others.
+
+        Arguments:
+            client {object} -- Dash or Smooth client that fetched manifest
+            format_name {string} -- hls, dash or smooth
+            base_url {string} -- Base URL of the ism
+            manifest {Manifest} -- Source manifest
+
+        Returns:
+            list -- List of SegmentTimeline objects
+        """
+
+        if format_name == manifest.format == 'dash':
+            if self.all_tracks:
+                return client.get_mpd_timelines(base_url, manifest)
+            return [client.get_mpd_timeline(base_url, manifest)]
+        if format_name == manifest.format == 'smooth':
+            if self.all_tracks:
+                return client.get_smooth_timelines(base_url, manifest)
+            return [client.get_smooth_timeline(base_url, manifest)]
+        return self.uso_scheme.get_timelines(
+            format_name, base_url, manifest, all_tracks=self.all_tracks)
+
+    def _get_synthesized_groups(self, client, format_names, base_url):
+        """Fetches the source manifest of a single ism and generates the segments of
+        every format out of it.
+
+        Arguments:
+            client {object} -- Dash or Smooth client of source_manifest
+            format_names {list} -- Formats in order hls, dash, smooth
+            base_url {string} -- Base URL of the ism
+
+        Returns:
+            list -- (format, base URL of the ism, list of segments) tuples
+        """
+
+        from . import timeline
+        with self.metrics.timer(self.source_manifest + '_source_ism'):
+            if self.source_manifest == 'dash':
+                manifest_url = client.get_callable_url(base_url)
+                with self._origin_limiter.acquire(manifest_url):
+                    manifest = client.get_mpd_manifest(manifest_url)
             else:
-                ism_keys.append(ism_key)
-            i -= 1
+                manifest_url = client.get_smooth_url(base_url)
+                with self._origin_limiter.acquire(manifest_url):
+                    manifest = client.get_smooth_manifest(manifest_url)
+
+        groups = list()
+        for format_name in format_names:
+            segments = list()
+            if manifest is not None:
+                try:
+                    timelines = self._get_source_timelines(
+                        client, format_name, base_url, manifest)
+                    with self.metrics.timer(format_name + '_expand'):
+                        segments = timeline.expand_timelines(
+                            [segment_timeline for segment_timeline in timelines
+                             if segment_timeline is not None])
+                except:
+                    logger.warning('Could not synthesize %s segments of %s.', format_name, base_url)
+                    logger.debug('', exc_info=True)
+                    self.metrics.incr(format_name + '_errors')
+                    self.failures.add(format_name, base_url, 'expand', sys.exc_info()[1])
+            self.metrics.incr(format_name + '_segments', len(segments))
+            groups.append((format_name, base_url, segments))
+        return groups
+
+    def _get_format_clients(self, **kwargs):
+        """Creates one client per requested format.
+
+        Arguments:
+            **kwargs {dict} -- Dictionary that can contain hls, dash, smooth.
+
+        Returns:
+            list -- List of (format, function, client) tuples in order hls, dash, smooth
+        """
+
+        format_clients = list()
+        if 'hls' in kwargs:
+            from . import hls
+            format_clients.append(
+                ('hls', self._get_hls_ism_segments, hls.Hls(
+                    transport=self.transport, metrics=self.metrics,
+                    failures=self.failures)))
+        if 'dash' in kwargs:
+            from . import dash
+            format_clients.append(
+                ('dash', self._get_dash_ism_segments, dash.Dash(
+                    transport=self.transport, metrics=self.metrics,
+                    failures=self.failures)))
+        if 'smooth' in kwargs:
+            from . import smooth
+            format_clients.append(
+                ('smooth', self._get_smooth_ism_segments, smooth.Smooth(
+                    transport=self.transport, metrics=self.metrics,
+                    failures=self.failures)))
+        return format_clients
+
+    def _get_format_jobs(self, base_urls, **kwargs):
+        """Builds one job per ism and requested format.
+
+        Jobs are ordered by format first (hls, dash, smooth) and ism second,
+        which is the order the segments get returned in.
+
+        Arguments:
+            base_urls {list} -- Base URLs of the isms
+            **kwargs {dict} -- Dictionary that can contain hls, dash, smooth.
+
+        Returns:
+            list -- List of (format, function, client, base_url) tuples
+        """
+
+        jobs = list()
+        for format_name, function, client in self._get_format_clients(**kwargs):
+            jobs.extend((format_name, function, client, base_url) for base_url in base_urls)
+        return jobs
 
-        base_urls = s3_ism_obj.create_ism_url(self.uso_endpoint_url, ism_keys)
+    def _run_job(self, job):
+        """Runs a single job built by _get_format_jobs.
 
-        return base_urls
+        Arguments:
+            job {tuple} -- (format, function, client, base_url) tuple
+
+        Returns:
+            list -- Segments of the job
+        """
+
+        format_name, function, client, base_url = job
+        with self.metrics.timer(format_name + '_ism'):
+            segments = function(client, base_url)
+        self.metrics.incr(format_name + '_segments', len(segments))
+        return segments
+
+    def _run_jobs(self, jobs):
+        """Runs jobs built by _get_format_jobs, concurrently if workers > 1.
+
+        Arguments:
+            jobs {list} -- List of (format, function, client, base_url) tuples
+
+        Returns:
+            list -- Segments of all jobs in order of jobs
+        """
+
+        from . import workers
+        results = workers.ordered_map(self._run_job, jobs, workers=self.workers)
+
+        segments = list()
+        for result in results:
+            segments.extend(result)
+        return segments
 
     def _get_dash_segments(self, base_urls):
         """This private method generates DASH segments.
@@ -89,16 +622,7 @@ class SegGen():
             list -- List of DASH segments
         """
 
-        dash_client = dash.Dash()
-        dash_segments = list()
-
-        for base_url in base_urls:
-            # Getting DASH/.mpd URLs
-            dash_url = dash_client.get_callable_url(base_url)
-            dash_mpd = dash_client.get_mpd_xml(dash_url)
-            dash_segments.extend(dash_client.get_mpd_segment_urls(base_url, dash_mpd))
-
-        return dash_segments
+        return self._run_jobs(self._get_format_jobs(base_urls, dash=True))
 
     def _get_hls_segments(self, base_urls):
         """This private method generates HLS segments.
@@ -110,16 +634,7 @@ class SegGen():
             list -- List of HLS segments
         """
 
-        hls_client = hls.Hls()
-        hls_segments = list()
-
-        for base_url in base_urls:
-            # Getting HLS/.m3u8 URLs
-            hls_master_url = hls_client.get_master_url(base_url)
-            hls_video_playlist = hls_client.get_video_playlist(hls_master_url)
-            hls_segments.extend(hls_client.get_segments(hls_video_playlist))
-
-        return hls_segments
+        return self._run_jobs(self._get_format_jobs(base_urls, hls=True))
 
     def _get_smooth_segments(self, base_urls):
         """This private method generates Smooth segments.
@@ -130,20 +645,19 @@ class SegGen():
         Returns:
             list -- List of Smooth segments
         """
-        smooth_client = smooth.Smooth()
-        smooth_segments = list()
 
-        for base_url in base_urls:
-            # Getting Smooth/manifest URLs
-            smooth_master_url = smooth_client.get_smooth_url(base_url)
-            smooth_xml = smooth_client.get_smooth_xml(smooth_master_url)
-            smooth_segments.extend(smooth_client.get_smooth_segment_urls(base_url, smooth_xml))
-
-        return smooth_segments
+        return self._run_jobs(self._get_format_jobs(base_urls, smooth=True))
 
     def get_format_segment_urls(self, **kwargs):
         """Public method that generates segments dependent on what provides in kwargs.
 
+        With workers > 1 manifests of all isms and formats are fetched in parallel,
+        the returned list keeps the same order as a serial run. With source_manifest
+        only one manifest per ism is fetched. With several endpoints the segments
+        of the first one are rewritten for the others in endpoint_order. With
+        checkpoint_path an interrupted run continues with the isms and formats
+        that are not completed yet.
+
         Arguments:
             **kwargs {dict} -- Dictionary that can contain hsl, dash, smooth.
 
@@ -151,17 +665,453 @@ class SegGen():
             list -- List of segments of specified media in kwargs.
         """
 
-        all_segments = list()
+        from . import endpoints
+        segments = self._get_primary_segment_urls(**kwargs)
+        if len(self.endpoints) == 1:
+            return segments
+        url_lists = [endpoints.rewrite_urls(segments, self.uso_endpoint_url, endpoint)
+                     for endpoint in self.endpoints]
+        if self.endpoint_order == 'interleaved':
+            return endpoints.interleave(url_lists)
+        return [url for urls in url_lists for url in urls]
+
+    def _get_primary_segment_urls(self, **kwargs):
+        """get_format_segment_urls of the primary endpoint.
+
+        Arguments:
+            **kwargs {dict} -- Dictionary that can contain hsl, dash, smooth.
+
+        Returns:
+            list -- List of segments of specified media in kwargs.
+        """
+
+        if self.checkpoint_path:
+            format_segments = dict()
+            for format_name, _, segments in self._iter_checkpointed_groups(**kwargs):
+                format_segments.setdefault(format_name, list()).extend(segments)
+            return [segment for format_name in ('hls', 'dash', 'smooth')
+                    for segment in format_segments.get(format_name, [])]
+
         base_urls = self._get_ism_path()
+        if self.source_manifest:
+            from . import workers
+            format_names = [name for name in ('hls', 'dash', 'smooth') if name in kwargs]
+            if not format_names:
+                return []
+            client = self._get_source_client()
+            ism_groups = workers.ordered_map(
+                lambda base_url: self._get_synthesized_groups(client, format_names, base_url),
+                base_urls, workers=self.workers)
+            segments = list()
+            for position in range(len(format_names)):
+                for groups in ism_groups:
+                    segments.extend(groups[position][2])
+            return segments
+        return self._run_jobs(self._get_format_jobs(base_urls, **kwargs))
 
-        if 'hls' in kwargs:
-            hls_segments = self._get_hls_segments(base_urls)
-            all_segments.extend(hls_segments)
-        if 'dash' in kwargs:
-            dash_segments = self._get_dash_segments(base_urls)
-            all_segments.extend(dash_segments)
-        if 'smooth' in kwargs:
-            smooth_segments = self._get_smooth_segments(base_urls)
-            all_segments.extend(smooth_segments)
+    def iter_segment_groups(self, **kwargs):
+        """Public generator that yields the segments of every ism and format as one group.
+
+        Groups are yielded ism by ism, with the requested formats of an ism in
+        order hls, dash, smooth. The S3 listing is consumed lazily and with
+        workers > 1 the next isms are fetched in the background. With several
+        endpoints every group is followed by its copies for the other endpoints.
+
+        Arguments:
+            **kwargs {dict} -- Dictionary that can contain hls, dash, smooth.
+
+        Yields:
+            tuple -- (format, base URL of the ism, list of segments)
+        """
+
+        from . import endpoints
+        primary = self.uso_endpoint_url
+        for format_name, base_url, segments in self._iter_primary_groups(**kwargs):
+            yield format_name, base_url, segments
+            for endpoint in self.endpoints[1:]:
+                yield (format_name, endpoints.rewrite_url(base_url, primary, endpoint),
+                       endpoints.rewrite_urls(segments, primary, endpoint))
+
+    def _iter_primary_groups(self, **kwargs):
+        """iter_segment_groups of the primary endpoint.
+
+        Arguments:
+            **kwargs {dict} -- Dictionary that can contain hls, dash, smooth.
+
+        Yields:
+            tuple -- (format, base URL of the ism, list of segments)
+        """
+
+        from . import workers
+        if self.checkpoint_path:
+            for group in self._iter_checkpointed_groups(**kwargs):
+                yield group
+            return
+
+        if self.source_manifest:
+            format_names = [name for name in ('hls', 'dash', 'smooth') if name in kwargs]
+            client = self._get_source_client()
+            results = workers.ordered_imap(
+                lambda base_url: self._get_synthesized_groups(client, format_names, base_url),
+                self._iter_ism_path(), workers=self.workers)
+            for groups in results:
+                for group in groups:
+                    yield group
+            return
+
+        format_clients = self._get_format_clients(**kwargs)
+        jobs = ((format_name, function, client, base_url)
+                for base_url in self._iter_ism_path()
+                for format_name, function, client in format_clients)
+        results = workers.ordered_imap(
+            lambda job: (job[0], job[3], self._run_job(job)), jobs, workers=self.workers)
+        for result in results:
+            yield result
+
+    def _get_checkpoint(self, format_names):
+        """Opens the checkpoint of this run at checkpoint_path. Runs with other
+        buckets, endpoints, formats, counts or shards keep separate progress.
+
+        Arguments:
+            format_names {list} -- Formats in order hls, dash, smooth
+
+        Returns:
+            Checkpoint -- Progress of the run
+        """
+
+        import json
+        from . import checkpoint
+        run = json.dumps([self.bucket_name, self.prefix, self.uso_endpoint_url, format_names,
+                          self.all_tracks, self.source_manifest, self.count,
+                          self.shard_index, self.shard_count])
+        return checkpoint.Checkpoint(self.checkpoint_path, run)
+
+    def clear_checkpoint(self, **kwargs):
+        """Public method that discards the stored progress of the run with the formats
+        provided in kwargs, so the next run fetches every manifest again instead of
+        replaying stale segments. Runs with other formats at checkpoint_path are kept.
+
+        Arguments:
+            **kwargs {dict} -- Dictionary that can contain hls, dash, smooth.
+        """
+
+        if not self.checkpoint_path:
+            logger.error('clear_checkpoint needs checkpoint_path')
+            sys.exit(127)
+
+        format_names = [name for name in ('hls', 'dash', 'smooth') if name in kwargs]
+        progress = self._get_checkpoint(format_names)
+        try:
+            progress.clear()
+        finally:
+            progress.close()
+
+    def _iter_checkpointed_groups(self, **kwargs):
+        """_iter_primary_groups that resumes from and saves to the checkpoint.
+
+        Groups of the isms up to the checkpointed listing position are replayed
+        from the checkpoint, listing continues after it. Groups of later isms that
+        are stored already are reused, the others are generated and stored unless
+        their manifests failed, so a restarted run retries only failed and missing
+        isms. The listing position only advances over isms whose formats all
+        completed.
+
+        Arguments:
+            **kwargs {dict} -- Dictionary that can contain hls, dash, smooth.
+
+        Yields:
+            tuple -- (format, base URL of the ism, list of segments)
+        """
+
+        from . import workers
+        format_names = [name for name in ('hls', 'dash', 'smooth') if name in kwargs]
+        progress = self._get_checkpoint(format_names)
+        try:
+            if self.reset_checkpoint:
+                # Only once, a later run of this object resumes the fresh progress
+                self.reset_checkpoint = False
+                progress.clear()
+            start_after, listed = progress.get_position()
+            for group in progress.iter_groups(start_after):
+                yield group
+
+            def save(ism, position, group):
+                # Groups are saved by the workers, so groups completed in the
+                # background are kept if the run is interrupted before they are
+                # yielded
+                format_name, base_url, segments = group
+                if self.failures.has_failed(format_name, base_url):
+                    return False
+                progress.add_group(ism[1], position, format_name, base_url, segments)
+                return True
+
+            isms = self._iter_ism_keys(start_after, listed)
+            if self.source_manifest:
+                client = self._get_source_client()
+
+                def run_ism(ism):
+                    stored = [progress.get_group(ism[1], position)
+                              for position in range(len(format_names))]
+                    if None not in stored:
+                        return [(ism, position, group, True)
+                                for position, group in enumerate(stored)]
+                    groups = self._get_synthesized_groups(client, format_names, ism[2])
+                    return [(ism, position, group, save(ism, position, group))
+                            for position, group in enumerate(groups)]
+
+                results = (result
+                           for ism_results in workers.ordered_imap(
+                               run_ism, isms, workers=self.workers)
+                           for result in ism_results)
+            else:
+                format_clients = self._get_format_clients(**kwargs)
+
+                def run_job(job):
+                    ism, position, (format_name, function, client) = job
+                    group = progress.get_group(ism[1], position)
+                    if group is not None:
+                        return ism, position, group, True
+                    segments = self._run_job((format_name, function, client, ism[2]))
+                    group = (format_name, ism[2], segments)
+                    return ism, position, group, save(ism, position, group)
+
+                jobs = ((ism, position, format_client)
+                        for ism in isms
+                        for position, format_client in enumerate(format_clients))
+                results = workers.ordered_imap(run_job, jobs, workers=self.workers)
+
+            completed = True
+            for (ism_listed, ism_key, _), position, group, saved in results:
+                completed = completed and saved
+                if completed and position == len(format_names) - 1:
+                    progress.set_position(ism_key, ism_listed)
+                yield group
+        finally:
+            progress.close()
+
+    def iter_format_segment_urls(self, **kwargs):
+        """Public generator that yields segments dependent on what provides in kwargs.
+
+        Unlike get_format_segment_urls segments are yielded ism by ism, with the
+        requested formats of an ism in order hls, dash, smooth. The S3 listing is
+        consumed lazily, so the first segments are available as soon as the first
+        manifests are expanded. With workers > 1 the next isms are fetched in the
+        background while earlier segments are consumed. With several endpoints
+        per_endpoint yields the segments of a group for every endpoint before the
+        next group, interleaved every segment for every endpoint.
+
+        Arguments:
+            **kwargs {dict} -- Dictionary that can contain hls, dash, smooth.
+
+        Yields:
+            string -- Segment URL of specified media in kwargs.
+        """
+
+        from . import endpoints
+        if self.endpoint_order == 'per_endpoint' or len(self.endpoints) == 1:
+            for _, _, segments in self.iter_segment_groups(**kwargs):
+                for segment in segments:
+                    yield segment
+            return
+
+        for _, _, segments in self._iter_primary_groups(**kwargs):
+            for segment in endpoints.interleave(
+                    [endpoints.rewrite_urls(segments, self.uso_endpoint_url, endpoint)
+                     for endpoint in self.endpoints]):
+                yield segment
+
+    def _get_ism_timelines(self, format_name, client, base_url):
+        """Returns the timelines of every video representation, or of every
+        representation if all_tracks is set, of a single ism. HLS playlists are
+        returned as lists of segment URIs.
+
+        Arguments:
+            format_name {string} -- hls, dash or smooth
+            client {object} -- Client of the format
+            base_url {string} -- Base URL of the ism
+
+        Returns:
+            tuple -- (list of timelines, list of their bitrates)
+        """
+
+        from . import sampler
+        content_types = None if self.all_tracks else ['video']
+        if format_name == 'hls':
+            hls_master_url = client.get_master_url(base_url)
+            with self._origin_limiter.acquire(hls_master_url):
+                playlists = [playlist for playlist in client.get_playlists(hls_master_url)
+                             if self.all_tracks or playlist.media_type is None]
+                return ([client.get_segments(playlist) for playlist in playlists],
+                        [playlist.bandwidth for playlist in playlists])
+
+        if format_name == 'dash':
+            dash_url = client.get_callable_url(base_url)
+            with self._origin_limiter.acquire(dash_url):
+                manifest = client.get_mpd_manifest(dash_url)
+            if manifest is None:
+                return [], []
+            return (client.get_mpd_timelines(base_url, manifest, content_types),
+                    sampler.get_manifest_bitrates(manifest, content_types))
+
+        smooth_url = client.get_smooth_url(base_url)
+        with self._origin_limiter.acquire(smooth_url):
+            manifest = client.get_smooth_manifest(smooth_url)
+        if manifest is None:
+            return [], []
+        return (client.get_smooth_timelines(base_url, manifest, content_types),
+                sampler.get_manifest_bitrates(manifest, content_types))
+
+    def get_segment_sampler(self, seed=None, zipf_exponent=1.0, position_half_life=None,
+                            bitrate_shares=None, **kwargs):
+        """Public method that creates a SegmentSampler over the isms and formats
+        provided in kwargs. Timelines are not expanded, so the sampler needs memory
+        per timeline run instead of per segment.
+
+        Isms are weighted by Zipf in listing order, the formats of an ism share
+        its weight equally. With several endpoints every endpoint gets an equal
+        share of the weight of an ism, its timelines share the runs of the first.
+
+        Keyword Arguments:
+            seed {int} -- Seed for reproducible draws (default: {None})
+            zipf_exponent {float} -- Skew of the ism popularity (default: {1.0})
+            position_half_life {float} -- Segments after which the weight of a segment
+                                          halves, None weights all equally (default: {None})
+            bitrate_shares {dict} -- Share of every bitrate, None weights all
+                                     representations equally. HLS variants use
+                                     their BANDWIDTH, which includes audio
+                                     (default: {None})
+            **kwargs {dict} -- Dictionary that can contain hls, dash, smooth.
+
+        Returns:
+            SegmentSampler -- Sampler with draw and sample methods
+        """
+
+        from . import endpoints
+        from . import sampler
+        from . import workers
+        segment_sampler = sampler.SegmentSampler(
+            seed=seed, zipf_exponent=zipf_exponent, position_half_life=position_half_life,
+            bitrate_shares=bitrate_shares)
+        format_clients = self._get_format_clients(**kwargs)
+        if not format_clients:
+            return segment_sampler
+
+        jobs = ((format_name, client, base_url)
+                for base_url in self._iter_ism_path()
+                for format_name, _, client in format_clients)
+        results = workers.ordered_imap(
+            lambda job: (job[0], job[2], self._get_ism_timelines(*job)), jobs,
+            workers=self.workers)
+
+        shares = len(format_clients) * len(self.endpoints)
+        for position, (format_name, base_url, (timelines, bitrates)) in enumerate(results):
+            rank = position // len(format_clients)
+            for endpoint in self.endpoints:
+                segment_sampler.add_ism(
+                    endpoints.rewrite_url(base_url, self.uso_endpoint_url, endpoint),
+                    [endpoints.rewrite_timeline(segment_timeline, self.uso_endpoint_url, endpoint)
+                     for segment_timeline in timelines],
+                    bitrates, weight=sampler.zipf_weight(rank, zipf_exponent) / shares)
+        return segment_sampler
+
+    def export_url_table(self, path, **kwargs):
+        """Writes the segments dependent on what provides in kwargs into a binary
+        URL table, which load test workers open with url_table.UrlTable instead
+        of generating the segments themselves. The table replaces path once it is
+        complete, an interrupted export leaves path untouched.
+
+        Arguments:
+            path {string} -- Path of the table file
+            **kwargs {dict} -- Dictionary that can contain hls, dash, smooth.
+
+        Returns:
+            int -- Number of exported segments
+        """
+
+        from . import url_table
+        exported = 0
+        with url_table.UrlTableWriter(path) as writer:
+            for format_name, base_url, segments in self.iter_segment_groups(**kwargs):
+                writer.add_group(format_name, base_url, segments)
+                exported += len(segments)
+        return exported
+
+    def probe_segments(self, method='HEAD', range_bytes=None, probe_workers=10, rate=None,
+                       report=None, **kwargs):
+        """Public method that probes the segments dependent on what provides in kwargs
+        while they are generated, e.g. to warm the USO and CDN caches and to check
+        that all segments resolve. See probe.SegmentProber.
+
+        Keyword Arguments:
+            method {string} -- HEAD or GET (default: {'HEAD'})
+            range_bytes {int} -- Only GET the first range_bytes of a segment, None
+                                 GETs the whole segment (default: {None})
+            probe_workers {int} -- Maximum probes in flight (default: {10})
+            rate {float} -- Maximum probes per second, None is unlimited (default: {None})
+            report {ProbeReport} -- Report to add to (default: {None})
+            **kwargs {dict} -- Dictionary that can contain hls, dash, smooth.
+
+        Returns:
+            ProbeReport -- Status codes, time to first byte and latency histograms
+                           per format and ism
+        """
+
+        from . import probe
+        from . import transport
+        prober = probe.SegmentProber(
+            transport=transport.Transport(
+                pool_size=max(10, probe_workers), timeout=self.transport.timeout),
+            method=method, range_bytes=range_bytes, workers=probe_workers, rate=rate,
+            metrics=self.metrics)
+        return prober.run(self.iter_segment_groups(**kwargs), report=report)
+
+    def verify_synthesized_urls(self, **kwargs):
+        """Public method that checks the URLs synthesized from source_manifest against
+        the manifests of the formats provided in kwargs, e.g. once per library
+        before generating with source_manifest. Formats of the source manifest
+        itself are not checked.
+
+        Arguments:
+            **kwargs {dict} -- Dictionary that can contain hls, dash, smooth.
+
+        Returns:
+            list -- One dict per mismatching format and ism with format, ism_url,
+                    synthesized and fetched segment counts and the first differing
+                    index with both URLs, empty if all URLs match
+        """
+
+        from . import workers
+        if not self.source_manifest:
+            logger.error('verify_synthesized_urls needs source_manifest')
+            sys.exit(127)
+
+        format_names = [name for name in ('hls', 'dash', 'smooth')
+                        if name in kwargs and name != self.source_manifest]
+        format_clients = self._get_format_clients(**dict((name, True) for name in format_names))
+        source_client = self._get_source_client()
+
+        def verify(base_url):
+            mismatches = list()
+            groups = self._get_synthesized_groups(source_client, format_names, base_url)
+            for (format_name, _, synthesized), (_, function, client) in zip(
+                    groups, format_clients):
+                fetched = function(client, base_url)
+                if synthesized == fetched:
+                    continue
+                index = next((i for i, (a, b) in enumerate(zip(synthesized, fetched)) if a != b),
+                             min(len(synthesized), len(fetched)))
+                mismatches.append({
+                    'format': format_name,
+                    'ism_url': base_url,
+                    'synthesized': len(synthesized),
+                    'fetched': len(fetched),
+                    'index': index,
+                    'synthesized_url': synthesized[index] if index < len(synthesized) else None,
+                    'fetched_url': fetched[index] if index < len(fetched) else None,
+                    })
+            return mismatches
 
-        return all_segments
+        mismatches = list()
+        for result in workers.ordered_imap(verify, self._iter_ism_path(), workers=self.workers):
+            mismatches.extend(result)
+        return mismatches
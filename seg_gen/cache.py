@@ -0,0 +1,157 @@
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ManifestCache():
+    """Persistent on-disk cache of manifest bodies keyed by manifest URL.
+    Entries keep ETag, Last-Modified and the URL after redirects of the response,
+    so the Transport can revalidate them with conditional requests. The cache is
+    limited to max_bytes, least recently used entries are evicted first. Reads
+    mark entries as used in batches of touch_batch, not with one write per read.
+    Example:
+
+    from seg_gen import cache, transport
+    manifest_cache = cache.ManifestCache('/tmp/seg_gen_cache.sqlite', max_bytes=512 * 2**20)
+    shared = transport.Transport(cache=manifest_cache)
+    """
+
+    def __init__(self, path, max_bytes=256 * 2**20, touch_batch=64):
+        """Init method
+
+        Arguments:
+            path {string} -- Path of the SQLite file that stores the cache
+
+        Keyword Arguments:
+            max_bytes {int} -- Maximum size of all cached bodies (default: {256 MiB})
+            touch_batch {int} -- Reads after which their access times are written
+                                 (default: {64})
+        """
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.touch_batch = touch_batch
+        self._lock = threading.Lock()
+        # url -> access time of reads that are not written yet
+        self._touched = dict()
+        self._reads = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS manifests ('
+            'url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, '
+            'body BLOB, size INTEGER, last_access REAL, final_url TEXT)'
+            )
+        self._db.execute(
+            'CREATE INDEX IF NOT EXISTS manifests_last_access ON manifests (last_access)')
+        self._db.commit()
+        self._size = self._db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM manifests').fetchone()[0]
+
+    def get(self, url):
+        """Returns the cached entry of url and marks it as recently used.
+
+        Arguments:
+            url {string} -- Manifest URL
+
+        Returns:
+            tuple -- (etag, last_modified, body, final url after redirects) or None
+                     if url is not cached
+        """
+
+        with self._lock:
+            row = self._db.execute(
+                'SELECT etag, last_modified, body, final_url FROM manifests WHERE url = ?',
+                (url,)
+                ).fetchone()
+            if row is None:
+                return None
+            self._touched[url] = time.time()
+            self._reads += 1
+            if self._reads >= self.touch_batch:
+                self.__flush_touched()
+                self._db.commit()
+        return row[0], row[1], bytes(row[2]), row[3] or url
+
+    def put(self, url, etag, last_modified, body, final_url=None):
+        """Stores body of url and evicts least recently used entries above max_bytes.
+
+        Arguments:
+            url {string} -- Manifest URL
+            etag {string} -- ETag header of the response or None
+            last_modified {string} -- Last-Modified header of the response or None
+            body {bytes} -- Body of the response
+
+        Keyword Arguments:
+            final_url {string} -- URL of the response after redirects, None if it
+                                  was not redirected (default: {None})
+        """
+
+        if len(body) > self.max_bytes:
+            return
+
+        with self._lock:
+            row = self._db.execute('SELECT size FROM manifests WHERE url = ?', (url,)).fetchone()
+            if row is not None:
+                self._size -= row[0]
+            self._touched.pop(url, None)
+            self._db.execute(
+                'INSERT OR REPLACE INTO manifests VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, etag, last_modified, sqlite3.Binary(body), len(body), time.time(),
+                 final_url if final_url != url else None)
+                )
+            self._size += len(body)
+            self.__evict()
+            self._db.commit()
+
+    def __flush_touched(self):
+        """Helper method that writes the access times of pending reads. Must be
+        called with the lock held.
+        """
+
+        if self._touched:
+            self._db.executemany(
+                'UPDATE manifests SET last_access = ? WHERE url = ?',
+                [(last_access, url) for url, last_access in self._touched.items()])
+            self._touched.clear()
+        self._reads = 0
+
+    def __evict(self):
+        """Helper method that deletes least recently used entries until the cache
+        fits into max_bytes. Must be called with the lock held.
+        """
+
+        if self._size <= self.max_bytes:
+            return
+
+        self.__flush_touched()
+        rows = self._db.execute('SELECT url, size FROM manifests ORDER BY last_access')
+        evict = list()
+        for url, size in rows:
+            if self._size <= self.max_bytes:
+                break
+            evict.append((url,))
+            self._size -= size
+        self._db.executemany('DELETE FROM manifests WHERE url = ?', evict)
+        logger.debug('Evicted %d manifests from cache.', len(evict))
+
+    def clear(self):
+        """Removes all entries from the cache.
+        """
+
+        with self._lock:
+            self._db.execute('DELETE FROM manifests')
+            self._db.commit()
+            self._touched.clear()
+            self._size = 0
+
+    def close(self):
+        """Closes the underlying SQLite connection.
+        """
+
+        with self._lock:
+            self.__flush_touched()
+            self._db.commit()
+            self._db.close()
@@ -0,0 +1,173 @@
+import logging
+import sqlite3
+import threading
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint():
+    """Persistent progress of a generation run, so a run that got interrupted by
+    an exception, sys.exit or a killed process continues where it stopped.
+    The segments of every completed ism and format are stored as soon as they
+    are generated. The listing position is the last ism key up to which every
+    ism is completed, a restarted run lists only the keys after it
+    (StartAfter) and reuses stored groups of later isms instead of fetching
+    their manifests again.
+    Runs are identified by run, e.g. the bucket, prefix, endpoint and formats,
+    several runs can share one file.
+    Example:
+
+    from seg_gen import checkpoint
+    progress = checkpoint.Checkpoint('/tmp/run.sqlite', 'my-bucket/vod/ dash')
+    start_after, listed = progress.get_position()
+    """
+
+    def __init__(self, path, run):
+        """Init method
+
+        Arguments:
+            path {string} -- Path of the SQLite file that stores the checkpoint
+            run {string} -- Identifier of the run
+        """
+
+        self.path = path
+        self.run = run
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS positions ('
+            'run TEXT PRIMARY KEY, start_after TEXT, listed INTEGER)'
+            )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS groups ('
+            'run TEXT, ism_key TEXT, position INTEGER, format TEXT, base_url TEXT, '
+            'segments BLOB, PRIMARY KEY (run, ism_key, position))'
+            )
+        self._db.commit()
+
+    def get_position(self):
+        """Returns the listing position of the run.
+
+        Returns:
+            tuple -- (last ism key up to which all isms are completed or None,
+                      number of keys listed up to it)
+        """
+
+        with self._lock:
+            row = self._db.execute(
+                'SELECT start_after, listed FROM positions WHERE run = ?', (self.run,)
+                ).fetchone()
+        if row is None:
+            return None, 0
+        return row[0], row[1]
+
+    def set_position(self, start_after, listed):
+        """Stores the listing position of the run.
+
+        Arguments:
+            start_after {string} -- Last ism key up to which all isms are completed
+            listed {int} -- Number of keys listed up to start_after
+        """
+
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO positions VALUES (?, ?, ?)',
+                (self.run, start_after, listed))
+            self._db.commit()
+
+    def add_group(self, ism_key, position, format_name, base_url, segments):
+        """Stores the segments of a completed ism and format.
+
+        Arguments:
+            ism_key {string} -- AWS S3 bucket key of the ism
+            position {int} -- Position of the format in the groups of an ism
+            format_name {string} -- hls, dash or smooth
+            base_url {string} -- Base URL of the ism
+            segments {list} -- Segment URLs
+        """
+
+        blob = zlib.compress('\n'.join(segments).encode('utf-8'))
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO groups VALUES (?, ?, ?, ?, ?, ?)',
+                (self.run, ism_key, position, format_name, base_url, sqlite3.Binary(blob)))
+            self._db.commit()
+
+    @staticmethod
+    def __decode(row):
+        """Helper method that turns a stored row into a group.
+
+        Arguments:
+            row {tuple} -- (format, base_url, segments) row
+
+        Returns:
+            tuple -- (format, base URL of the ism, list of segments)
+        """
+
+        text = zlib.decompress(bytes(row[2])).decode('utf-8')
+        return row[0], row[1], text.split('\n') if text else []
+
+    def get_group(self, ism_key, position):
+        """Returns a stored group.
+
+        Arguments:
+            ism_key {string} -- AWS S3 bucket key of the ism
+            position {int} -- Position of the format in the groups of an ism
+
+        Returns:
+            tuple -- (format, base URL of the ism, list of segments) or None if the
+                     group is not completed
+        """
+
+        with self._lock:
+            row = self._db.execute(
+                'SELECT format, base_url, segments FROM groups '
+                'WHERE run = ? AND ism_key = ? AND position = ?',
+                (self.run, ism_key, position)
+                ).fetchone()
+        if row is None:
+            return None
+        return self.__decode(row)
+
+    def iter_groups(self, until):
+        """Yields the stored groups of the isms up to a key in S3 order.
+
+        Arguments:
+            until {string} -- Last ism key, None yields nothing
+
+        Yields:
+            tuple -- (format, base URL of the ism, list of segments)
+        """
+
+        if until is None:
+            return
+        with self._lock:
+            cursor = self._db.execute(
+                'SELECT format, base_url, segments FROM groups '
+                'WHERE run = ? AND ism_key <= ? ORDER BY ism_key, position',
+                (self.run, until)
+                )
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(256)
+            if not rows:
+                break
+            for row in rows:
+                yield self.__decode(row)
+
+    def clear(self):
+        """Removes the progress of the run, the next run starts from scratch.
+        """
+
+        with self._lock:
+            self._db.execute('DELETE FROM positions WHERE run = ?', (self.run,))
+            self._db.execute('DELETE FROM groups WHERE run = ?', (self.run,))
+            self._db.commit()
+
+    def close(self):
+        """Closes the underlying SQLite connection.
+        """
+
+        with self._lock:
+            self._db.close()
@@ -1,15 +1,31 @@
-import xmltodict
-import requests
 import logging
 import sys
+import time
+from .transport import Transport
+from .metrics import NULL_METRICS, timed_parse
+from .resilience import FailureReport
+from . import live
+from . import timeline
+from .timeline import SegmentTimeline
+from .manifest_parser import Manifest, get_timeline_end, parse_duration, parse_manifest
+from .templates import compile_dash_template
 
-logging.basicConfig(
-    level=logging.ERROR,
-    format='%(levelname)s: %(asctime)s - %(funcName)s at %(lineno)d %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
+def _get_attributes(element):
+    """Returns the attributes of an element parsed by xmltodict without their @ prefix.
+
+    Arguments:
+        element {dict} -- Element parsed by xmltodict
+
+    Returns:
+        dict -- Attribute name -> value
+    """
+
+    return dict((key[1:], value) for key, value in element.items() if key.startswith('@'))
+
+
 class Dash():
     """Class which is usefull to get MPD XML files, dict representation of MPD XML files
     and MPD segment URLs.
@@ -24,28 +40,49 @@ class Dash():
     segment_url = dash.get_mpd_segment_urls(base_url, mpd_xml)
     """
 
-    def __build_mpd_segment_url(self, base_url, extension_url, segment_url, repr_id, seq_time=None):
-        """This helper method creates the mpd segment URLs.
+    def __init__(self, transport=None, metrics=None, failures=None):
+        """Init method
+
+        Keyword Arguments:
+            transport {Transport} -- Shared HTTP transport used to load MPD files,
+                                     a new one is created if omitted (default: {None})
+            metrics {MetricsCollector} -- Hook that records stage durations and
+                                          counters (default: {None})
+            failures {FailureReport} -- Report of the MPD files that could not be fetched
+                                        or expanded (default: {None})
+        """
+
+        self.metrics = metrics or NULL_METRICS
+        self.failures = failures
+        if self.failures is None:
+            self.failures = FailureReport()
+        self.transport = transport
+        if self.transport is None:
+            self.transport = Transport(metrics=self.metrics)
+
+    def __compile_mpd_templates(self, base_url, extension_url, initial_url, media_url, repr_id,
+                                bandwidth=''):
+        """This helper method compiles the initialization and media templates of a representation.
 
         Arguments:
             base_url {string} -- URL where to get the .mpd file.
             extension_url {string} -- contains path of dash segments.
-            segment_url {string} -- Template URL to generate the segment URL.
+            initial_url {string} -- Template URL of the initialization segment.
+            media_url {string} -- Template URL to generate the segment URLs.
             repr_id {string} -- ID which represents the DASH video file.
 
         Keyword Arguments:
-            seq_time {string} -- Wich segment URL you want to get (default: {None})
+            bandwidth {string} -- Bandwidth of the representation (default: {''})
 
         Returns:
-            string -- DASH segment URL
+            tuple -- (initialization URL, CompiledTemplate of the media segments)
         """
 
-        if not seq_time:
-            segment_url = segment_url.replace('$RepresentationID$', str(repr_id))
-        else:
-            tmp_url = segment_url.replace('$RepresentationID$', str(repr_id))
-            segment_url = tmp_url.replace('$Time$', str(seq_time))
-        return base_url + extension_url + segment_url
+        base = base_url + extension_url
+        initialization = None
+        if initial_url is not None:
+            initialization = compile_dash_template(initial_url, repr_id, bandwidth, base)()
+        return initialization, compile_dash_template(media_url, repr_id, bandwidth, base)
 
     def get_callable_url(self, base_url):
         """Builds URL to fetch .mpd files
@@ -75,60 +112,222 @@ class Dash():
         """
 
         try:
-            response = requests.get(mpd_url)
-            if response.status_code == 200:
-                return xmltodict.parse(response.content)
+            content = self.transport.get_content(mpd_url)
+            if content is not None:
+                import xmltodict
+                return xmltodict.parse(content)
         except:
             logger.warning('Could not get mpd xml from mpd url.')
             logger.debug('', exc_info=True)
+            self.metrics.incr('dash_errors')
+            self.failures.add('dash', mpd_url, 'fetch', sys.exc_info()[1])
             return ''
 
-    def get_mpd_segment_urls(self, base_url, mpd_xml):
-        """Parses MPD XML file to get all information to create segment URLs
-        to call for performance testing.
+    def get_mpd_manifest(self, mpd_url):
+        """Returns the parts of the MPD XML needed to generate segment URLs.
+        The MPD is parsed while it is downloaded and unused elements are dropped,
+        which is cheaper than building the full dict of get_mpd_xml.
+
+        Arguments:
+            mpd_url {string} -- URL where to fetch MPD XML. Mostly ends with /.mpd.
+
+        Returns:
+            Manifest -- Parsed MPD, None if it could not be fetched.
+        """
+
+        try:
+            return timed_parse(
+                parse_manifest, self.transport.stream(mpd_url), self.metrics, 'dash')
+        except:
+            logger.warning('Could not get mpd xml from mpd url.')
+            logger.debug('', exc_info=True)
+            self.metrics.incr('dash_errors')
+            self.failures.add('dash', mpd_url, 'fetch', sys.exc_info()[1])
+            return None
+
+    def __get_manifest_timeline(self, base_url, manifest):
+        """Helper method that creates the video SegmentTimeline of a parsed Manifest.
 
         Arguments:
             base_url {string} -- URL that points to ism file on USO.
-            mpd_xml {dict} -- Dict representation of MPD XML file.
+            manifest {Manifest} -- MPD returned by get_mpd_manifest.
 
         Returns:
-            list -- List of Segment URLS to use in performance testing tool.
+            SegmentTimeline -- Timeline of the video segments.
+        """
+
+        extension_url = manifest.base_url
+        track = manifest.get_tracks('video')[-1]
+        representation = track.representations[0]
+
+        initialization, media = self.__compile_mpd_templates(
+            base_url, extension_url, track.initialization, track.media,
+            representation['id'], representation['bandwidth'])
+        start_number = track.start_number if media.variable == 'Number' else None
+        return SegmentTimeline.from_runs(
+            media, track.runs, initialization=initialization, start_number=start_number,
+            end_time=manifest.get_end_time(track))
+
+    def get_mpd_timeline(self, base_url, mpd_xml):
+        """Parses MPD XML file into a SegmentTimeline of the video segments.
+        Segment URLs are only built when they get accessed.
+
+        Arguments:
+            base_url {string} -- URL that points to ism file on USO.
+            mpd_xml {dict} -- Dict representation of MPD XML file or Manifest
+                              returned by get_mpd_manifest.
+
+        Returns:
+            SegmentTimeline -- Timeline of the video segments, None if parsing failed.
         """
 
         try:
+            if isinstance(mpd_xml, Manifest):
+                return self.__get_manifest_timeline(base_url, mpd_xml)
+
             extension_url = mpd_xml['MPD']['Period']['BaseURL']
             adaptation_sets = mpd_xml['MPD']['Period']['AdaptationSet']
-            segment_urls = list()
 
             for adaptation_set in adaptation_sets:
                 if 'video' in adaptation_set['@contentType']:
                     initial_url = adaptation_set['SegmentTemplate']['@initialization']
                     media_url = adaptation_set['SegmentTemplate']['@media']
                     seg_time_lines = adaptation_set['SegmentTemplate']['SegmentTimeline']['S']
+                    start_number = int(adaptation_set['SegmentTemplate'].get('@startNumber', 1))
+                    timescale = int(adaptation_set['SegmentTemplate'].get('@timescale', 1))
+                    offset = int(
+                        adaptation_set['SegmentTemplate'].get('@presentationTimeOffset', 0))
                     video_id = adaptation_set['Representation']['@id']
+                    bandwidth = adaptation_set['Representation'].get('@bandwidth', '')
 
-            segment_urls.append(
-                self.__build_mpd_segment_url(base_url, extension_url, initial_url, video_id))
-
-            next_step = 0
-            for seg_time_line in seg_time_lines[:-1]:
-                if '@t' in seg_time_line:
-                    segment_urls.append(
-                        self.__build_mpd_segment_url(
-                            base_url, extension_url, media_url, video_id, seg_time_line['@t']
-                            )
-                        )
-                if '@r' in seg_time_line:
-                    for repetition in range(int(seg_time_line['@r'])+1):
-                        next_step = next_step + int(seg_time_line['@d'])
-                        segment_urls.append(self.__build_mpd_segment_url(
-                                base_url, extension_url, media_url, video_id, next_step))
-                else:
-                    next_step = next_step + int(seg_time_line['@d'])
-                    segment_urls.append(self.__build_mpd_segment_url(
-                                base_url, extension_url, media_url, video_id, next_step))
-            return segment_urls
+            initialization, media = self.__compile_mpd_templates(
+                base_url, extension_url, initial_url, media_url, video_id, bandwidth)
+            start_number = start_number if media.variable == 'Number' else None
+            end_time = get_timeline_end(
+                _get_attributes(mpd_xml['MPD']), _get_attributes(mpd_xml['MPD']['Period']),
+                timescale, offset)
+            return SegmentTimeline.from_elements(
+                media, seg_time_lines, initialization=initialization, start_number=start_number,
+                end_time=end_time)
         except:
             logger.warning('Could not generate dash segments.')
             logger.debug('', exc_info=True)
+            self.metrics.incr('dash_errors')
+            # a manifest that could not be fetched is already reported
+            if mpd_xml:
+                self.failures.add('dash', base_url, 'expand', sys.exc_info()[1])
+            return None
+
+    def get_mpd_timelines(self, base_url, mpd_manifest, content_types=None):
+        """Creates a SegmentTimeline for every representation of every AdaptationSet.
+        Representations of the same AdaptationSet share their runs, so segment
+        start times are computed once per SegmentTimeline.
+
+        Arguments:
+            base_url {string} -- URL that points to ism file on USO.
+            mpd_manifest {Manifest} -- MPD returned by get_mpd_manifest.
+
+        Keyword Arguments:
+            content_types {list} -- Only use AdaptationSets whose content type contains
+                                    one of these, e.g. ['video', 'audio'], None uses
+                                    all (default: {None})
+
+        Returns:
+            list -- List of SegmentTimeline objects in document order, empty if parsing failed.
+        """
+
+        try:
+            timelines = list()
+            for track in mpd_manifest.tracks:
+                if content_types and not any(
+                        content_type in track.content_type for content_type in content_types):
+                    continue
+
+                shared = None
+                for representation in track.representations:
+                    initialization, media = self.__compile_mpd_templates(
+                        base_url, mpd_manifest.base_url, track.initialization, track.media,
+                        representation['id'], representation['bandwidth'])
+                    start_number = track.start_number if media.variable == 'Number' else None
+                    if shared is None:
+                        shared = SegmentTimeline.from_runs(
+                            media, track.runs, initialization=initialization,
+                            start_number=start_number, end_time=mpd_manifest.get_end_time(track))
+                        timelines.append(shared)
+                    else:
+                        timelines.append(shared.share(media, initialization, start_number))
+            return timelines
+        except:
+            logger.warning('Could not generate dash segments.')
+            logger.debug('', exc_info=True)
+            self.metrics.incr('dash_errors')
+            self.failures.add('dash', base_url, 'expand', sys.exc_info()[1])
             return []
+
+    def get_mpd_segment_urls(self, base_url, mpd_xml):
+        """Parses MPD XML file to get all information to create segment URLs
+        to call for performance testing.
+
+        Arguments:
+            base_url {string} -- URL that points to ism file on USO.
+            mpd_xml {dict} -- Dict representation of MPD XML file or Manifest
+                              returned by get_mpd_manifest.
+
+        Returns:
+            list -- List of Segment URLS to use in performance testing tool.
+        """
+
+        mpd_timeline = self.get_mpd_timeline(base_url, mpd_xml)
+        if mpd_timeline is None:
+            return []
+
+        with self.metrics.timer('dash_expand'):
+            return timeline.expand_timelines([mpd_timeline])
+
+    def follow_mpd_segment_urls(self, base_url, all_tracks=False, sleep=time.sleep, max_polls=None):
+        """Follows a live MPD and yields only the segments added since the last refresh.
+        The MPD is refreshed every minimumUpdatePeriod, or every segment duration if
+        it has none. A static MPD is read once.
+
+        Arguments:
+            base_url {string} -- URL that points to ism file on USO.
+
+        Keyword Arguments:
+            all_tracks {bool} -- Follow every representation instead of a single
+                                 video rendition (default: {False})
+            sleep {callable} -- Called with the seconds to wait between refreshes
+                                (default: {time.sleep})
+            max_polls {int} -- Stop after max_polls refreshes, None follows until the
+                               MPD becomes static (default: {None})
+
+        Yields:
+            string -- Segment URL, initialization segments first
+        """
+
+        mpd_url = self.get_callable_url(base_url)
+        cursor = live.TimelineCursor()
+        state = {'interval': live.MIN_INTERVAL}
+
+        def poll():
+            mpd_manifest = self.get_mpd_manifest(mpd_url)
+            if mpd_manifest is None:
+                return [], state['interval']
+
+            if all_tracks:
+                timelines = self.get_mpd_timelines(base_url, mpd_manifest)
+            else:
+                timelines = [self.get_mpd_timeline(base_url, mpd_manifest)]
+            with self.metrics.timer('dash_expand'):
+                segment_urls = cursor.advance_all(
+                    [mpd_timeline for mpd_timeline in timelines if mpd_timeline is not None])
+
+            if mpd_manifest.attributes.get('type') != 'dynamic':
+                return segment_urls, None
+            interval = parse_duration(mpd_manifest.attributes.get('minimumUpdatePeriod'))
+            if not interval:
+                interval = live.get_fragment_duration(mpd_manifest)
+            if interval:
+                state['interval'] = interval
+            return segment_urls, state['interval']
+
+        return live.follow(poll, sleep, max_polls)
@@ -0,0 +1,89 @@
+import logging
+
+from .templates import CompiledTemplate
+from .timeline import SegmentTimeline
+
+logger = logging.getLogger(__name__)
+
+
+def rewrite_url(url, primary, endpoint):
+    """Moves an URL generated for the primary endpoint to another endpoint.
+
+    Arguments:
+        url {string} -- URL starting with primary
+        primary {string} -- Endpoint the URL was generated for
+        endpoint {string} -- Endpoint to move the URL to
+
+    Returns:
+        string -- Rewritten URL, url itself if it does not start with primary,
+                  e.g. after a redirect to another host
+    """
+
+    if url.startswith(primary):
+        return endpoint + url[len(primary):]
+    return url
+
+
+def rewrite_urls(urls, primary, endpoint):
+    """Moves URLs generated for the primary endpoint to another endpoint with one
+    slice and concatenation per URL, nothing gets expanded again.
+
+    Arguments:
+        urls {list} -- URLs starting with primary
+        primary {string} -- Endpoint the URLs were generated for
+        endpoint {string} -- Endpoint to move the URLs to
+
+    Returns:
+        list -- Rewritten URLs, see rewrite_url
+    """
+
+    if endpoint == primary:
+        return urls
+    length = len(primary)
+    return [endpoint + url[length:] if url.startswith(primary) else url for url in urls]
+
+
+def rewrite_timeline(segment_timeline, primary, endpoint):
+    """Moves a timeline generated for the primary endpoint to another endpoint.
+    SegmentTimelines with compiled templates share their runs with the returned
+    timeline, only the template prefix is swapped.
+
+    Arguments:
+        segment_timeline {object} -- SegmentTimeline or list of segment URLs
+        primary {string} -- Endpoint the timeline was generated for
+        endpoint {string} -- Endpoint to move the timeline to
+
+    Returns:
+        object -- SegmentTimeline or list of segment URLs
+    """
+
+    if endpoint == primary:
+        return segment_timeline
+    if not isinstance(segment_timeline, SegmentTimeline):
+        return rewrite_urls(segment_timeline, primary, endpoint)
+
+    builder = segment_timeline.url_builder
+    if isinstance(builder, CompiledTemplate):
+        url_builder = builder.with_prefix(rewrite_url(builder.prefix, primary, endpoint))
+    else:
+        def url_builder(value):
+            return rewrite_url(builder(value), primary, endpoint)
+    initialization = segment_timeline.initialization
+    if initialization is not None:
+        initialization = rewrite_url(initialization, primary, endpoint)
+    return segment_timeline.share(url_builder, initialization, segment_timeline.start_number)
+
+
+def interleave(url_lists):
+    """Merges lists of the same length segment by segment.
+
+    Arguments:
+        url_lists {list} -- Lists of URLs, e.g. one per endpoint
+
+    Returns:
+        list -- First URL of every list, then the second of every list, ...
+    """
+
+    if len(url_lists) == 1:
+        return list(url_lists[0])
+    return [url for urls in zip(*url_lists) for url in urls]
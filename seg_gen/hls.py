@@ -1,11 +1,12 @@
-import m3u8
 import logging
 import sys
+import time
+from . import hls_parser
+from . import live
+from .transport import Transport
+from .metrics import NULL_METRICS, timed_parse
+from .resilience import FailureReport
 
-logging.basicConfig(
-    level=logging.ERROR,
-    format='%(levelname)s: %(asctime)s - %(funcName)s at %(lineno)d %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
@@ -21,6 +22,26 @@ class Hls():
     mpd_segment_urls = hsl_client.get_mpd_segment_urls(base_url, mpd_xml)
     """
 
+    def __init__(self, transport=None, metrics=None, failures=None):
+        """Init method
+
+        Keyword Arguments:
+            transport {Transport} -- Shared HTTP transport used to load playlists,
+                                     a new one is created if omitted (default: {None})
+            metrics {MetricsCollector} -- Hook that records stage durations and
+                                          counters (default: {None})
+            failures {FailureReport} -- Report of the playlists that could not be fetched
+                                        or expanded (default: {None})
+        """
+
+        self.metrics = metrics or NULL_METRICS
+        self.failures = failures
+        if self.failures is None:
+            self.failures = FailureReport()
+        self.transport = transport
+        if self.transport is None:
+            self.transport = Transport(metrics=self.metrics)
+
     def get_master_url(self, base_url):
         """""Builds URL to fetch .m3u8 file
 
@@ -38,6 +59,23 @@ class Hls():
             logger.debug('', exc_info=True)
             sys.exit(127)
 
+    def load_playlist(self, playlist_url):
+        """Loads and parses a master or media playlist with the fast path of hls_parser.
+
+        Arguments:
+            playlist_url {string} -- URL of the playlist
+
+        Returns:
+            hls_parser.Playlist -- Parsed playlist, segment URIs are absolute
+
+        Raises:
+            requests.HTTPError -- Status code is not 200
+        """
+
+        final_url, chunks = self.transport.open_stream(playlist_url)
+        return timed_parse(
+            lambda lines: hls_parser.parse_playlist(lines, final_url), chunks, self.metrics, 'hls')
+
     def get_video_playlist(self, master_url):
         """Returns playlist with video and audio content
 
@@ -45,35 +83,124 @@ class Hls():
             master_url {string} -- URL where to fetch the playlists. Mostly ends with /.m3u8.
 
         Returns:
-            playlist object -- Video playlist object used to fetch segment URIs
+            hls_parser.PlaylistEntry -- Video playlist with uri and absolute_uri used to
+                                        fetch segment URIs, None if there is none
         """
         try:
-            m3u8_obj = m3u8.load(master_url)
-            if m3u8_obj.is_variant:
-                for playlist in m3u8_obj.playlists:
-                    if 'video' in playlist.uri and playlist.stream_info.resolution is not None:
-                        return playlist
+            final_url, chunks = self.transport.open_stream(master_url)
+            return hls_parser.select_variant(
+                chunks, final_url,
+                lambda playlist: 'video' in playlist.uri and playlist.resolution is not None)
         except:
             logger.warning('Could not get video playlist out of m3u8 URL.')
             logger.debug('', exc_info=True)
+            self.metrics.incr('hls_errors')
+            self.failures.add('hls', master_url, 'fetch', sys.exc_info()[1])
             return ''
 
+    def get_playlists(self, master_url):
+        """Returns all variant and rendition playlists of a master playlist.
+
+        Arguments:
+            master_url {string} -- URL where to fetch the playlists. Mostly ends with /.m3u8.
+
+        Returns:
+            list -- hls_parser.PlaylistEntry objects with unique URIs in order of the
+                    master playlist
+        """
+        try:
+            master_playlist = self.load_playlist(master_url)
+            playlists = list()
+            seen = set()
+            for playlist in master_playlist.playlists + master_playlist.media:
+                if playlist.uri and playlist.absolute_uri not in seen:
+                    seen.add(playlist.absolute_uri)
+                    playlists.append(playlist)
+            return playlists
+        except:
+            logger.warning('Could not get playlists out of m3u8 URL.')
+            logger.debug('', exc_info=True)
+            self.metrics.incr('hls_errors')
+            self.failures.add('hls', master_url, 'fetch', sys.exc_info()[1])
+            return []
+
     def get_segments(self, sub_playlist):
         """Returns all segment URIs used to load test USO server with.
 
         Arguments:
-            sub_playlist {playlist object} -- Playlist object with segment URIs in.
+            sub_playlist {playlist object} -- Playlist object with an absolute_uri, e.g.
+                                              returned by get_video_playlist.
 
         Returns:
             list -- List of segment URIs
         """
         try:
-            loaded_sub_playlist = m3u8.load(sub_playlist.absolute_uri)
-            segment_uris = list()
-            for segment in loaded_sub_playlist.segments:
-                segment_uris.append(segment.absolute_uri)
-            return segment_uris
+            return self.load_playlist(sub_playlist.absolute_uri).segment_uris
         except:
             logger.warning('Could not generate segments, maybe playlist generation failed.')
             logger.debug('', exc_info=True)
+            self.metrics.incr('hls_errors')
+            # a failed get_video_playlist is already reported
+            if sub_playlist:
+                self.failures.add('hls', sub_playlist.absolute_uri, 'fetch', sys.exc_info()[1])
             return []
+
+    def follow_segments(self, master_url, all_tracks=False, sleep=time.sleep, max_polls=None):
+        """Follows the media playlists of a live master playlist and yields only the
+        segments added since the last reload, tracked by EXT-X-MEDIA-SEQUENCE.
+        Playlists are reloaded every EXT-X-TARGETDURATION, after half of it if
+        nothing changed, and followed until all of them have EXT-X-ENDLIST.
+
+        Arguments:
+            master_url {string} -- URL where to fetch the playlists. Mostly ends with /.m3u8.
+
+        Keyword Arguments:
+            all_tracks {bool} -- Follow every variant and rendition playlist instead of
+                                 the video playlist (default: {False})
+            sleep {callable} -- Called with the seconds to wait between reloads
+                                (default: {time.sleep})
+            max_polls {int} -- Stop after max_polls reloads, None follows until the
+                               playlists end (default: {None})
+
+        Yields:
+            string -- Segment URI
+        """
+
+        if all_tracks:
+            playlists = self.get_playlists(master_url)
+        else:
+            playlists = [playlist for playlist in [self.get_video_playlist(master_url)]
+                         if playlist]
+        playlist_uris = [playlist.absolute_uri for playlist in playlists]
+        next_sequences = dict()
+        state = {'interval': live.MIN_INTERVAL}
+
+        def poll():
+            segment_uris = list()
+            ended = True
+            target_duration = None
+            for playlist_uri in playlist_uris:
+                try:
+                    media_playlist = self.load_playlist(playlist_uri)
+                except:
+                    logger.warning('Could not reload playlist %s.', playlist_uri)
+                    logger.debug('', exc_info=True)
+                    self.metrics.incr('hls_errors')
+                    self.failures.add('hls', playlist_uri, 'fetch', sys.exc_info()[1])
+                    ended = False
+                    continue
+
+                first_sequence = media_playlist.media_sequence
+                skip = max(0, next_sequences.get(playlist_uri, first_sequence) - first_sequence)
+                segment_uris.extend(media_playlist.segment_uris[skip:])
+                next_sequences[playlist_uri] = first_sequence + len(media_playlist.segment_uris)
+                ended = ended and media_playlist.is_endlist
+                target_duration = media_playlist.target_duration or target_duration
+
+            if ended:
+                return segment_uris, None
+            if target_duration:
+                state['interval'] = target_duration if segment_uris else target_duration / 2.0
+            return segment_uris, state['interval']
+
+        return live.follow(poll, sleep, max_polls)
@@ -0,0 +1,303 @@
+import logging
+import re
+from urllib.parse import urljoin
+
+logger = logging.getLogger(__name__)
+
+# Low latency and delta playlists are left to the m3u8 package
+FALLBACK_TAGS = ('#EXT-X-PART:', '#EXT-X-PRELOAD-HINT:', '#EXT-X-SKIP:')
+
+_ATTRIBUTE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+class PlaylistEntry():
+    """Variant stream or rendition of a master playlist.
+
+    Attributes:
+        uri {string} -- URI as written in the master playlist
+        absolute_uri {string} -- URI resolved against the master playlist URL
+        bandwidth {int} -- BANDWIDTH of a variant stream, None for renditions
+        resolution {tuple} -- (width, height) of a variant stream, None if not given
+        media_type {string} -- TYPE of a rendition, None for variant streams
+    """
+
+    def __init__(self, uri, absolute_uri, bandwidth=None, resolution=None, media_type=None):
+        self.uri = uri
+        self.absolute_uri = absolute_uri
+        self.bandwidth = bandwidth
+        self.resolution = resolution
+        self.media_type = media_type
+
+    def __repr__(self):
+        return '<PlaylistEntry {}>'.format(self.uri)
+
+
+class Playlist():
+    """Data of a master or media playlist needed to generate segment URLs.
+
+    Attributes:
+        is_variant {bool} -- True for master playlists
+        playlists {list} -- PlaylistEntry of every variant stream
+        media {list} -- PlaylistEntry of every rendition with an URI
+        segment_uris {list} -- Absolute URIs of the segments of a media playlist
+        media_sequence {int} -- EXT-X-MEDIA-SEQUENCE, 0 if not given
+        target_duration {float} -- EXT-X-TARGETDURATION, None if not given
+        is_endlist {bool} -- True if the playlist has EXT-X-ENDLIST
+    """
+
+    def __init__(self):
+        self.is_variant = False
+        self.playlists = list()
+        self.media = list()
+        self.segment_uris = list()
+        self.media_sequence = 0
+        self.target_duration = None
+        self.is_endlist = False
+
+    @classmethod
+    def from_m3u8(cls, m3u8_obj):
+        """Creates a Playlist out of a playlist parsed by the m3u8 package.
+
+        Arguments:
+            m3u8_obj {m3u8.M3U8} -- Parsed playlist
+
+        Returns:
+            Playlist -- Playlist with the same URIs
+        """
+
+        playlist = cls()
+        playlist.is_variant = m3u8_obj.is_variant
+        for variant in m3u8_obj.playlists:
+            playlist.playlists.append(PlaylistEntry(
+                variant.uri, variant.absolute_uri, variant.stream_info.bandwidth,
+                variant.stream_info.resolution))
+        for media in m3u8_obj.media:
+            if media.uri:
+                playlist.media.append(PlaylistEntry(
+                    media.uri, media.absolute_uri, media_type=media.type))
+        # Segments of low latency playlists that only consist of parts have no URI yet
+        playlist.segment_uris = [
+            segment.absolute_uri for segment in m3u8_obj.segments if segment.uri]
+        playlist.media_sequence = m3u8_obj.media_sequence or 0
+        playlist.target_duration = m3u8_obj.target_duration
+        playlist.is_endlist = m3u8_obj.is_endlist
+        return playlist
+
+    def __repr__(self):
+        return '<Playlist variant={} playlists={} segments={}>'.format(
+            self.is_variant, len(self.playlists), len(self.segment_uris))
+
+
+class _FallbackRequired(Exception):
+    """Raised by the fast path for playlists it does not support."""
+
+
+def _iter_lines(chunks):
+    """Splits chunks of a playlist into stripped lines while they are downloaded.
+
+    Arguments:
+        chunks {iterable} -- Chunks of the body as bytes
+
+    Yields:
+        string -- Line without line break
+    """
+
+    pending = b''
+    for chunk in chunks:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line.decode('utf-8').strip()
+    if pending:
+        yield pending.decode('utf-8').strip()
+
+
+def _parse_attributes(line):
+    """Returns the attribute list of a tag line as dict, quotes are removed.
+
+    Arguments:
+        line {string} -- Tag line, e.g. #EXT-X-STREAM-INF:BANDWIDTH=400000
+
+    Returns:
+        dict -- Attribute names and values
+    """
+
+    attributes = line.split(':', 1)[1]
+    return {name: value.strip('"') for name, value in _ATTRIBUTE.findall(attributes)}
+
+
+def _parse_resolution(resolution):
+    """Converts a RESOLUTION attribute to a (width, height) tuple.
+
+    Arguments:
+        resolution {string} -- e.g. 1280x720
+
+    Returns:
+        tuple -- (width, height), None if resolution is not given
+    """
+
+    if not resolution:
+        return None
+    width, height = resolution.lower().split('x')
+    return int(width), int(height)
+
+
+def _create_resolver(uri):
+    """Creates a function that resolves URIs against uri. The base directory is
+    computed once and plain relative URIs are resolved by concatenation.
+
+    Arguments:
+        uri {string} -- URL of the playlist
+
+    Returns:
+        callable -- Function that returns the absolute URI of a playlist URI
+    """
+
+    base = urljoin(uri, '.')
+
+    def resolve(relative_uri):
+        if relative_uri[0] in './?#' or ':' in relative_uri:
+            return urljoin(base, relative_uri)
+        return base + relative_uri
+
+    return resolve
+
+
+def _parse_lines(lines, uri, select=None):
+    """Fast path that parses playlist lines, skipping all tags it does not need.
+
+    Arguments:
+        lines {iterator} -- Lines of the playlist
+        uri {string} -- URL of the playlist
+
+    Keyword Arguments:
+        select {callable} -- Return the first variant stream for which select
+                             returns True instead of parsing the whole playlist
+                             (default: {None})
+
+    Returns:
+        Playlist -- Parsed playlist, or the selected PlaylistEntry
+
+    Raises:
+        _FallbackRequired -- Playlist is not supported by the fast path
+    """
+
+    if next(lines, '').lstrip('\ufeff') != '#EXTM3U':
+        raise _FallbackRequired('missing #EXTM3U')
+
+    resolve = _create_resolver(uri)
+    playlist = Playlist()
+    segment_uris = playlist.segment_uris
+    stream_info = None
+
+    for line in lines:
+        if not line:
+            continue
+        if line[0] != '#':
+            if stream_info is None:
+                segment_uris.append(resolve(line))
+                continue
+            entry = PlaylistEntry(
+                line, resolve(line), int(stream_info.get('BANDWIDTH', 0)) or None,
+                _parse_resolution(stream_info.get('RESOLUTION')))
+            stream_info = None
+            if select is not None and select(entry):
+                return entry
+            playlist.playlists.append(entry)
+        elif line.startswith('#EXTINF') or not line.startswith('#EXT-X-'):
+            continue
+        elif line.startswith('#EXT-X-STREAM-INF:'):
+            playlist.is_variant = True
+            stream_info = _parse_attributes(line)
+        elif line.startswith('#EXT-X-MEDIA:'):
+            media = _parse_attributes(line)
+            if media.get('URI'):
+                playlist.media.append(PlaylistEntry(
+                    media['URI'], resolve(media['URI']), media_type=media.get('TYPE')))
+        elif line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            playlist.media_sequence = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-TARGETDURATION:'):
+            playlist.target_duration = float(line.split(':', 1)[1])
+        elif line == '#EXT-X-ENDLIST':
+            playlist.is_endlist = True
+        elif line.startswith(FALLBACK_TAGS):
+            raise _FallbackRequired(line.split(':', 1)[0])
+
+    if select is not None:
+        return None
+    return playlist
+
+
+def _parse(chunks, uri, select):
+    """Helper method that runs the fast path and falls back to the m3u8 package.
+
+    Arguments:
+        chunks {iterable} -- Chunks of the body as bytes
+        uri {string} -- URL of the playlist
+        select {callable} -- See _parse_lines
+
+    Returns:
+        Playlist -- Parsed playlist, or the selected PlaylistEntry
+    """
+
+    received = list()
+
+    def record():
+        for chunk in chunks:
+            received.append(chunk)
+            yield chunk
+
+    recorded = record()
+    try:
+        result = _parse_lines(_iter_lines(recorded), uri, select)
+    except _FallbackRequired as error:
+        logger.debug('Parsing %s with m3u8, fast path does not support %s.', uri, error)
+        result = _FallbackRequired
+
+    # Reading the rest releases the connection to the pool and fills the manifest cache
+    for _ in recorded:
+        pass
+    if result is not _FallbackRequired:
+        return result
+
+    import m3u8
+    playlist = Playlist.from_m3u8(m3u8.loads(b''.join(received).decode('utf-8'), uri=uri))
+    if select is None:
+        return playlist
+    for entry in playlist.playlists:
+        if select(entry):
+            return entry
+    return None
+
+
+def parse_playlist(chunks, uri):
+    """Parses a master or media playlist while it is downloaded.
+    Only URIs, EXT-X-STREAM-INF, EXT-X-MEDIA, EXT-X-MEDIA-SEQUENCE,
+    EXT-X-TARGETDURATION and EXT-X-ENDLIST are read. Playlists with low latency
+    or delta update tags or without #EXTM3U are parsed with the m3u8 package.
+
+    Arguments:
+        chunks {iterable} -- Chunks of the body as bytes
+        uri {string} -- URL of the playlist after redirects
+
+    Returns:
+        Playlist -- Parsed playlist
+    """
+
+    return _parse(chunks, uri, None)
+
+
+def select_variant(chunks, uri, select):
+    """Returns the first variant stream of a master playlist for which select
+    returns True. Parsing stops at the match.
+
+    Arguments:
+        chunks {iterable} -- Chunks of the body as bytes
+        uri {string} -- URL of the playlist after redirects
+        select {callable} -- Called with every PlaylistEntry of the variant streams
+
+    Returns:
+        PlaylistEntry -- Selected variant stream, None if none matches
+    """
+
+    return _parse(chunks, uri, select)
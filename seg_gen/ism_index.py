@@ -0,0 +1,143 @@
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class IsmIndex():
+    """Persistent local index of the .ism keys of a bucket and prefix.
+    The library only grows, so a refresh only lists keys after the last known key
+    (StartAfter). Keys that sort before the last known key are only found by a
+    full reconcile, which also removes deleted keys.
+    Example:
+
+    from seg_gen import ism_index, s3_ism_urls
+    index = ism_index.IsmIndex('/tmp/isms.sqlite', 'my-bucket', prefix='vod/')
+    index.refresh(s3_ism_urls.IsmUrls())
+    keys = list(index.get_keys())
+    """
+
+    def __init__(self, path, bucket, prefix=''):
+        """Init method
+
+        Arguments:
+            path {string} -- Path of the SQLite file that stores the index
+            bucket {string} -- Name of AWS S3 bucket
+
+        Keyword Arguments:
+            prefix {string} -- Key prefix the index covers (default: {''})
+        """
+
+        self.path = path
+        self.bucket = bucket
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS isms ('
+            'bucket TEXT, prefix TEXT, key TEXT, etag TEXT, last_modified TEXT, '
+            'PRIMARY KEY (bucket, prefix, key))'
+            )
+        self._db.commit()
+
+    def __upsert(self, objects):
+        """Helper method that stores S3 objects in the index.
+
+        Arguments:
+            objects {iterable} -- S3 objects with Key, ETag and LastModified
+
+        Returns:
+            set -- Keys of the stored objects
+        """
+
+        keys = set()
+        rows = list()
+        for obj in objects:
+            last_modified = obj.get('LastModified')
+            if hasattr(last_modified, 'isoformat'):
+                last_modified = last_modified.isoformat()
+            rows.append((self.bucket, self.prefix, obj['Key'], obj.get('ETag'), last_modified))
+            keys.add(obj['Key'])
+        self._db.executemany('INSERT OR REPLACE INTO isms VALUES (?, ?, ?, ?, ?)', rows)
+        return keys
+
+    def last_key(self):
+        """Returns the last known key in S3 order.
+
+        Returns:
+            string -- Last key, None if the index is empty
+        """
+
+        with self._lock:
+            return self._db.execute(
+                'SELECT MAX(key) FROM isms WHERE bucket = ? AND prefix = ?',
+                (self.bucket, self.prefix)
+                ).fetchone()[0]
+
+    def refresh(self, s3_ism_obj, full=False):
+        """Adds new keys of the bucket to the index.
+
+        Arguments:
+            s3_ism_obj {IsmUrls} -- Object used to list the bucket
+
+        Keyword Arguments:
+            full {bool} -- List the whole prefix, update changed keys and remove
+                           deleted ones instead of only listing keys after the
+                           last known key (default: {False})
+
+        Returns:
+            int -- Number of keys listed from S3
+        """
+
+        start_after = None if full else self.last_key()
+        objects = s3_ism_obj.get_matching_s3_objects(
+            self.bucket, self.prefix, start_after=start_after)
+
+        with self._lock:
+            listed = self.__upsert(objects)
+            if full:
+                known = self._db.execute(
+                    'SELECT key FROM isms WHERE bucket = ? AND prefix = ?',
+                    (self.bucket, self.prefix))
+                deleted = [(self.bucket, self.prefix, key) for (key,) in known if key not in listed]
+                self._db.executemany(
+                    'DELETE FROM isms WHERE bucket = ? AND prefix = ? AND key = ?', deleted)
+            self._db.commit()
+
+        logger.debug('Listed %d ism keys after %s.', len(listed), start_after)
+        return len(listed)
+
+    def get_keys(self, count=-1, start_after=None):
+        """Yields the indexed keys in S3 order.
+
+        Keyword Arguments:
+            count {int} -- Number of keys, -1 yields all (default: {-1})
+            start_after {string} -- Only yield keys after this key (default: {None})
+
+        Yields:
+            string -- AWS S3 bucket key of .ism-files
+        """
+
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT key FROM isms WHERE bucket = ? AND prefix = ? AND key > ? '
+                'ORDER BY key LIMIT ?',
+                (self.bucket, self.prefix, start_after or '', count)
+                ).fetchall()
+        for (key,) in rows:
+            yield key
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(
+                'SELECT COUNT(*) FROM isms WHERE bucket = ? AND prefix = ?',
+                (self.bucket, self.prefix)
+                ).fetchone()[0]
+
+    def close(self):
+        """Closes the underlying SQLite connection.
+        """
+
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,112 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Lower bound of the poll interval, protects USO from manifests with tiny durations
+MIN_INTERVAL = 0.5
+
+
+def get_fragment_duration(manifest):
+    """Returns the duration of the last segment of the first video track of a manifest.
+
+    Arguments:
+        manifest {Manifest} -- Parsed DASH or Smooth manifest
+
+    Returns:
+        float -- Duration in seconds, None if the manifest has no segments
+    """
+
+    tracks = manifest.get_tracks('video') or manifest.tracks
+    for track in tracks:
+        if track.runs:
+            return float(track.runs[-1][1]) / track.timescale
+    return None
+
+
+class TimelineCursor():
+    """Remembers the last segment start time emitted per timeline, so every
+    refresh of a live manifest only expands the segments appended since.
+    Example:
+
+    from seg_gen import live
+    cursor = live.TimelineCursor()
+    segments = cursor.advance('video', first_timeline)   # initialization and all segments
+    segments = cursor.advance('video', second_timeline)  # only new segments
+    """
+
+    def __init__(self):
+        self._positions = dict()
+
+    def advance(self, key, segment_timeline):
+        """Returns the segment URLs of segment_timeline after the last position of key.
+        Costs O(log runs + new segments), the initialization segment is only returned
+        on the first call.
+
+        Arguments:
+            key {object} -- Identifies the timeline across refreshes
+            segment_timeline {SegmentTimeline} -- Timeline of the current manifest
+
+        Returns:
+            list -- New segment URLs
+        """
+
+        if not len(segment_timeline):
+            return []
+
+        segment_urls = list()
+        last_time = self._positions.get(key)
+        if last_time is None:
+            if segment_timeline.initialization is not None:
+                segment_urls.append(segment_timeline.initialization)
+            new_segments = segment_timeline
+        else:
+            new_segments = segment_timeline[segment_timeline.index_after(last_time):]
+
+        self._positions[key] = segment_timeline.time(-1)
+        segment_urls.extend(new_segments.expand())
+        return segment_urls
+
+    def advance_all(self, timelines):
+        """Calls advance for every timeline, keyed by position and initialization URL.
+
+        Arguments:
+            timelines {list} -- List of SegmentTimeline objects in manifest order
+
+        Returns:
+            list -- New segment URLs of all timelines
+        """
+
+        segment_urls = list()
+        for position, segment_timeline in enumerate(timelines):
+            segment_urls.extend(
+                self.advance((position, segment_timeline.initialization), segment_timeline))
+        return segment_urls
+
+
+def follow(poll, sleep=time.sleep, max_polls=None):
+    """Calls poll repeatedly and yields the segments it returns.
+
+    Arguments:
+        poll {callable} -- Returns (new segment URLs, seconds until the next poll),
+                           stops following if the seconds are None
+
+    Keyword Arguments:
+        sleep {callable} -- Called with the seconds to wait between polls (default: {time.sleep})
+        max_polls {int} -- Stop after max_polls polls, None follows until the
+                           manifest ends (default: {None})
+
+    Yields:
+        string -- Segment URL
+    """
+
+    polls = 0
+    while True:
+        segment_urls, interval = poll()
+        polls += 1
+        for segment_url in segment_urls:
+            yield segment_url
+        if interval is None or (max_polls is not None and polls >= max_polls):
+            return
+        logger.debug('Next manifest refresh in %.2f seconds.', interval)
+        sleep(max(interval, MIN_INTERVAL))
@@ -0,0 +1,358 @@
+import datetime
+import logging
+import re
+import time
+from xml.parsers import expat
+
+logger = logging.getLogger(__name__)
+
+_DURATION = re.compile(
+    r'^(-)?P(?:([\d.]+)Y)?(?:([\d.]+)M)?(?:([\d.]+)W)?(?:([\d.]+)D)?'
+    r'(?:T(?:([\d.]+)H)?(?:([\d.]+)M)?(?:([\d.]+)S)?)?$')
+# Seconds of the fields of _DURATION, years and months as 365 and 30 days
+_DURATION_SECONDS = (365 * 86400, 30 * 86400, 7 * 86400, 86400, 3600, 60, 1)
+
+
+def parse_duration(text):
+    """Converts an ISO 8601 duration as used by MPD attributes, e.g. PT1H2M3.5S, to seconds.
+
+    Arguments:
+        text {string} -- Duration, e.g. MPD@mediaPresentationDuration
+
+    Returns:
+        float -- Seconds, None if text is None or no ISO 8601 duration
+    """
+
+    text = (text or '').strip()
+    match = _DURATION.match(text)
+    if match is None or text.endswith(('P', 'T')):
+        return None
+    seconds = sum(float(value) * factor
+                  for value, factor in zip(match.groups()[1:], _DURATION_SECONDS) if value)
+    return -seconds if match.group(1) else seconds
+
+
+def parse_datetime(text):
+    """Converts an xs:dateTime like 2020-01-01T00:00:00Z to seconds since the epoch.
+
+    Arguments:
+        text {string} -- Date and time, UTC if it has no time zone
+
+    Returns:
+        float -- Seconds since the epoch
+    """
+
+    text = text.strip()
+    if text.endswith('Z'):
+        text = text[:-1] + '+00:00'
+    value = datetime.datetime.fromisoformat(text)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.timestamp()
+
+
+def get_period_end(mpd_attributes, period_attributes, now=None):
+    """Returns the length of a Period, used to expand a negative @r of the last S.
+    The length is Period@duration, else MPD@mediaPresentationDuration minus
+    Period@start, else for dynamic MPDs the time since the Period started.
+
+    Arguments:
+        mpd_attributes {dict} -- Attributes of the MPD element
+        period_attributes {dict} -- Attributes of the Period element
+
+    Keyword Arguments:
+        now {float} -- Current time in seconds since the epoch (default: {time.time()})
+
+    Returns:
+        float -- Seconds from the start of the Period to its end, None if unknown
+    """
+
+    duration = parse_duration(period_attributes.get('duration'))
+    if duration is not None:
+        return duration
+    start = parse_duration(period_attributes.get('start')) or 0.0
+    total = parse_duration(mpd_attributes.get('mediaPresentationDuration'))
+    if total is not None:
+        return total - start
+    availability_start = mpd_attributes.get('availabilityStartTime')
+    if mpd_attributes.get('type') == 'dynamic' and availability_start:
+        now = time.time() if now is None else now
+        return now - parse_datetime(availability_start) - start
+    return None
+
+
+def get_timeline_end(mpd_attributes, period_attributes, timescale, presentation_time_offset=0,
+                     now=None):
+    """Returns the end of a Period in the time of a SegmentTimeline.
+
+    Arguments:
+        mpd_attributes {dict} -- Attributes of the MPD element
+        period_attributes {dict} -- Attributes of the Period element
+        timescale {int} -- SegmentTemplate@timescale
+
+    Keyword Arguments:
+        presentation_time_offset {int} -- SegmentTemplate@presentationTimeOffset (default: {0})
+        now {float} -- See get_period_end (default: {None})
+
+    Returns:
+        int -- End time, None if the MPD does not say when the Period ends
+    """
+
+    seconds = get_period_end(mpd_attributes, period_attributes, now)
+    if seconds is None:
+        return None
+    return presentation_time_offset + int(round(seconds * timescale))
+
+
+class Track():
+    """Segment information of one DASH AdaptationSet or Smooth StreamIndex.
+
+    Attributes:
+        content_type {string} -- video, audio, text, ...
+        name {string} -- StreamIndex@Name, None for DASH
+        media {string} -- Media URL template (SegmentTemplate@media or StreamIndex@Url)
+        initialization {string} -- Initialization URL template, None for Smooth
+        timescale {int} -- Timescale of the timeline
+        start_number {int} -- Number of the first segment (SegmentTemplate@startNumber)
+        presentation_time_offset {int} -- SegmentTemplate@presentationTimeOffset, the
+                                          time of the start of the Period
+        representations {list} -- Dicts with id and bandwidth of every
+                                  Representation or QualityLevel
+        runs {list} -- List of (t, d, r) tuples, t is None if not given
+    """
+
+    def __init__(self, content_type=''):
+        self.content_type = content_type
+        self.name = None
+        self.media = None
+        self.initialization = None
+        self.timescale = 1
+        self.start_number = 1
+        self.presentation_time_offset = 0
+        self.representations = list()
+        self.runs = list()
+
+    def copy(self):
+        """Returns a copy of the track without representations, sharing its runs.
+
+        Returns:
+            Track -- Copy of the track
+        """
+
+        track = Track(self.content_type)
+        track.name = self.name
+        track.media = self.media
+        track.initialization = self.initialization
+        track.timescale = self.timescale
+        track.start_number = self.start_number
+        track.presentation_time_offset = self.presentation_time_offset
+        track.runs = self.runs
+        return track
+
+    def __repr__(self):
+        return '<Track {} representations={} runs={}>'.format(
+            self.content_type, len(self.representations), len(self.runs))
+
+
+class Manifest():
+    """Data of a DASH or Smooth manifest needed to generate segment URLs.
+
+    Attributes:
+        format {string} -- dash or smooth
+        base_url {string} -- Period BaseURL of DASH manifests, '' for Smooth
+        attributes {dict} -- Attributes of the MPD or SmoothStreamingMedia root element
+        period_attributes {dict} -- Attributes of the first DASH Period
+        tracks {list} -- List of Track objects in document order
+    """
+
+    def __init__(self, manifest_format):
+        self.format = manifest_format
+        self.base_url = ''
+        self.attributes = dict()
+        self.period_attributes = dict()
+        self.tracks = list()
+
+    def get_end_time(self, track, timescale=None, now=None):
+        """Returns the end of the Period in the time of a track, used to expand a
+        negative @r of the last S. Smooth manifests end after their Duration.
+
+        Arguments:
+            track {Track} -- Track of the manifest
+
+        Keyword Arguments:
+            timescale {int} -- Timescale of the returned time (default: {track.timescale})
+            now {float} -- Current time in seconds since the epoch, see get_period_end
+                           (default: {None})
+
+        Returns:
+            int -- End time, None if the manifest does not say when it ends
+        """
+
+        timescale = timescale or track.timescale
+        if self.format == 'smooth':
+            duration = int(self.attributes.get('Duration', 0))
+            if not duration:
+                return None
+            return duration * timescale // int(self.attributes.get('TimeScale', 10000000))
+
+        return get_timeline_end(
+            self.attributes, self.period_attributes, timescale,
+            track.presentation_time_offset * timescale // track.timescale, now)
+
+    def get_tracks(self, content_type):
+        """Returns all tracks whose content type contains content_type.
+
+        Arguments:
+            content_type {string} -- For example video or audio
+
+        Returns:
+            list -- List of matching Track objects
+        """
+
+        return [track for track in self.tracks if content_type in track.content_type]
+
+    def __repr__(self):
+        return '<Manifest {} tracks={}>'.format(self.format, len(self.tracks))
+
+
+def _parse_run(attrib):
+    """Converts the attributes of a S or c element to a (t, d, r) tuple.
+
+    Arguments:
+        attrib {dict} -- Attributes of the element
+
+    Returns:
+        tuple -- (t, d, r), t is None if the element has no t attribute
+    """
+
+    start = attrib.get('t')
+    return (int(start) if start is not None else None, int(attrib['d']), int(attrib.get('r', 0)))
+
+
+class _MpdHandler():
+    """Collects the DASH elements needed for URL generation."""
+
+    def __init__(self):
+        self.manifest = Manifest('dash')
+        self.track = None
+        self.representation_track = None
+
+    def start(self, name, attrib, path):
+        if name == 'S':
+            track = self.representation_track or self.track
+            if track is not None:
+                track.runs.append(_parse_run(attrib))
+        elif name == 'MPD':
+            self.manifest.attributes = dict(attrib)
+        elif name == 'Period' and not self.manifest.period_attributes:
+            self.manifest.period_attributes = dict(attrib)
+        elif name == 'AdaptationSet':
+            content_type = attrib.get('contentType') or attrib.get('mimeType', '')
+            self.track = Track(content_type)
+            self.manifest.tracks.append(self.track)
+        elif name == 'Representation' and self.track is not None:
+            self.track.representations.append(
+                {'id': attrib.get('id'), 'bandwidth': attrib.get('bandwidth')})
+        elif name == 'SegmentTemplate' and self.track is not None:
+            track = self.track
+            if path[-1] == 'Representation':
+                # Representation specific template gets its own track
+                track = self.track.copy()
+                track.runs = list()
+                track.representations.append(self.track.representations.pop())
+                self.manifest.tracks.append(track)
+                self.representation_track = track
+            track.media = attrib.get('media', track.media)
+            track.initialization = attrib.get('initialization', track.initialization)
+            track.timescale = int(attrib.get('timescale', track.timescale))
+            track.start_number = int(attrib.get('startNumber', track.start_number))
+            track.presentation_time_offset = int(
+                attrib.get('presentationTimeOffset', track.presentation_time_offset))
+
+    def end(self, name, text, path):
+        if name == 'BaseURL' and path[-1] == 'Period':
+            self.manifest.base_url = (text or '').strip()
+        elif name == 'Representation':
+            self.representation_track = None
+        elif name == 'AdaptationSet':
+            if not self.track.representations:
+                self.manifest.tracks.remove(self.track)
+            self.track = None
+
+
+class _SmoothHandler():
+    """Collects the Smooth elements needed for URL generation."""
+
+    def __init__(self):
+        self.manifest = Manifest('smooth')
+        self.track = None
+
+    def start(self, name, attrib, path):
+        if name == 'c':
+            if self.track is not None:
+                self.track.runs.append(_parse_run(attrib))
+        elif name == 'SmoothStreamingMedia':
+            self.manifest.attributes = dict(attrib)
+        elif name == 'StreamIndex':
+            self.track = Track(attrib.get('Type', ''))
+            self.track.name = attrib.get('Name')
+            self.track.media = attrib.get('Url')
+            self.track.timescale = int(
+                attrib.get('TimeScale', self.manifest.attributes.get('TimeScale', 10000000)))
+            self.manifest.tracks.append(self.track)
+        elif name == 'QualityLevel' and self.track is not None:
+            self.track.representations.append(
+                {'id': attrib.get('Index'), 'bandwidth': attrib.get('Bitrate')})
+
+    def end(self, name, text, path):
+        if name == 'StreamIndex':
+            self.track = None
+
+
+def parse_manifest(chunks):
+    """Parses a DASH MPD or Smooth manifest incrementally.
+    Elements are handled by expat callbacks while the body is fed chunk by chunk,
+    only the data needed to generate segment URLs is kept and no element tree
+    is built.
+
+    Arguments:
+        chunks {iterable} -- Chunks of the manifest body (bytes)
+
+    Returns:
+        Manifest -- Parsed manifest
+    """
+
+    parser = expat.ParserCreate(namespace_separator=' ')
+    state = {'handler': None, 'text': list()}
+    path = list()
+
+    def start_element(name, attrib):
+        name = name.rpartition(' ')[2]
+        handler = state['handler']
+        if handler is None:
+            if name == 'MPD':
+                handler = state['handler'] = _MpdHandler()
+            elif name == 'SmoothStreamingMedia':
+                handler = state['handler'] = _SmoothHandler()
+            else:
+                raise ValueError('Unknown manifest root element ' + name)
+        handler.start(name, attrib, path)
+        path.append(name)
+        del state['text'][:]
+
+    def end_element(name):
+        name = path.pop()
+        state['handler'].end(name, ''.join(state['text']), path)
+        del state['text'][:]
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = state['text'].append
+
+    for chunk in chunks:
+        parser.Parse(chunk, False)
+    parser.Parse(b'', True)
+
+    if state['handler'] is None:
+        raise ValueError('Empty manifest')
+    return state['handler'].manifest
@@ -0,0 +1,318 @@
+import bisect
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _NullTimer():
+    """Timer of NullMetrics that does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class NullMetrics():
+    """Metrics hook that discards everything, used when no metrics are configured.
+    """
+
+    enabled = False
+
+    def timer(self, stage):
+        return _NULL_TIMER
+
+    def observe(self, stage, seconds):
+        pass
+
+    def incr(self, counter, value=1):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class _Timer():
+    """Context manager that reports its duration to a MetricsCollector."""
+
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class Histogram():
+    """Histogram of durations in seconds, e.g. of one stage or of probe latencies.
+    Percentiles are the upper bound of the bucket they fall into.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, other):
+        """Adds the observations of other, both must use the same buckets."""
+
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, share):
+        """Returns the upper bucket bound below which share of the observations fall."""
+
+        if not self.count:
+            return None
+        rank = share * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+
+class MetricsCollector():
+    """Collects per-stage durations and counters of a generation run.
+    Stages are e.g. s3_list, manifest_fetch, dash_parse, dash_expand, counters
+    e.g. bytes_downloaded, cache_hits, retries, dash_segments, dash_errors.
+    Example:
+
+    from seg_gen import SegGen, metrics
+    collector = metrics.MetricsCollector()
+    seg_gen = SegGen('http://www.example.com/', 'bucket', metrics=collector)
+    segments = seg_gen.get_format_segment_urls(dash=True)
+    print(collector.format_summary())
+    collector.write_prometheus('/var/lib/node_exporter/seg_gen.prom')
+    """
+
+    enabled = True
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Init method
+
+        Keyword Arguments:
+            buckets {tuple} -- Upper bounds of the duration histogram buckets in seconds
+                               (default: {DEFAULT_BUCKETS})
+        """
+
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._histograms = dict()
+        self._counters = dict()
+
+    def timer(self, stage):
+        """Returns a context manager that records its duration for stage.
+
+        Arguments:
+            stage {string} -- Name of the stage
+
+        Returns:
+            context manager -- Timer
+        """
+
+        return _Timer(self, stage)
+
+    def observe(self, stage, seconds):
+        """Records a duration of stage.
+
+        Arguments:
+            stage {string} -- Name of the stage
+            seconds {float} -- Duration
+        """
+
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def incr(self, counter, value=1):
+        """Increments a counter.
+
+        Arguments:
+            counter {string} -- Name of the counter
+
+        Keyword Arguments:
+            value {int} -- Increment (default: {1})
+        """
+
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + value
+
+    def summary(self):
+        """Returns all stages and counters.
+
+        Returns:
+            dict -- {'stages': {stage: {count, total, mean, min, max, p50, p99}},
+                     'counters': {counter: value}}
+        """
+
+        with self._lock:
+            stages = dict()
+            for stage, histogram in self._histograms.items():
+                stages[stage] = {
+                    'count': histogram.count,
+                    'total': histogram.total,
+                    'mean': histogram.total / histogram.count,
+                    'min': histogram.min,
+                    'max': histogram.max,
+                    'p50': histogram.percentile(0.5),
+                    'p99': histogram.percentile(0.99),
+                    }
+            return {'stages': stages, 'counters': dict(self._counters)}
+
+    def histograms(self):
+        """Returns the cumulative bucket counts of every stage.
+
+        Returns:
+            dict -- {stage: [(upper bound, cumulative count), ...]}, the last bound is inf
+        """
+
+        with self._lock:
+            result = dict()
+            for stage, histogram in self._histograms.items():
+                cumulative = 0
+                buckets = list()
+                for bound, count in zip(self.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    buckets.append((bound, cumulative))
+                result[stage] = buckets
+            return result
+
+    def format_summary(self):
+        """Returns the summary as human readable table.
+
+        Returns:
+            string -- Summary table
+        """
+
+        summary = self.summary()
+        lines = ['{:<20} {:>8} {:>10} {:>10} {:>10} {:>10}'.format(
+            'stage', 'count', 'total s', 'mean ms', 'p50 ms', 'p99 ms')]
+        for stage, values in sorted(summary['stages'].items()):
+            lines.append('{:<20} {:>8} {:>10.3f} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+                stage, values['count'], values['total'], values['mean'] * 1000,
+                values['p50'] * 1000, values['p99'] * 1000))
+        for counter, value in sorted(summary['counters'].items()):
+            lines.append('{:<20} {:>8}'.format(counter, value))
+        return '\n'.join(lines)
+
+    def to_prometheus(self, prefix='seg_gen'):
+        """Returns all metrics in Prometheus text format.
+
+        Keyword Arguments:
+            prefix {string} -- Prefix of the metric names (default: {'seg_gen'})
+
+        Returns:
+            string -- Prometheus text exposition
+        """
+
+        summary = self.summary()
+        name = prefix + '_stage_duration_seconds'
+        lines = ['# HELP {} Duration of seg_gen pipeline stages.'.format(name),
+                 '# TYPE {} histogram'.format(name)]
+        for stage, buckets in sorted(self.histograms().items()):
+            for bound, count in buckets:
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append('{}_bucket{{stage="{}",le="{}"}} {}'.format(name, stage, le, count))
+            lines.append('{}_sum{{stage="{}"}} {}'.format(name, stage,
+                                                          repr(summary['stages'][stage]['total'])))
+            lines.append('{}_count{{stage="{}"}} {}'.format(name, stage,
+                                                            summary['stages'][stage]['count']))
+        for counter, value in sorted(summary['counters'].items()):
+            counter_name = '{}_{}_total'.format(prefix, counter)
+            lines.append('# TYPE {} counter'.format(counter_name))
+            lines.append('{} {}'.format(counter_name, value))
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, prefix='seg_gen'):
+        """Writes to_prometheus atomically to path, e.g. for the node_exporter textfile collector.
+
+        Arguments:
+            path {string} -- Target file
+
+        Keyword Arguments:
+            prefix {string} -- Prefix of the metric names (default: {'seg_gen'})
+        """
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as prom_file:
+            prom_file.write(self.to_prometheus(prefix))
+        os.replace(tmp_path, path)
+
+
+class _TimedChunks():
+    """Iterator over chunks that sums up the time spent waiting for them."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.waited = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self.chunks)
+        finally:
+            self.waited += time.perf_counter() - start
+
+
+def timed_parse(parse, chunks, metrics, prefix):
+    """Runs parse(chunks) on a streamed body and records the time spent waiting
+    for the network as <prefix>_fetch and the remaining time as <prefix>_parse.
+
+    Arguments:
+        parse {callable} -- Parser that consumes chunks
+        chunks {iterable} -- Chunks of the body
+        metrics {MetricsCollector} -- Metrics hook
+        prefix {string} -- Prefix of the stage names, e.g. dash
+
+    Returns:
+        object -- Result of parse
+    """
+
+    if not metrics.enabled:
+        return parse(chunks)
+
+    timed_chunks = _TimedChunks(chunks)
+    start = time.perf_counter()
+    try:
+        return parse(timed_chunks)
+    finally:
+        total = time.perf_counter() - start
+        metrics.observe(prefix + '_fetch', timed_chunks.waited)
+        metrics.observe(prefix + '_parse', total - timed_chunks.waited)
@@ -0,0 +1,318 @@
+import logging
+import threading
+import time
+
+from . import workers
+from .metrics import DEFAULT_BUCKETS, NULL_METRICS, Histogram
+from .resilience import classify_error
+from .transport import Transport
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter():
+    """Spaces calls of acquire evenly to at most rate per second across threads.
+    Example:
+
+    limiter = RateLimiter(200)
+    limiter.acquire()  # returns once the next slot is due
+    """
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        """Init method
+
+        Arguments:
+            rate {float} -- Maximum calls per second
+
+        Keyword Arguments:
+            clock {callable} -- Returns the current time in seconds (default: {time.monotonic})
+            sleep {callable} -- Called with the seconds to wait (default: {time.sleep})
+        """
+
+        self.interval = 1.0 / rate
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._next = None
+
+    def acquire(self):
+        """Waits for the next free slot.
+        """
+
+        with self._lock:
+            now = self.clock()
+            slot = now if self._next is None else max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            self.sleep(slot - now)
+
+
+class ProbeStats():
+    """Status codes, errors and latency histograms of the probes of one format and ism."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.status_codes = dict()
+        self.errors = dict()
+        self.bytes = 0
+        self.ttfb = Histogram(buckets)
+        self.latency = Histogram(buckets)
+
+    @property
+    def count(self):
+        return sum(self.status_codes.values()) + sum(self.errors.values())
+
+    def add(self, status_code, ttfb, latency, size):
+        self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+        self.bytes += size
+        self.ttfb.observe(ttfb)
+        self.latency.observe(latency)
+
+    def add_error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def merge(self, other):
+        """Adds the probes of other, both must use the same buckets."""
+
+        for status_code, count in other.status_codes.items():
+            self.status_codes[status_code] = self.status_codes.get(status_code, 0) + count
+        for kind, count in other.errors.items():
+            self.errors[kind] = self.errors.get(kind, 0) + count
+        self.bytes += other.bytes
+        self.ttfb.merge(other.ttfb)
+        self.latency.merge(other.latency)
+
+    def summary(self):
+        """Returns the probes as dict.
+
+        Returns:
+            dict -- {count, status_codes, errors, bytes, ttfb_p50, ttfb_p99,
+                     latency_p50, latency_p99, latency_max}
+        """
+
+        return {
+            'count': self.count,
+            'status_codes': dict(self.status_codes),
+            'errors': dict(self.errors),
+            'bytes': self.bytes,
+            'ttfb_p50': self.ttfb.percentile(0.5),
+            'ttfb_p99': self.ttfb.percentile(0.99),
+            'latency_p50': self.latency.percentile(0.5),
+            'latency_p99': self.latency.percentile(0.99),
+            'latency_max': self.latency.max,
+            }
+
+
+class ProbeReport():
+    """Thread safe collection of ProbeStats per format and ism."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._stats = dict()
+
+    def __get(self, format_name, ism_url):
+        key = (format_name, ism_url)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = ProbeStats(self.buckets)
+        return stats
+
+    def add(self, format_name, ism_url, status_code, ttfb, latency, size):
+        """Records a probe that got a response.
+
+        Arguments:
+            format_name {string} -- hls, dash or smooth
+            ism_url {string} -- Base URL of the ism
+            status_code {int} -- Status code of the response
+            ttfb {float} -- Seconds until the status line and headers were received
+            latency {float} -- Seconds until the response was read completely
+            size {int} -- Received body bytes
+        """
+
+        with self._lock:
+            self.__get(format_name, ism_url).add(status_code, ttfb, latency, size)
+
+    def add_error(self, format_name, ism_url, error):
+        """Records a probe that got no response.
+
+        Arguments:
+            format_name {string} -- hls, dash or smooth
+            ism_url {string} -- Base URL of the ism
+            error {Exception} -- Raised exception
+        """
+
+        kind, _ = classify_error(error)
+        with self._lock:
+            self.__get(format_name, ism_url).add_error(kind)
+
+    def by_ism(self):
+        """Returns the stats of every format and ism.
+
+        Returns:
+            dict -- (format, ism base URL) -> ProbeStats
+        """
+
+        with self._lock:
+            return dict(self._stats)
+
+    def by_format(self):
+        """Returns the stats of every format, merged over its isms.
+
+        Returns:
+            dict -- format -> ProbeStats
+        """
+
+        merged = dict()
+        for (format_name, _), stats in sorted(self.by_ism().items()):
+            if format_name not in merged:
+                merged[format_name] = ProbeStats(self.buckets)
+            merged[format_name].merge(stats)
+        return merged
+
+    def failed_isms(self):
+        """Returns the isms with at least one probe that got no 2xx response.
+
+        Returns:
+            list -- (format, ism base URL) tuples
+        """
+
+        return sorted(key for key, stats in self.by_ism().items()
+                      if stats.errors or any(not 200 <= status_code < 300
+                                             for status_code in stats.status_codes))
+
+    def format_summary(self):
+        """Returns the stats per format as human readable table.
+
+        Returns:
+            string -- Summary table
+        """
+
+        lines = ['{:<8} {:>8} {:>10} {:>10} {:>10} {:>10}  {}'.format(
+            'format', 'probes', 'ttfb p50', 'ttfb p99', 'p50 ms', 'p99 ms', 'status codes')]
+        for format_name, stats in sorted(self.by_format().items()):
+            summary = stats.summary()
+            codes = dict((str(code), count) for code, count in summary['status_codes'].items())
+            codes.update(summary['errors'])
+            millis = ['-' if value is None else '{:.2f}'.format(value * 1000) for value in (
+                summary['ttfb_p50'], summary['ttfb_p99'],
+                summary['latency_p50'], summary['latency_p99'])]
+            lines.append('{:<8} {:>8} {:>10} {:>10} {:>10} {:>10}  {}'.format(
+                format_name, summary['count'], millis[0], millis[1], millis[2], millis[3],
+                ' '.join('{}={}'.format(code, count) for code, count in sorted(codes.items()))))
+        return '\n'.join(lines)
+
+
+class SegmentProber():
+    """Sends HEAD or ranged GET requests to segment URLs, e.g. to warm the USO
+    and CDN caches and to check that the segments resolve.
+    Segments are consumed lazily from the generator, at most workers probes
+    are in flight and rate limits the probes per second.
+    Example:
+
+    from seg_gen import SegGen, probe
+    seg_gen = SegGen('http://www.example.com/', 'bucket', workers=8)
+    prober = probe.SegmentProber(method='GET', range_bytes=1, workers=32, rate=500)
+    report = prober.run(seg_gen.iter_segment_groups(hls=True, dash=True))
+    print(report.format_summary())
+    """
+
+    def __init__(self, transport=None, method='HEAD', range_bytes=None, workers=10, rate=None,
+                 metrics=None, buckets=DEFAULT_BUCKETS):
+        """Init method
+
+        Keyword Arguments:
+            transport {Transport} -- Transport whose session and timeout are used,
+                                     retries and circuit breaker are not applied to
+                                     probes (default: {Transport(pool_size=workers)})
+            method {string} -- HEAD or GET (default: {'HEAD'})
+            range_bytes {int} -- Only GET the first range_bytes of a segment, None
+                                 GETs the whole segment (default: {None})
+            workers {int} -- Maximum probes in flight (default: {10})
+            rate {float} -- Maximum probes per second, None is unlimited (default: {None})
+            metrics {MetricsCollector} -- Hook that records probe_ttfb and probe_latency
+                                          and the probes and probe_errors counters
+                                          (default: {None})
+            buckets {tuple} -- Upper bounds of the latency histogram buckets in seconds
+                               (default: {DEFAULT_BUCKETS})
+        """
+
+        if method not in ('HEAD', 'GET'):
+            raise ValueError('method must be HEAD or GET')
+        self.method = method
+        self.headers = dict()
+        if method == 'GET' and range_bytes:
+            self.headers['Range'] = 'bytes=0-{}'.format(range_bytes - 1)
+        self.workers = workers
+        self.metrics = metrics or NULL_METRICS
+        self.buckets = buckets
+        self.limiter = RateLimiter(rate) if rate else None
+        self.transport = transport
+        if self.transport is None:
+            self.transport = Transport(pool_size=max(10, workers), metrics=self.metrics)
+
+    def probe(self, url):
+        """Probes a single segment URL.
+
+        Arguments:
+            url {string} -- Segment URL
+
+        Returns:
+            tuple -- (status code, seconds to first byte, seconds until read, body bytes)
+
+        Raises:
+            requests.RequestException -- Connection error or timeout
+        """
+
+        if self.limiter is not None:
+            self.limiter.acquire()
+        start = time.perf_counter()
+        response = self.transport.session.request(
+            self.method, url, headers=self.headers, stream=True, timeout=self.transport.timeout)
+        with response:
+            ttfb = time.perf_counter() - start
+            size = 0
+            for chunk in response.iter_content(64 * 1024):
+                size += len(chunk)
+        return response.status_code, ttfb, time.perf_counter() - start, size
+
+    def __probe_item(self, report, item):
+        """Helper method that probes one (format, ism base URL, segment URL) item into report.
+        """
+
+        format_name, base_url, url = item
+        try:
+            status_code, ttfb, latency, size = self.probe(url)
+        except Exception as error:
+            logger.debug('Could not probe %s', url, exc_info=True)
+            self.metrics.incr('probe_errors')
+            report.add_error(format_name, base_url, error)
+            return
+        self.metrics.incr('probes')
+        self.metrics.observe('probe_ttfb', ttfb)
+        self.metrics.observe('probe_latency', latency)
+        report.add(format_name, base_url, status_code, ttfb, latency, size)
+
+    def run(self, segment_groups, report=None):
+        """Probes every segment of segment_groups.
+
+        Arguments:
+            segment_groups {iterable} -- (format, ism base URL, list of segments) tuples
+                                         as yielded by SegGen.iter_segment_groups
+
+        Keyword Arguments:
+            report {ProbeReport} -- Report to add to (default: {None})
+
+        Returns:
+            ProbeReport -- Stats per format and ism
+        """
+
+        if report is None:
+            report = ProbeReport(self.buckets)
+        items = ((format_name, base_url, url)
+                 for format_name, base_url, segments in segment_groups
+                 for url in segments)
+        # Probes finish in any order, a slow one must not hold up the others
+        for _ in workers.unordered_imap(lambda item: self.__probe_item(report, item), items,
+                                        workers=self.workers):
+            pass
+        return report
@@ -0,0 +1,308 @@
+import logging
+import random
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth another attempt, everything else is returned right away
+RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to an origin whose circuit is open."""
+
+    def __init__(self, origin, retry_in):
+        super().__init__('Circuit of {} is open, retry in {:.1f}s'.format(origin, retry_in))
+        self.origin = origin
+        self.retry_in = retry_in
+
+
+class RetryPolicy():
+    """Bounded retries with exponential backoff and full jitter.
+    Attempt n (starting at 0) waits a random time between 0 and
+    min(backoff_max, backoff * 2**n) before the next one.
+    Example:
+
+    from seg_gen import resilience, transport
+    shared = transport.Transport(retry=resilience.RetryPolicy(retries=3, backoff=0.2))
+    """
+
+    def __init__(self, retries=2, backoff=0.5, backoff_max=10.0, sleep=time.sleep, seed=None):
+        """Init method
+
+        Keyword Arguments:
+            retries {int} -- Attempts after the first one, 0 disables retries (default: {2})
+            backoff {float} -- Upper bound of the first wait in seconds (default: {0.5})
+            backoff_max {float} -- Upper bound of every wait in seconds (default: {10.0})
+            sleep {callable} -- Called with the seconds to wait (default: {time.sleep})
+            seed {int} -- Seed of the jitter (default: {None})
+        """
+
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self, attempt):
+        """Sleeps before the attempt after attempt.
+
+        Arguments:
+            attempt {int} -- Number of the failed attempt, starting at 0
+
+        Returns:
+            float -- Seconds slept
+        """
+
+        with self._lock:
+            seconds = self._random.uniform(0, min(self.backoff_max, self.backoff * 2**attempt))
+        self.sleep(seconds)
+        return seconds
+
+
+class CircuitBreaker():
+    """Per origin circuit breaker.
+    After failures consecutive failed requests to an origin its circuit opens
+    and requests fail fast with CircuitOpenError. After reset_timeout one trial
+    request is let through, it closes the circuit again on success and reopens
+    it on failure.
+    Example:
+
+    from seg_gen import resilience, transport
+    shared = transport.Transport(breaker=resilience.CircuitBreaker(failures=10))
+    """
+
+    def __init__(self, failures=5, reset_timeout=30.0, clock=time.monotonic):
+        """Init method
+
+        Keyword Arguments:
+            failures {int} -- Consecutive failures that open the circuit of an
+                              origin, 0 disables the breaker (default: {5})
+            reset_timeout {float} -- Seconds until a trial request is let through
+                                     (default: {30.0})
+            clock {callable} -- Returns the current time in seconds (default: {time.monotonic})
+        """
+
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        # origin -> [consecutive failures, time the circuit opened or None, trial running]
+        self._origins = dict()
+
+    def before_request(self, origin):
+        """Checks whether a request to origin may be sent.
+
+        Arguments:
+            origin {string} -- Origin of the request, e.g. http://uso.example.com
+
+        Raises:
+            CircuitOpenError -- Circuit of origin is open
+        """
+
+        if not self.failures:
+            return
+        with self._lock:
+            state = self._origins.get(origin)
+            if state is None or state[1] is None:
+                return
+            retry_in = state[1] + self.reset_timeout - self.clock()
+            if retry_in > 0 or state[2]:
+                raise CircuitOpenError(origin, max(0.0, retry_in))
+            state[2] = True
+
+    def record(self, origin, success):
+        """Records the outcome of a request to origin.
+
+        Arguments:
+            origin {string} -- Origin of the request
+            success {bool} -- False for connection errors, timeouts and retryable
+                              status codes
+        """
+
+        if not self.failures:
+            return
+        with self._lock:
+            if success:
+                self._origins.pop(origin, None)
+                return
+            state = self._origins.setdefault(origin, [0, None, False])
+            state[0] += 1
+            if state[2] or state[0] >= self.failures:
+                if state[1] is None:
+                    logger.warning('Opening circuit of %s after %d failures.', origin, state[0])
+                state[1] = self.clock()
+                state[2] = False
+
+    def release(self, origin):
+        """Ends a trial request to origin without an outcome, e.g. after an error that
+        says nothing about the origin, so the next request is let through as trial.
+
+        Arguments:
+            origin {string} -- Origin of the request
+        """
+
+        if not self.failures:
+            return
+        with self._lock:
+            state = self._origins.get(origin)
+            if state is not None:
+                state[2] = False
+
+    def is_open(self, origin):
+        """Returns whether requests to origin currently fail fast.
+
+        Arguments:
+            origin {string} -- Origin to check
+
+        Returns:
+            bool -- True if the circuit of origin is open
+        """
+
+        with self._lock:
+            state = self._origins.get(origin)
+            return (state is not None and state[1] is not None and
+                    state[1] + self.reset_timeout > self.clock())
+
+
+def classify_error(error):
+    """Returns the kind of a failed manifest request.
+
+    Arguments:
+        error {Exception} -- Raised exception
+
+    Returns:
+        tuple -- (kind, status code or None), kind is one of circuit_open, timeout,
+                 connection, http or error
+    """
+
+    if isinstance(error, CircuitOpenError):
+        return 'circuit_open', None
+    # requests is imported lazily, its errors can only occur after it was imported
+    requests = sys.modules.get('requests')
+    if requests is not None:
+        if isinstance(error, requests.Timeout):
+            return 'timeout', None
+        if isinstance(error, requests.HTTPError):
+            response = error.response
+            return 'http', response.status_code if response is not None else None
+        if isinstance(error, requests.ConnectionError):
+            return 'connection', None
+    return 'error', None
+
+
+class Failure():
+    """A manifest of an ism that could not be fetched or expanded."""
+
+    __slots__ = ('format', 'url', 'stage', 'kind', 'status_code', 'message')
+
+    def __init__(self, format_name, url, stage, kind, status_code, message):
+        self.format = format_name
+        self.url = url
+        self.stage = stage
+        self.kind = kind
+        self.status_code = status_code
+        self.message = message
+
+    @property
+    def ism_url(self):
+        """Base URL of the ism the failed URL belongs to, the URL itself if it
+        does not contain an .ism path."""
+
+        index = self.url.find('.ism/')
+        return self.url if index < 0 else self.url[:index + 5]
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class FailureReport():
+    """Thread safe collection of the failures of a generation run.
+    The format clients add a Failure for every manifest they could not fetch
+    or expand instead of only logging it.
+    Example:
+
+    from seg_gen import resilience, dash
+    report = resilience.FailureReport()
+    dash_client = dash.Dash(failures=report)
+    ...
+    for ism_url, failures in report.by_ism().items():
+        print(ism_url, [failure.kind for failure in failures])
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._failures = list()
+        self._keys = set()
+
+    def add(self, format_name, url, stage, error):
+        """Records a failure.
+
+        Arguments:
+            format_name {string} -- hls, dash or smooth
+            url {string} -- URL of the manifest or base URL of the ism
+            stage {string} -- fetch or expand
+            error {Exception} -- Raised exception
+        """
+
+        kind, status_code = classify_error(error)
+        failure = Failure(format_name, url, stage, kind, status_code, str(error))
+        with self._lock:
+            self._failures.append(failure)
+            self._keys.add((format_name, failure.ism_url))
+
+    def has_failed(self, format_name, ism_url):
+        """Checks whether a manifest of an ism and format could not be fetched or expanded.
+
+        Arguments:
+            format_name {string} -- hls, dash or smooth
+            ism_url {string} -- Base URL of the ism
+
+        Returns:
+            bool -- True if at least one failure was recorded
+        """
+
+        with self._lock:
+            return (format_name, ism_url) in self._keys
+
+    def failures(self):
+        """Returns the failures recorded so far.
+
+        Returns:
+            list -- Failure objects in order of occurrence
+        """
+
+        with self._lock:
+            return list(self._failures)
+
+    def by_ism(self):
+        """Groups the failures by ism.
+
+        Returns:
+            dict -- ism base URL -> list of Failure objects
+        """
+
+        grouped = dict()
+        for failure in self.failures():
+            grouped.setdefault(failure.ism_url, list()).append(failure)
+        return grouped
+
+    def counts(self):
+        """Counts the failures by format and kind.
+
+        Returns:
+            dict -- (format, kind) -> number of failures
+        """
+
+        counts = dict()
+        for failure in self.failures():
+            key = (failure.format, failure.kind)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def __len__(self):
+        with self._lock:
+            return len(self._failures)
@@ -1,11 +1,9 @@
-import boto3
 import logging
 import sys
+import threading
+from . import workers
+from .metrics import NULL_METRICS
 
-logging.basicConfig(
-    level=logging.ERROR,
-    format='%(levelname)s: %(asctime)s - %(funcName)s at %(lineno)d %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
@@ -13,7 +11,8 @@ class IsmUrls():
     """Lists Keys from S3-Bucket
     """
 
-    def __init__(self, aws_profile=None, aws_access_key_id=None, aws_secret_access_key=None):
+    def __init__(self, aws_profile=None, aws_access_key_id=None, aws_secret_access_key=None,
+                 s3_client=None, list_workers=1, metrics=None):
         """Init method
 
         Keyword Arguments:
@@ -22,71 +21,251 @@ class IsmUrls():
                                           against AWS S3 (default: {None})
             aws_secret_access_key {string} -- AWS SecretAccessKeyId used together
                                               with AWS AccessKeyId (default: {None})
+            s3_client {object} -- S3 client to use instead of creating one with boto3,
+                                  e.g. benchmarks.stand_in.StubS3Client (default: {None})
+            list_workers {int} -- Number of common prefixes listed in parallel,
+                                  1 lists serially (default: {1})
+            metrics {MetricsCollector} -- Hook that records the duration of every
+                                          list_objects_v2 page (default: {None})
         """
 
         self.aws_profile = aws_profile
         self.aws_access_key_id = aws_access_key_id
         self.aws_secret_access_key = aws_secret_access_key
+        self.list_workers = list_workers
+        self.metrics = metrics or NULL_METRICS
+        self._s3 = s3_client
+        self._lock = threading.Lock()
 
-    def __get_matching_s3_objects(self, bucket, obj_prefix=''):
-        """Helper method to generate a list of AWS S3 Key in Bucket with specified prefix
+    def _get_client(self):
+        """Returns the S3 client, it is created once and reused by all calls.
+
+        Returns:
+            object -- boto3 S3 client
+        """
+
+        with self._lock:
+            if self._s3 is None:
+                import boto3
+                if self.aws_profile or (self.aws_access_key_id and self.aws_secret_access_key):
+                    session = boto3.Session(
+                        profile_name=self.aws_profile,
+                        aws_access_key_id=self.aws_access_key_id,
+                        aws_secret_access_key=self.aws_secret_access_key
+                        )
+
+                    self._s3 = session.client('s3')
+                else:
+                    self._s3 = boto3.client('s3')
+            return self._s3
+
+    def __list_objects(self, bucket, obj_prefix='', max_keys=None, delimiter=None,
+                       require_contents=True, start_after=None):
+        """Helper method that pages through list_objects_v2.
 
         Arguments:
             bucket {string} -- AWS S3 Bucketname
-            obj_prefix {string} -- Object prefix to use for searching in S3 bucket
+
+        Keyword Arguments:
+            obj_prefix {string} -- Object prefix to use for searching in S3 bucket (default: {''})
+            max_keys {int} -- MaxKeys of the first page (default: {None})
+            delimiter {string} -- Delimiter to group keys into CommonPrefixes (default: {None})
+            require_contents {bool} -- Exit if a page has no Contents (default: {True})
+            start_after {string} -- Only list keys after this key (default: {None})
 
         Yields:
-            string -- AWS S3 bucket key path
+            dict -- Response of every page
         """
 
-        if self.aws_profile or (self.aws_access_key_id and self.aws_secret_access_key):
-            session = boto3.Session(
-                profile_name=self.aws_profile,
-                aws_access_key_id=self.aws_access_key_id,
-                aws_secret_access_key=self.aws_secret_access_key
-                )
-
-            s3 = session.client('s3')
-        else:
-            s3 = boto3.client('s3')
-
+        s3 = self._get_client()
         kwargs = {'Bucket': bucket}
 
         if isinstance(obj_prefix, str):
             kwargs['Prefix'] = obj_prefix
+        if delimiter:
+            kwargs['Delimiter'] = delimiter
+        if max_keys:
+            kwargs['MaxKeys'] = max_keys
+        if start_after:
+            kwargs['StartAfter'] = start_after
 
         while True:
-            response = s3.list_objects_v2(**kwargs)
+            with self.metrics.timer('s3_list'):
+                response = s3.list_objects_v2(**kwargs)
+            self.metrics.incr('s3_pages')
 
-            try:
-                contents = response['Contents']
-            except KeyError:
+            if require_contents and 'Contents' not in response:
                 logger.error('S3 Response does not contain Contents.')
-                logger.debug('', exc_info=True)
                 sys.exit(127)
 
-            for obj in contents:
-                key = obj['Key']
-                if key.startswith(obj_prefix) and key.endswith('.ism'):
-                    yield obj
+            yield response
 
             try:
                 kwargs['ContinuationToken'] = response['NextContinuationToken']
+                kwargs.pop('MaxKeys', None)
             except KeyError:
                 break
 
-    def get_matching_s3_keys(self, bucket, prefix=''):
+    def __filter_ism_objects(self, contents, obj_prefix):
+        """Helper method that returns the .ism objects out of a Contents list.
+
+        Arguments:
+            contents {list} -- Contents of a list_objects_v2 response
+            obj_prefix {string} -- Object prefix used for searching
+
+        Returns:
+            list -- List of S3 objects whose keys end with .ism
+        """
+
+        return [obj for obj in contents
+                if obj['Key'].startswith(obj_prefix) and obj['Key'].endswith('.ism')]
+
+    def __get_matching_s3_objects(self, bucket, obj_prefix='', count=-1, start_after=None):
+        """Helper method to generate a list of AWS S3 Key in Bucket with specified prefix
+
+        Arguments:
+            bucket {string} -- AWS S3 Bucketname
+            obj_prefix {string} -- Object prefix to use for searching in S3 bucket
+
+        Keyword Arguments:
+            count {int} -- Stop after count .ism keys, -1 lists all (default: {-1})
+            start_after {string} -- Only list keys after this key (default: {None})
+
+        Yields:
+            string -- AWS S3 bucket key path
+        """
+
+        max_keys = count if 0 < count < 1000 else None
+        require_contents = start_after is None
+        for response in self.__list_objects(bucket, obj_prefix, max_keys=max_keys,
+                                            require_contents=require_contents,
+                                            start_after=start_after):
+            for obj in self.__filter_ism_objects(response.get('Contents', []), obj_prefix):
+                yield obj
+
+    def __get_matching_s3_objects_parallel(self, bucket, obj_prefix='', count=-1):
+        """Helper method like __get_matching_s3_objects which lists the common prefixes
+        below obj_prefix in parallel. Keys are yielded in the same order as by the
+        serial listing.
+
+        Arguments:
+            bucket {string} -- AWS S3 Bucketname
+            obj_prefix {string} -- Object prefix to use for searching in S3 bucket
+
+        Keyword Arguments:
+            count {int} -- Stop after count .ism keys, -1 lists all (default: {-1})
+
+        Yields:
+            string -- AWS S3 bucket key path
+        """
+
+        # .ism keys found by the listings submitted so far, they sort before the keys
+        # of all later prefixes, so no more prefixes are needed once count are found
+        state = {'found': 0}
+
+        def enough():
+            with self._lock:
+                return count > 0 and state['found'] >= count
+
+        def discover():
+            found = False
+            for response in self.__list_objects(
+                    bucket, obj_prefix, delimiter='/', require_contents=False):
+                items = [(obj['Key'], obj) for obj in response.get('Contents', [])]
+                items.extend((common['Prefix'], None)
+                             for common in response.get('CommonPrefixes', []))
+                found = found or bool(items)
+
+                # Keys directly below obj_prefix are batched, common prefixes are
+                # listed by the workers
+                batch = list()
+                for name, obj in sorted(items, key=lambda item: item[0]):
+                    if obj is not None:
+                        batch.append(obj)
+                        continue
+                    if batch:
+                        yield batch
+                        batch = list()
+                    if enough():
+                        return
+                    yield name
+                if batch:
+                    yield batch
+                if enough():
+                    return
+            if not found:
+                logger.error('S3 Response does not contain Contents.')
+                sys.exit(127)
+
+        def list_item(item):
+            if isinstance(item, list):
+                objects = self.__filter_ism_objects(item, obj_prefix)
+            else:
+                objects = list()
+                for response in self.__list_objects(bucket, item, require_contents=False):
+                    objects.extend(self.__filter_ism_objects(response.get('Contents', []), item))
+                    # Later keys of this prefix come after the first count keys
+                    if 0 < count <= len(objects):
+                        break
+            with self._lock:
+                state['found'] += len(objects)
+            return objects
+
+        for objects in workers.ordered_imap(list_item, discover(), workers=self.list_workers):
+            for obj in objects:
+                yield obj
+
+    def get_matching_s3_objects(self, bucket, prefix='', count=-1, start_after=None):
+        """Searchs for .ism objects in S3 buckets
+
+        Arguments:
+            bucket {string} -- Name of AWS S3 bucket
+            prefix {string} -- Key prefix to distinguish keys in S3 bucket
+
+        Keyword Arguments:
+            count {int} -- Stop listing after count keys, -1 lists all (default: {-1})
+            start_after {string} -- Only list keys after this key, always lists
+                                    serially (default: {None})
+
+        Counts up to 1000 keys are listed serially, larger counts stop listing
+        further common prefixes once enough keys are found.
+
+        Yields:
+            dict -- AWS S3 object of .ism-files with Key, ETag and LastModified
+        """
+
+        if count == 0:
+            return
+
+        # A count that fits into one page is listed serially with MaxKeys
+        if self.list_workers > 1 and start_after is None and not 0 < count <= 1000:
+            objects = self.__get_matching_s3_objects_parallel(bucket, prefix, count)
+        else:
+            objects = self.__get_matching_s3_objects(bucket, prefix, count, start_after)
+
+        for obj in objects:
+            yield obj
+            count -= 1
+            if count == 0:
+                break
+
+    def get_matching_s3_keys(self, bucket, prefix='', count=-1, start_after=None):
         """Searchs for Keys in S3 buckets
 
         Arguments:
             bucket {string} -- Name of AWS S3 bucket
             prefix {string} -- Key prefix to distinguish keys in S3 bucket
 
+        Keyword Arguments:
+            count {int} -- Stop listing after count keys, -1 lists all (default: {-1})
+            start_after {string} -- Only list keys after this key, always lists
+                                    serially (default: {None})
+
         Yields:
             string -- AWS S3 bucket key of .ism-files
         """
 
-        for obj in self.__get_matching_s3_objects(bucket, prefix):
+        for obj in self.get_matching_s3_objects(bucket, prefix, count, start_after):
             yield obj['Key']
 
     def create_ism_url(self, base_url, ism_path):
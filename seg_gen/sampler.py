@@ -0,0 +1,272 @@
+import array
+import logging
+import math
+import random
+
+from .timeline import SegmentTimeline
+
+logger = logging.getLogger(__name__)
+
+
+def zipf_weight(rank, exponent=1.0):
+    """Returns the Zipf weight of a rank, 1 / (rank + 1) ** exponent.
+
+    Arguments:
+        rank {int} -- Popularity rank starting at 0
+
+    Keyword Arguments:
+        exponent {float} -- Skew, 0 weights all ranks equally (default: {1.0})
+
+    Returns:
+        float -- Weight of the rank
+    """
+
+    return 1.0 / (rank + 1) ** exponent
+
+
+def get_manifest_bitrates(manifest, content_types=None):
+    """Returns the bitrate of every representation of a DASH or Smooth manifest in
+    the order of the timelines of Dash.get_mpd_timelines and Smooth.get_smooth_timelines.
+
+    Arguments:
+        manifest {Manifest} -- Parsed manifest
+
+    Keyword Arguments:
+        content_types {list} -- Same filter as used for the timelines (default: {None})
+
+    Returns:
+        list -- Bitrates as int, None if a representation has none
+    """
+
+    bitrates = list()
+    for track in manifest.tracks:
+        if content_types and not any(
+                content_type in track.content_type for content_type in content_types):
+            continue
+        for representation in track.representations:
+            bandwidth = representation['bandwidth']
+            bitrates.append(int(bandwidth) if bandwidth else None)
+    return bitrates
+
+
+class AliasTable():
+    """Walker/Vose alias table that draws an index with probability proportional
+    to its weight in O(1), after O(n) setup.
+    """
+
+    def __init__(self, weights):
+        """Init method
+
+        Arguments:
+            weights {list} -- Non negative weights, at least one must be positive
+
+        Raises:
+            ValueError -- No positive weight
+        """
+
+        count = len(weights)
+        total = float(sum(weights))
+        if not count or total <= 0:
+            raise ValueError('alias table needs a positive weight')
+
+        scaled = [weight * count / total for weight in weights]
+        self._probabilities = array.array('d', [1.0]) * count
+        self._aliases = array.array('q', range(count))
+        small = [index for index, weight in enumerate(scaled) if weight < 1.0]
+        large = [index for index, weight in enumerate(scaled) if weight >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self._probabilities[less] = scaled[less]
+            self._aliases[less] = more
+            scaled[more] += scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Whatever is left is 1 up to rounding errors and keeps probability 1.0
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def draw(self, rng):
+        """Draws an index.
+
+        Arguments:
+            rng {random.Random} -- Random number generator
+
+        Returns:
+            int -- Index of a weight
+        """
+
+        index = int(rng.random() * self._count)
+        if rng.random() < self._probabilities[index]:
+            return index
+        return self._aliases[index]
+
+
+class _Source():
+    """Segments of one timeline or URL list with weights decaying by position.
+    A run of count segments starting at position first with decay q has the
+    weight q ** first * (1 - q ** count) / (1 - q), so runs are drawn from an
+    alias table and the offset in the run from a truncated geometric
+    distribution in closed form.
+    """
+
+    def __init__(self, segments, decay):
+        if isinstance(segments, SegmentTimeline):
+            self.counts = [count for _, _, count in segments.runs()]
+            self.get_url = segments.run_url
+        else:
+            self.counts = [len(segments)]
+            self.get_url = lambda run, offset: segments[offset]
+        self.decay = decay
+        self.log_decay = math.log(decay) if decay < 1.0 else 0.0
+
+        self.table = None
+        if len(self.counts) > 1:
+            weights = list()
+            first = 0
+            for count in self.counts:
+                if decay < 1.0:
+                    weights.append(decay ** first * (1.0 - decay ** count) / (1.0 - decay))
+                else:
+                    weights.append(float(count))
+                first += count
+            self.table = AliasTable(weights)
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def draw(self, rng):
+        run = self.table.draw(rng) if self.table is not None else 0
+        count = self.counts[run]
+        if self.decay >= 1.0:
+            offset = int(rng.random() * count)
+        else:
+            # Inverse CDF of P(offset) ~ decay ** offset for offset < count
+            share = 1.0 - rng.random() * (1.0 - self.decay ** count)
+            offset = int(math.log(share) / self.log_decay) if share > 0 else count - 1
+        return self.get_url(run, min(offset, count - 1))
+
+
+class SegmentSampler():
+    """Draws segment URLs with a skewed, realistic distribution without expanding
+    the timelines: isms by popularity (Zipf), representations by bitrate share
+    and segments by position, as viewers mostly watch the beginning of assets.
+    Every draw is O(1). Initialization segments are not drawn.
+    Example:
+
+    from seg_gen import sampler
+    segment_sampler = sampler.SegmentSampler(seed=42, position_half_life=150,
+                                             bitrate_shares={400000: 0.2, 1500000: 0.8})
+    segment_sampler.add_ism(base_url, timelines, bitrates)
+    urls = segment_sampler.sample(1000)
+    """
+
+    def __init__(self, seed=None, zipf_exponent=1.0, position_half_life=None,
+                 bitrate_shares=None, rng=None):
+        """Init method
+
+        Keyword Arguments:
+            seed {int} -- Seed of the random number generator for reproducible
+                          draws (default: {None})
+            zipf_exponent {float} -- Skew of the default ism weights, the n-th added
+                                     ism gets 1 / n ** zipf_exponent (default: {1.0})
+            position_half_life {float} -- Number of segments after which the weight
+                                          of a segment halves, None weights all
+                                          positions equally (default: {None})
+            bitrate_shares {dict} -- Share of every bitrate, representations whose
+                                     bitrate is missing are not drawn, None weights
+                                     all representations equally (default: {None})
+            rng {random.Random} -- Random number generator to use instead of
+                                   creating one with seed (default: {None})
+        """
+
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.zipf_exponent = zipf_exponent
+        self.bitrate_shares = bitrate_shares
+        self.decay = 1.0
+        if position_half_life:
+            self.decay = 0.5 ** (1.0 / position_half_life)
+        self._isms = 0
+        self._sources = list()
+        self._weights = list()
+        self._table = None
+
+    def add_ism(self, ism, timelines, bitrates=None, weight=None):
+        """Adds the timelines of an ism. Isms should be added by decreasing popularity
+        if the default Zipf weights are used.
+
+        Arguments:
+            ism {string} -- Name or base URL of the ism
+            timelines {list} -- SegmentTimeline objects or lists of segment URLs
+
+        Keyword Arguments:
+            bitrates {list} -- Bitrate of every timeline (default: {None})
+            weight {float} -- Weight of the ism instead of its Zipf weight (default: {None})
+
+        Returns:
+            int -- Number of added timelines
+        """
+
+        if weight is None:
+            weight = zipf_weight(self._isms, self.zipf_exponent)
+        self._isms += 1
+        if bitrates is None:
+            bitrates = [None] * len(timelines)
+
+        shares = list()
+        for segments, bitrate in zip(timelines, bitrates):
+            if not len(segments):
+                continue
+            if self.bitrate_shares is None:
+                share = 1.0
+            elif bitrate is None:
+                # e.g. HLS renditions without bandwidth, they would dilute the shares
+                share = 0.0
+            else:
+                share = self.bitrate_shares.get(bitrate, 0.0)
+            if share > 0:
+                shares.append((segments, share))
+
+        total = sum(share for _, share in shares)
+        if not total:
+            logger.warning('No timeline of %s can be drawn.', ism)
+            return 0
+
+        for segments, share in shares:
+            self._sources.append(_Source(segments, self.decay))
+            self._weights.append(weight * share / total)
+        self._table = None
+        return len(shares)
+
+    def __len__(self):
+        return len(self._sources)
+
+    def draw(self):
+        """Draws one segment URL.
+
+        Returns:
+            string -- Segment URL
+
+        Raises:
+            ValueError -- No timelines were added
+        """
+
+        if self._table is None:
+            self._table = AliasTable(self._weights)
+        return self._sources[self._table.draw(self.rng)].draw(self.rng)
+
+    def sample(self, count):
+        """Draws count segment URLs, with replacement.
+
+        Arguments:
+            count {int} -- Number of URLs
+
+        Returns:
+            list -- Segment URLs
+        """
+
+        return [self.draw() for _ in range(count)]
@@ -1,12 +1,14 @@
-import xmltodict
-import requests
 import logging
 import sys
+import time
+from . import live
+from .transport import Transport
+from .metrics import NULL_METRICS, timed_parse
+from .resilience import FailureReport
+from .timeline import SegmentTimeline
+from .manifest_parser import Manifest, parse_manifest
+from .templates import compile_smooth_template
 
-logging.basicConfig(
-    level=logging.ERROR,
-    format='%(levelname)s: %(asctime)s - %(funcName)s at %(lineno)d %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
@@ -24,6 +26,26 @@ class Smooth():
     segment_url = smooth.get_smooth_segment_urls(base_url, smooth_xml)
     """
 
+    def __init__(self, transport=None, metrics=None, failures=None):
+        """Init method
+
+        Keyword Arguments:
+            transport {Transport} -- Shared HTTP transport used to load manifests,
+                                     a new one is created if omitted (default: {None})
+            metrics {MetricsCollector} -- Hook that records stage durations and
+                                          counters (default: {None})
+            failures {FailureReport} -- Report of the manifests that could not be fetched
+                                        or expanded (default: {None})
+        """
+
+        self.metrics = metrics or NULL_METRICS
+        self.failures = failures
+        if self.failures is None:
+            self.failures = FailureReport()
+        self.transport = transport
+        if self.transport is None:
+            self.transport = Transport(metrics=self.metrics)
+
     def get_smooth_url(self, base_url):
         """""Builds URL to fetch manifest file
 
@@ -52,52 +74,209 @@ class Smooth():
         """
 
         try:
-            response = requests.get(smooth_xml)
-            if response.status_code == 200:
-                return xmltodict.parse(response.content)
+            content = self.transport.get_content(smooth_xml)
+            if content is not None:
+                import xmltodict
+                return xmltodict.parse(content)
         except:
             logger.warning('Could not get manifest xml from manifest url.')
             logger.debug('', exc_info=True)
+            self.metrics.incr('smooth_errors')
+            self.failures.add('smooth', smooth_xml, 'fetch', sys.exc_info()[1])
             return ''
 
-    def get_smooth_segment_urls(self, base_url, smooth_xml):
-        """Parses Manifest XML file to get all information to create segment URLs
-        to call for performance testing.
+    def get_smooth_manifest(self, smooth_url):
+        """Returns the parts of the Manifest XML needed to generate segment URLs.
+        The manifest is parsed while it is downloaded and unused elements are dropped,
+        which is cheaper than building the full dict of get_smooth_xml.
+
+        Arguments:
+            smooth_url {string} -- URL where to fetch Manifest XML. Mostly ends with /manifest.
+
+        Returns:
+            Manifest -- Parsed manifest, None if it could not be fetched.
+        """
+
+        try:
+            return timed_parse(
+                parse_manifest, self.transport.stream(smooth_url), self.metrics, 'smooth')
+        except:
+            logger.warning('Could not get manifest xml from manifest url.')
+            logger.debug('', exc_info=True)
+            self.metrics.incr('smooth_errors')
+            self.failures.add('smooth', smooth_url, 'fetch', sys.exc_info()[1])
+            return None
+
+    def __get_manifest_timeline(self, base_url, manifest):
+        """Helper method that creates the video SegmentTimeline of a parsed Manifest.
 
         Arguments:
             base_url {string} -- URL that points to ism file on USO.
-            smooth_xml {dict} -- Dict representation of Manifest XML file.
+            manifest {Manifest} -- Manifest returned by get_smooth_manifest.
 
         Returns:
-            list -- List of Segment URLS to use in performance testing tool.
+            SegmentTimeline -- Timeline of the video segments.
+        """
+
+        track = manifest.get_tracks('video')[-1]
+        quality_level = track.representations[0]['bandwidth']
+
+        return SegmentTimeline.from_runs(
+            compile_smooth_template(track.media, quality_level, base_url), track.runs,
+            end_time=manifest.get_end_time(track))
+
+    def get_smooth_timeline(self, base_url, smooth_xml):
+        """Parses Manifest XML file into a SegmentTimeline of the video segments.
+        Segment URLs are only built when they get accessed.
+
+        Arguments:
+            base_url {string} -- URL that points to ism file on USO.
+            smooth_xml {dict} -- Dict representation of Manifest XML file or Manifest
+                                 returned by get_smooth_manifest.
+
+        Returns:
+            SegmentTimeline -- Timeline of the video segments, None if parsing failed.
         """
 
         try:
-            stream_indexes = smooth_xml['SmoothStreamingMedia']['StreamIndex']
+            if isinstance(smooth_xml, Manifest):
+                return self.__get_manifest_timeline(base_url, smooth_xml)
+
+            root = smooth_xml['SmoothStreamingMedia']
+            stream_indexes = root['StreamIndex']
 
             for stream_index in stream_indexes:
                 if 'video' in stream_index['@Type']:
                     stream_url_path = stream_index['@Url']
                     seg_time_lines = stream_index['c']
                     quality_level = stream_index['QualityLevel']['@Bitrate']
+                    timescale = int(
+                        stream_index.get('@TimeScale', root.get('@TimeScale', 10000000)))
+
+            # Negative repeats last until the end of the presentation, unknown when live
+            duration = int(root.get('@Duration', 0))
+            end_time = None
+            if duration:
+                end_time = duration * timescale // int(root.get('@TimeScale', 10000000))
+            return SegmentTimeline.from_elements(
+                compile_smooth_template(stream_url_path, quality_level, base_url), seg_time_lines,
+                end_time=end_time)
+        except:
+            logger.error('Could not generate smooth segments.')
+            logger.debug('', exc_info=True)
+            self.metrics.incr('smooth_errors')
+            # a manifest that could not be fetched is already reported
+            if smooth_xml:
+                self.failures.add('smooth', base_url, 'expand', sys.exc_info()[1])
+            return None
+
+    def get_smooth_timelines(self, base_url, smooth_manifest, content_types=None):
+        """Creates a SegmentTimeline for every QualityLevel of every StreamIndex.
+        QualityLevels of the same StreamIndex share their runs, so fragment
+        start times are computed once per StreamIndex.
 
-            segment_urls = list()
-            duration = 0
-            for seg_time_line in seg_time_lines:
-                if '@t' in seg_time_line:
-                    url = base_url + stream_url_path
-                    url = url.replace('{bitrate}', quality_level)
-                    url = url.replace('{start time}', seg_time_line['@t'])
-                    segment_urls.append(url)
-                    duration += int(seg_time_line['@d'])
-                else:
-                    url = base_url + stream_url_path
-                    url = url.replace('{bitrate}', quality_level)
-                    url = url.replace('{start time}', str(duration))
-                    segment_urls.append(url)
-                    duration += int(seg_time_line['@d'])
-            return segment_urls
+        Arguments:
+            base_url {string} -- URL that points to ism file on USO.
+            smooth_manifest {Manifest} -- Manifest returned by get_smooth_manifest.
+
+        Keyword Arguments:
+            content_types {list} -- Only use StreamIndexes whose type contains one of
+                                    these, e.g. ['video', 'audio'], None uses all
+                                    (default: {None})
+
+        Returns:
+            list -- List of SegmentTimeline objects in document order, empty if parsing failed.
+        """
+
+        try:
+            timelines = list()
+            for track in smooth_manifest.tracks:
+                if content_types and not any(
+                        content_type in track.content_type for content_type in content_types):
+                    continue
+
+                shared = None
+                for quality_level in track.representations:
+                    media = compile_smooth_template(
+                        track.media, quality_level['bandwidth'], base_url)
+                    if shared is None:
+                        shared = SegmentTimeline.from_runs(
+                            media, track.runs, end_time=smooth_manifest.get_end_time(track))
+                        timelines.append(shared)
+                    else:
+                        timelines.append(shared.share(media))
+            return timelines
         except:
             logger.error('Could not generate smooth segments.')
             logger.debug('', exc_info=True)
+            self.metrics.incr('smooth_errors')
+            self.failures.add('smooth', base_url, 'expand', sys.exc_info()[1])
+            return []
+
+    def get_smooth_segment_urls(self, base_url, smooth_xml):
+        """Parses Manifest XML file to get all information to create segment URLs
+        to call for performance testing.
+
+        Arguments:
+            base_url {string} -- URL that points to ism file on USO.
+            smooth_xml {dict} -- Dict representation of Manifest XML file or Manifest
+                                 returned by get_smooth_manifest.
+
+        Returns:
+            list -- List of Segment URLS to use in performance testing tool.
+        """
+
+        smooth_timeline = self.get_smooth_timeline(base_url, smooth_xml)
+        if smooth_timeline is None:
             return []
+        with self.metrics.timer('smooth_expand'):
+            return smooth_timeline.expand()
+
+    def follow_smooth_segment_urls(self, base_url, all_tracks=False, sleep=time.sleep,
+                                   max_polls=None):
+        """Follows a live Smooth manifest and yields only the fragments added since
+        the last refresh. The manifest is refreshed after LookAheadFragmentCount
+        fragment durations, at least after one. A manifest that is not live is read once.
+
+        Arguments:
+            base_url {string} -- URL that points to ism file on USO.
+
+        Keyword Arguments:
+            all_tracks {bool} -- Follow every QualityLevel instead of a single
+                                 video bitrate (default: {False})
+            sleep {callable} -- Called with the seconds to wait between refreshes
+                                (default: {time.sleep})
+            max_polls {int} -- Stop after max_polls refreshes, None follows until the
+                               manifest is no longer live (default: {None})
+
+        Yields:
+            string -- Segment URL
+        """
+
+        smooth_url = self.get_smooth_url(base_url)
+        cursor = live.TimelineCursor()
+        state = {'interval': live.MIN_INTERVAL}
+
+        def poll():
+            smooth_manifest = self.get_smooth_manifest(smooth_url)
+            if smooth_manifest is None:
+                return [], state['interval']
+
+            if all_tracks:
+                timelines = self.get_smooth_timelines(base_url, smooth_manifest)
+            else:
+                timelines = [self.get_smooth_timeline(base_url, smooth_manifest)]
+            with self.metrics.timer('smooth_expand'):
+                segment_urls = cursor.advance_all(
+                    [smooth_timeline for smooth_timeline in timelines
+                     if smooth_timeline is not None])
+
+            if smooth_manifest.attributes.get('IsLive', '').upper() != 'TRUE':
+                return segment_urls, None
+            interval = live.get_fragment_duration(smooth_manifest)
+            if interval:
+                lookahead = int(smooth_manifest.attributes.get('LookAheadFragmentCount', 1))
+                state['interval'] = interval * max(1, lookahead)
+            return segment_urls, state['interval']
+
+        return live.follow(poll, sleep, max_polls)
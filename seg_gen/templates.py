@@ -0,0 +1,160 @@
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+_DASH_IDENTIFIER = re.compile(r'\$(RepresentationID|Number|Time|Bandwidth|SubNumber)?(%0(\d+)d)?\$')
+_SMOOTH_IDENTIFIER = re.compile(r'\{(bitrate|Bitrate|start time|start_time)\}')
+
+
+class CompiledTemplate():
+    """URL template that is split once into the parts before and after the
+    segment variable, so building a segment URL is a single concatenation.
+    Example:
+
+    from seg_gen import templates
+    template = templates.compile_dash_template(
+        'media-$RepresentationID$-$Time$.dash', representation_id='video=400000',
+        base='http://www.example.com/path_to_video.ism/dash/')
+    template(2000)  # 'http://www.example.com/path_to_video.ism/dash/media-video=400000-2000.dash'
+    """
+
+    __slots__ = ('prefix', 'suffix', 'variable', 'width')
+
+    def __init__(self, prefix, suffix='', variable=None, width=0):
+        """Init method
+
+        Arguments:
+            prefix {string} -- Part of the URL before the variable
+
+        Keyword Arguments:
+            suffix {string} -- Part of the URL after the variable (default: {''})
+            variable {string} -- Name of the variable, Time or Number, None if the
+                                 template is constant (default: {None})
+            width {int} -- Minimum width of the variable, padded with zeros (default: {0})
+        """
+
+        self.prefix = prefix
+        self.suffix = suffix
+        self.variable = variable
+        self.width = width
+
+    def __call__(self, value=None):
+        """Builds the URL of a segment.
+
+        Keyword Arguments:
+            value {int} -- Time or number of the segment (default: {None})
+
+        Returns:
+            string -- Segment URL
+        """
+
+        if self.variable is None:
+            return self.prefix
+        if self.width:
+            return self.prefix + '%0*d' % (self.width, value) + self.suffix
+        return self.prefix + str(value) + self.suffix
+
+    def with_prefix(self, prefix):
+        """Returns a copy of the template with another prefix.
+
+        Arguments:
+            prefix {string} -- New part of the URL before the variable
+
+        Returns:
+            CompiledTemplate -- Copy of the template
+        """
+
+        return CompiledTemplate(prefix, self.suffix, self.variable, self.width)
+
+    def __repr__(self):
+        return '<CompiledTemplate {!r} {} {!r}>'.format(self.prefix, self.variable, self.suffix)
+
+
+def compile_dash_template(template, representation_id='', bandwidth='', base=''):
+    """Compiles a DASH SegmentTemplate media or initialization attribute.
+    $RepresentationID$, $Bandwidth$ and $$ are substituted at compile time,
+    $Time$ or $Number$ (with optional %0Nd width) stay the only variable.
+
+    Arguments:
+        template {string} -- SegmentTemplate@media or @initialization
+
+    Keyword Arguments:
+        representation_id {string} -- Representation@id (default: {''})
+        bandwidth {string} -- Representation@bandwidth (default: {''})
+        base {string} -- URL that gets prepended to the template (default: {''})
+
+    Returns:
+        CompiledTemplate -- Compiled template
+
+    Raises:
+        ValueError -- Template contains more than one of $Time$, $Number$ and $SubNumber$
+    """
+
+    parts = [base]
+    variable = None
+    width = 0
+    suffix_start = None
+    position = 0
+
+    for match in _DASH_IDENTIFIER.finditer(template):
+        parts.append(template[position:match.start()])
+        position = match.end()
+        identifier = match.group(1)
+        identifier_width = int(match.group(3) or 0)
+
+        if identifier is None:
+            parts.append('$')
+        elif identifier == 'RepresentationID':
+            parts.append(str(representation_id))
+        elif identifier == 'Bandwidth':
+            parts.append('%0*d' % (identifier_width, int(bandwidth)) if identifier_width
+                         else str(bandwidth))
+        else:
+            if variable is not None:
+                raise ValueError('More than one segment variable in template ' + template)
+            variable = identifier
+            width = identifier_width
+            suffix_start = len(parts)
+
+    parts.append(template[position:])
+
+    if variable is None:
+        return CompiledTemplate(''.join(parts))
+    return CompiledTemplate(
+        ''.join(parts[:suffix_start]), ''.join(parts[suffix_start:]), variable, width)
+
+
+def compile_smooth_template(template, bitrate, base=''):
+    """Compiles a Smooth StreamIndex@Url template.
+    {bitrate} is substituted at compile time, {start time} stays the only variable.
+
+    Arguments:
+        template {string} -- StreamIndex@Url, e.g.
+                             QualityLevels({bitrate})/Fragments(video={start time})
+        bitrate {string} -- QualityLevel@Bitrate
+
+    Keyword Arguments:
+        base {string} -- URL that gets prepended to the template (default: {''})
+
+    Returns:
+        CompiledTemplate -- Compiled template
+    """
+
+    parts = [base]
+    suffix_start = None
+    position = 0
+
+    for match in _SMOOTH_IDENTIFIER.finditer(template):
+        parts.append(template[position:match.start()])
+        position = match.end()
+        if match.group(1).lower() == 'bitrate':
+            parts.append(str(bitrate))
+        else:
+            suffix_start = len(parts)
+
+    parts.append(template[position:])
+
+    if suffix_start is None:
+        return CompiledTemplate(''.join(parts))
+    return CompiledTemplate(''.join(parts[:suffix_start]), ''.join(parts[suffix_start:]), 'Time')
@@ -0,0 +1,375 @@
+import array
+import bisect
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentTimeline():
+    """Compact, lazily expanded list of segment URLs.
+    Stores run-length encoded timeline entries (start time, duration, segment count)
+    in arrays and only builds an URL when a segment is accessed, so memory grows
+    with the number of runs and not with the number of segments.
+    Example:
+
+    from seg_gen import timeline
+    segments = timeline.SegmentTimeline(lambda time: 'http://www.example.com/' + str(time))
+    segments.append(0, 2000, 99)
+    len(segments)  # 100
+    segments[42]   # 'http://www.example.com/84000'
+    """
+
+    def __init__(self, url_builder, initialization=None, start_number=None):
+        """Init method
+
+        Arguments:
+            url_builder {callable} -- Builds the segment URL of a segment start time
+
+        Keyword Arguments:
+            initialization {string} -- URL of the initialization segment, not part
+                                       of the timeline itself (default: {None})
+            start_number {int} -- If given url_builder gets called with the segment
+                                  number (start_number + index) instead of the start
+                                  time, used for $Number$ templates (default: {None})
+        """
+
+        self.url_builder = url_builder
+        self.initialization = initialization
+        self.start_number = start_number
+        self._starts = array.array('q')
+        self._durations = array.array('q')
+        self._counts = array.array('q')
+        self._first_indexes = array.array('q')
+        self._length = 0
+        self._runs_cache = dict()
+
+    @classmethod
+    def from_elements(cls, url_builder, elements, initialization=None, start_number=None,
+                      end_time=None):
+        """Creates a timeline out of DASH S or Smooth c elements as parsed by xmltodict.
+
+        Arguments:
+            url_builder {callable} -- Builds the segment URL of a segment start time
+            elements {list} -- Dicts with @d and optional @t and @r keys
+
+        Keyword Arguments:
+            initialization {string} -- URL of the initialization segment (default: {None})
+            start_number {int} -- See __init__ (default: {None})
+            end_time {int} -- See from_runs (default: {None})
+
+        Returns:
+            SegmentTimeline -- Timeline of all elements
+        """
+
+        if isinstance(elements, dict):
+            elements = [elements]
+
+        runs = list()
+        for element in elements:
+            start = element.get('@t')
+            runs.append((int(start) if start is not None else None,
+                         int(element['@d']), int(element.get('@r', 0))))
+        return cls.from_runs(url_builder, runs, initialization, start_number, end_time)
+
+    @classmethod
+    def from_runs(cls, url_builder, runs, initialization=None, start_number=None,
+                  end_time=None):
+        """Creates a timeline out of (t, d, r) tuples.
+        A negative r repeats the segment until the next explicit start time, or
+        until end_time for the last run, the last repetition may be cut short.
+
+        Arguments:
+            url_builder {callable} -- Builds the segment URL of a segment start time
+            runs {list} -- List of (t, d, r) tuples, t is None if not given
+
+        Keyword Arguments:
+            initialization {string} -- URL of the initialization segment (default: {None})
+            start_number {int} -- See __init__ (default: {None})
+            end_time {int} -- End of the Period in the timescale of runs, e.g. from
+                              Manifest.get_end_time (default: {None})
+
+        Returns:
+            SegmentTimeline -- Timeline of all runs
+
+        Raises:
+            ValueError -- The last run has a negative r and end_time is None
+        """
+
+        segment_timeline = cls(url_builder, initialization, start_number)
+        for i, (start, duration, repeat) in enumerate(runs):
+            if repeat < 0:
+                if start is None:
+                    start = segment_timeline.end_time()
+                if i + 1 < len(runs):
+                    next_start = runs[i + 1][0]
+                    if next_start is None:
+                        raise ValueError('Negative repeat must be followed by a start time')
+                    end = next_start
+                elif end_time is None:
+                    raise ValueError('Negative repeat of the last run needs the end time '
+                                     'of the Period')
+                else:
+                    end = end_time
+                # The last segment of the run may end after end
+                repeat = max(0, -(-(end - start) // duration) - 1)
+            segment_timeline.append(start, duration, repeat)
+        return segment_timeline
+
+    def append(self, start, duration, repeat=0):
+        """Appends a run of repeat + 1 segments with the same duration.
+
+        Arguments:
+            start {int} -- Start time of the first segment, None continues
+                           at the end of the previous run
+            duration {int} -- Duration of every segment of the run
+
+        Keyword Arguments:
+            repeat {int} -- Number of repetitions after the first segment (default: {0})
+        """
+
+        if start is None:
+            start = self.end_time()
+        self._starts.append(start)
+        self._durations.append(duration)
+        self._counts.append(repeat + 1)
+        self._first_indexes.append(self._length)
+        self._length += repeat + 1
+        self._runs_cache.clear()
+
+    def end_time(self):
+        """Returns the end time of the last segment.
+
+        Returns:
+            int -- End time of the timeline, 0 if it is empty
+        """
+
+        if not self._starts:
+            return 0
+        return self._starts[-1] + self._durations[-1] * self._counts[-1]
+
+    def runs(self):
+        """Returns the runs of the timeline.
+
+        Returns:
+            list -- List of (start time, duration, segment count) tuples
+        """
+
+        return list(zip(self._starts, self._durations, self._counts))
+
+    def run_url(self, run, offset):
+        """Returns the URL of a segment addressed by run in O(1).
+
+        Arguments:
+            run {int} -- Index of the run as returned by runs
+            offset {int} -- Index of the segment in the run
+
+        Returns:
+            string -- Segment URL
+        """
+
+        if self.start_number is not None:
+            return self.url_builder(self.start_number + self._first_indexes[run] + offset)
+        return self.url_builder(self._starts[run] + offset * self._durations[run])
+
+    def share(self, url_builder, initialization=None, start_number=None):
+        """Returns a timeline with another URL builder that shares the runs of this one.
+        Used for representations with the same SegmentTimeline, the start times
+        of the shared runs are only computed once. Runs must not be appended to
+        timelines that are shared.
+
+        Arguments:
+            url_builder {callable} -- Builds the segment URL of a segment start time
+
+        Keyword Arguments:
+            initialization {string} -- URL of the initialization segment (default: {None})
+            start_number {int} -- See __init__ (default: {None})
+
+        Returns:
+            SegmentTimeline -- Timeline sharing the runs
+        """
+
+        shared = SegmentTimeline(url_builder, initialization, start_number)
+        shared._starts = self._starts
+        shared._durations = self._durations
+        shared._counts = self._counts
+        shared._first_indexes = self._first_indexes
+        shared._length = self._length
+        shared._runs_cache = self._runs_cache
+        return shared
+
+    def start_times(self):
+        """Returns the start time of every segment, computed as cumulative sum
+        over the runs and cached for all timelines sharing them.
+
+        Returns:
+            array.array -- Start times of all segments
+        """
+
+        start_times = self._runs_cache.get('start_times')
+        if start_times is not None:
+            return start_times
+
+        deltas = array.array('q')
+        position = 0
+        for start, duration, count in zip(self._starts, self._durations, self._counts):
+            deltas.append(start - position)
+            deltas.extend(array.array('q', [duration]) * (count - 1))
+            position = start + duration * (count - 1)
+        start_times = array.array('q', itertools.accumulate(deltas))
+        self._runs_cache['start_times'] = start_times
+        return start_times
+
+    def expand(self):
+        """Builds all segment URLs of the timeline at once.
+        Faster than iterating the timeline, compiled templates are expanded with
+        a single concatenation per segment.
+
+        Returns:
+            list -- List of segment URLs, without the initialization segment
+        """
+
+        if self.start_number is not None:
+            values = range(self.start_number, self.start_number + self._length)
+        else:
+            values = self.start_times()
+
+        url_builder = self.url_builder
+        if getattr(url_builder, 'variable', None) and not url_builder.width:
+            prefix = url_builder.prefix
+            suffix = url_builder.suffix
+            return [prefix + value + suffix for value in map(str, values)]
+        return list(map(url_builder, values))
+
+    def __len__(self):
+        return self._length
+
+    def _locate(self, index):
+        """Helper method that normalizes index and finds its run in O(log runs).
+
+        Arguments:
+            index {int} -- Segment index, negative indexes count from the end
+
+        Returns:
+            tuple -- (run index, offset of the segment in the run)
+        """
+
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('segment index out of range')
+        run = bisect.bisect_right(self._first_indexes, index) - 1
+        return run, index - self._first_indexes[run]
+
+    def time(self, index):
+        """Returns the start time of a segment.
+
+        Arguments:
+            index {int} -- Segment index
+
+        Returns:
+            int -- Start time of the segment
+        """
+
+        run, offset = self._locate(index)
+        return self._starts[run] + offset * self._durations[run]
+
+    def index_after(self, time):
+        """Returns the index of the first segment that starts after time in O(log runs).
+        Used to continue a live timeline after the last segment already seen.
+
+        Arguments:
+            time {int} -- Start time of a segment
+
+        Returns:
+            int -- Index of the first later segment, len(self) if there is none
+        """
+
+        run = bisect.bisect_right(self._starts, time) - 1
+        if run < 0:
+            return 0
+        offset = (time - self._starts[run]) // self._durations[run] + 1
+        return self._first_indexes[run] + min(offset, self._counts[run])
+
+    def times(self):
+        """Yields the start time of every segment.
+
+        Yields:
+            int -- Start time of a segment
+        """
+
+        for start, duration, count in zip(self._starts, self._durations, self._counts):
+            for offset in range(count):
+                yield start + offset * duration
+
+    def __iter__(self):
+        url_builder = self.url_builder
+        if self.start_number is not None:
+            for number in range(self.start_number, self.start_number + self._length):
+                yield url_builder(number)
+            return
+
+        for time in self.times():
+            yield url_builder(time)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.__slice(index)
+        if self.start_number is not None:
+            run, offset = self._locate(index)
+            return self.url_builder(self.start_number + self._first_indexes[run] + offset)
+        return self.url_builder(self.time(index))
+
+    def __slice(self, index):
+        """Helper method that slices the timeline.
+
+        Arguments:
+            index {slice} -- Slice of segment indexes
+
+        Returns:
+            SegmentTimeline -- New timeline for slices with step 1, a list of URLs otherwise
+        """
+
+        start, stop, step = index.indices(self._length)
+        if step != 1:
+            return [self[i] for i in range(start, stop, step)]
+
+        start_number = self.start_number
+        if start_number is not None:
+            start_number += start
+        sliced = SegmentTimeline(self.url_builder, self.initialization, start_number)
+        if start >= stop:
+            return sliced
+
+        run, offset = self._locate(start)
+        remaining = stop - start
+        while remaining > 0:
+            count = min(self._counts[run] - offset, remaining)
+            duration = self._durations[run]
+            sliced.append(self._starts[run] + offset * duration, duration, count - 1)
+            remaining -= count
+            run += 1
+            offset = 0
+        return sliced
+
+    def __repr__(self):
+        return '<SegmentTimeline segments={} runs={}>'.format(self._length, len(self._starts))
+
+
+def expand_timelines(timelines):
+    """Expands several timelines into one list, each one starting with its
+    initialization segment if it has one.
+
+    Arguments:
+        timelines {list} -- List of SegmentTimeline objects
+
+    Returns:
+        list -- List of segment URLs
+    """
+
+    segment_urls = list()
+    for segment_timeline in timelines:
+        if segment_timeline.initialization is not None:
+            segment_urls.append(segment_timeline.initialization)
+        segment_urls.extend(segment_timeline.expand())
+    return segment_urls
@@ -0,0 +1,316 @@
+import logging
+
+from .metrics import NULL_METRICS
+from .resilience import RETRY_STATUS_CODES, CircuitBreaker, RetryPolicy
+from .workers import get_origin
+
+logger = logging.getLogger(__name__)
+
+
+class Transport():
+    """HTTP transport shared by the Dash, Hls and Smooth clients.
+    All manifests are loaded through one requests session, so connections to
+    the same USO are kept alive and reused instead of being opened per manifest.
+    Requests time out, connection errors, timeouts and 429/5xx responses are
+    retried a bounded number of times with backoff, and origins that keep
+    failing are skipped by a circuit breaker instead of stalling the run.
+    Example:
+
+    from seg_gen import transport, dash
+    shared = transport.Transport(pool_size=20)
+    dash_client = dash.Dash(transport=shared)
+    """
+
+    def __init__(self, pool_size=10, session=None, cache=None, metrics=None,
+                 timeout=(5.0, 30.0), retry=None, breaker=None):
+        """Init method
+
+        Keyword Arguments:
+            pool_size {int} -- Number of keep-alive connections kept per origin (default: {10})
+            session {requests.Session} -- Session to use instead of creating one (default: {None})
+            cache {ManifestCache} -- Cache used to revalidate manifests with conditional
+                                     requests instead of downloading them (default: {None})
+            metrics {MetricsCollector} -- Hook that records fetch durations, downloaded
+                                          bytes and cache hits (default: {None})
+            timeout {tuple} -- (connect, read) timeout in seconds, the read timeout
+                               applies to every read from the connection
+                               (default: {(5.0, 30.0)})
+            retry {RetryPolicy} -- Retries of failed requests (default: {RetryPolicy()})
+            breaker {CircuitBreaker} -- Per origin circuit breaker
+                                        (default: {CircuitBreaker()})
+        """
+
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = metrics or NULL_METRICS
+        self.cache = cache
+        self.session = session
+        if self.session is None:
+            self.session = self.__create_session(pool_size)
+
+    def __create_session(self, pool_size):
+        """Helper method to create a session with a connection pool of pool_size.
+
+        Arguments:
+            pool_size {int} -- Number of keep-alive connections kept per origin
+
+        Returns:
+            requests.Session -- Pooled session
+        """
+
+        import requests
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def get(self, url):
+        """Sends a GET request through the pooled session.
+
+        Arguments:
+            url {string} -- URL to request
+
+        Returns:
+            requests.Response -- Response of the request
+        """
+
+        return self.__send(url)
+
+    def __send(self, url, headers=None, stream=False):
+        """Helper method that sends a GET with timeout, retries and circuit breaker.
+
+        Arguments:
+            url {string} -- URL to request
+
+        Keyword Arguments:
+            headers {dict} -- Request headers (default: {None})
+            stream {bool} -- Do not read the body before returning (default: {False})
+
+        Returns:
+            requests.Response -- Response of the last attempt, may have a status
+                                 code of RETRY_STATUS_CODES if all attempts failed
+
+        Raises:
+            CircuitOpenError -- Circuit of the origin of url is open
+            requests.RequestException -- Connection error or timeout of the last attempt
+        """
+
+        import requests
+        origin = get_origin(url)
+        attempt = 0
+        while True:
+            self.breaker.before_request(origin)
+            recorded = False
+            try:
+                response = self.session.get(
+                    url, headers=headers, stream=stream, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as error:
+                self.breaker.record(origin, False)
+                recorded = True
+                if isinstance(error, requests.Timeout):
+                    self.metrics.incr('timeouts')
+                if attempt >= self.retry.retries:
+                    raise
+                logger.debug('Retrying %s after %s', url, error)
+            else:
+                retryable = response.status_code in RETRY_STATUS_CODES
+                self.breaker.record(origin, not retryable)
+                recorded = True
+                if not retryable or attempt >= self.retry.retries:
+                    return response
+                logger.debug('Retrying %s after status code %d', url, response.status_code)
+                response.close()
+            finally:
+                # Other errors, e.g. TooManyRedirects or InvalidURL, must not leave a
+                # trial request of a half-open circuit running forever
+                if not recorded:
+                    self.breaker.release(origin)
+            self.metrics.incr('retries')
+            self.retry.wait(attempt)
+            attempt += 1
+
+    def fetch(self, url):
+        """Fetches url, revalidating a cached body with a conditional request.
+
+        Arguments:
+            url {string} -- URL to request
+
+        Returns:
+            tuple -- (status code, body, final url after redirects), a cached body
+                     is returned with status code 200
+        """
+
+        with self.metrics.timer('manifest_fetch'):
+            status_code, content, final_url = self.__fetch(url)
+        if status_code != 200:
+            self.metrics.incr('http_errors')
+        return status_code, content, final_url
+
+    def __fetch(self, url):
+        """Helper method of fetch without metrics.
+
+        Arguments:
+            url {string} -- URL to request
+
+        Returns:
+            tuple -- (status code, body, final url after redirects)
+        """
+
+        if self.cache is None:
+            response = self.get(url)
+            self.metrics.incr('bytes_downloaded', len(response.content))
+            return response.status_code, response.content, response.url
+
+        entry = self.cache.get(url)
+        headers = dict()
+        if entry is not None:
+            etag, last_modified, body, cached_url = entry
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = self.__send(url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            logger.debug('Manifest not modified, using cached body of %s', url)
+            self.metrics.incr('cache_hits')
+            return 200, body, cached_url
+
+        self.metrics.incr('bytes_downloaded', len(response.content))
+        if response.status_code == 200:
+            self.metrics.incr('cache_misses')
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                self.cache.put(url, etag, last_modified, response.content, response.url)
+        return response.status_code, response.content, response.url
+
+    def __open(self, url):
+        """Helper method that sends a streaming GET, conditional if url is cached.
+
+        Arguments:
+            url {string} -- URL to request
+
+        Returns:
+            tuple -- (requests.Response, cache entry or None)
+        """
+
+        entry = None
+        headers = dict()
+        if self.cache is not None:
+            entry = self.cache.get(url)
+            if entry is not None:
+                if entry[0]:
+                    headers['If-None-Match'] = entry[0]
+                if entry[1]:
+                    headers['If-Modified-Since'] = entry[1]
+
+        return self.__send(url, headers=headers, stream=True), entry
+
+    def __iter_body(self, url, response, entry, chunk_size):
+        """Helper method that yields the body of a response opened by __open.
+
+        Arguments:
+            url {string} -- Requested URL
+            response {requests.Response} -- Streaming response
+            entry {tuple} -- Cache entry of url or None
+            chunk_size {int} -- Size of the chunks read from the connection
+
+        Yields:
+            bytes -- Chunk of the body
+
+        Raises:
+            requests.HTTPError -- Status code is not 200
+        """
+
+        with response:
+            if response.status_code == 304 and entry is not None:
+                self.metrics.incr('cache_hits')
+                yield entry[2]
+                return
+            if response.status_code != 200:
+                import requests
+                self.metrics.incr('http_errors')
+                raise requests.HTTPError(
+                    '{} returned status code {}'.format(url, response.status_code),
+                    response=response)
+
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            keep = self.cache is not None and (etag or last_modified)
+            if self.cache is not None:
+                self.metrics.incr('cache_misses')
+            body = list()
+            downloaded = 0
+            try:
+                for chunk in response.iter_content(chunk_size):
+                    downloaded += len(chunk)
+                    if keep:
+                        body.append(chunk)
+                    yield chunk
+            finally:
+                self.metrics.incr('bytes_downloaded', downloaded)
+            if keep:
+                self.cache.put(url, etag, last_modified, b''.join(body), response.url)
+
+    def stream(self, url, chunk_size=64 * 1024):
+        """Yields the body of url in chunks while it is downloaded.
+        Cached bodies are revalidated like in fetch and yielded as one chunk.
+
+        Arguments:
+            url {string} -- URL to request
+
+        Keyword Arguments:
+            chunk_size {int} -- Size of the chunks read from the connection (default: {64 KiB})
+
+        Yields:
+            bytes -- Chunk of the body
+
+        Raises:
+            requests.HTTPError -- Status code is not 200
+        """
+
+        response, entry = self.__open(url)
+        for chunk in self.__iter_body(url, response, entry, chunk_size):
+            yield chunk
+
+    def open_stream(self, url, chunk_size=64 * 1024):
+        """Like stream, but sends the request right away so the URL after redirects
+        is known before the body is read, e.g. to resolve relative URIs.
+
+        Arguments:
+            url {string} -- URL to request
+
+        Keyword Arguments:
+            chunk_size {int} -- Size of the chunks read from the connection (default: {64 KiB})
+
+        Returns:
+            tuple -- (final url after redirects, generator over the chunks of the body),
+                     the generator raises requests.HTTPError if the status code is not 200
+        """
+
+        response, entry = self.__open(url)
+        final_url = response.url
+        if response.status_code == 304 and entry is not None:
+            # The body and the URL its relative URIs resolve against are cached
+            final_url = entry[3]
+        return final_url, self.__iter_body(url, response, entry, chunk_size)
+
+    def get_content(self, url):
+        """Returns the body of url.
+
+        Arguments:
+            url {string} -- URL to request
+
+        Returns:
+            bytes -- Body of the response, None if the status code is not 200
+        """
+
+        status_code, content, _ = self.fetch(url)
+        if status_code == 200:
+            return content
+        return None
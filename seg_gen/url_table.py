@@ -0,0 +1,223 @@
+import array
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SGUT'
+VERSION = 1
+# magic, version, url count, blob offset, offsets offset, groups offset, groups length
+_HEADER = struct.Struct('<4sIQQQQQ')
+
+
+class UrlTableWriter():
+    """Writes segment URLs into a binary table that load test workers can memory-map.
+
+    Layout (little endian):
+        header -- magic, version, url count and offsets of the sections
+        blob -- UTF-8 bytes of all URLs without separators
+        offsets -- url count + 1 uint64 offsets of every URL in the blob
+        groups -- JSON list of {format, ism, start, count}
+
+    Example:
+
+    from seg_gen import url_table
+    with url_table.UrlTableWriter('/tmp/segments.sgut') as writer:
+        writer.add_group('dash', 'http://www.example.com/path_to_video.ism/', segment_urls)
+    """
+
+    def __init__(self, path):
+        """Init method
+
+        The table is written to path.tmp and only replaces path once it is complete,
+        so workers that memory-mapped an older table at path keep reading it.
+
+        Arguments:
+            path {string} -- Path of the table file
+        """
+
+        self.path = path
+        self._tmp_path = path + '.tmp'
+        self._file = open(self._tmp_path, 'wb')
+        self._file.write(b'\0' * _HEADER.size)
+        self._offsets = array.array('Q', [0])
+        self._groups = list()
+
+    def add_group(self, format_name, ism, urls):
+        """Appends the URLs of one format and ism.
+
+        Arguments:
+            format_name {string} -- hls, dash or smooth
+            ism {string} -- Base URL of the ism
+            urls {iterable} -- Segment URLs
+        """
+
+        start = len(self._offsets) - 1
+        position = self._offsets[-1]
+        write = self._file.write
+        offsets = self._offsets
+        for url in urls:
+            data = url.encode('utf-8')
+            write(data)
+            position += len(data)
+            offsets.append(position)
+        self._groups.append(
+            {'format': format_name, 'ism': ism, 'start': start, 'count': len(offsets) - 1 - start})
+
+    def close(self):
+        """Writes offsets, groups and header, closes the file and moves it to path.
+        """
+
+        if self._file is None:
+            return
+
+        blob_end = _HEADER.size + self._offsets[-1]
+        padding = -blob_end % 8
+        self._file.write(b'\0' * padding)
+        offsets_offset = blob_end + padding
+
+        offsets = self._offsets
+        if sys.byteorder != 'little':
+            offsets = array.array('Q', offsets)
+            offsets.byteswap()
+        self._file.write(offsets.tobytes())
+
+        groups = json.dumps(self._groups).encode('utf-8')
+        groups_offset = offsets_offset + len(self._offsets) * 8
+        self._file.write(groups)
+
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(
+            MAGIC, VERSION, len(self._offsets) - 1, _HEADER.size, offsets_offset,
+            groups_offset, len(groups)))
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self.path)
+
+    def discard(self):
+        """Closes and removes the unfinished table, path is left untouched.
+        """
+
+        if self._file is None:
+            return
+
+        self._file.close()
+        self._file = None
+        os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        # A table interrupted by an exception or sys.exit is incomplete
+        if exc_info[0] is not None:
+            self.discard()
+        else:
+            self.close()
+
+
+class UrlTable():
+    """Read-only, memory-mapped view of a table written by UrlTableWriter.
+    Lookups are O(1) and read straight from the page cache, so all workers on
+    a host share the same memory.
+    Example:
+
+    from seg_gen import url_table
+    with url_table.UrlTable('/tmp/segments.sgut') as table:
+        url = table[random.randrange(len(table))]
+    """
+
+    def __init__(self, path):
+        """Init method
+
+        Arguments:
+            path {string} -- Path of the table file
+
+        Raises:
+            ValueError -- File is not a segment URL table
+        """
+
+        self.path = path
+        with open(path, 'rb') as table_file:
+            self._mmap = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        (magic, version, self._length, self._blob_offset, offsets_offset,
+         groups_offset, groups_length) = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(path + ' is not a segment URL table')
+
+        offsets = self._view[offsets_offset:offsets_offset + (self._length + 1) * 8]
+        if sys.byteorder == 'little':
+            self._offsets = offsets.cast('Q')
+        else:
+            self._offsets = array.array('Q', offsets.tobytes())
+            self._offsets.byteswap()
+        self.groups = json.loads(
+            bytes(self._view[groups_offset:groups_offset + groups_length]).decode('utf-8'))
+
+    def __len__(self):
+        return self._length
+
+    def get_bytes(self, index):
+        """Returns the UTF-8 bytes of an URL without copying them.
+
+        Arguments:
+            index {int} -- URL index
+
+        Returns:
+            memoryview -- View into the mapped file
+        """
+
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('url index out of range')
+        blob_offset = self._blob_offset
+        return self._view[blob_offset + self._offsets[index]:blob_offset + self._offsets[index + 1]]
+
+    def __getitem__(self, index):
+        return str(self.get_bytes(index), 'utf-8')
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+    def get_group(self, format_name, ism):
+        """Returns the index range of the URLs of a format and ism.
+
+        Arguments:
+            format_name {string} -- hls, dash or smooth
+            ism {string} -- Base URL of the ism
+
+        Returns:
+            range -- Indexes of the URLs, empty if the group does not exist
+        """
+
+        for group in self.groups:
+            if group['format'] == format_name and group['ism'] == ism:
+                return range(group['start'], group['start'] + group['count'])
+        return range(0)
+
+    def close(self):
+        """Releases the memory map.
+        """
+
+        if self._mmap is None:
+            return
+        if hasattr(self, '_offsets') and isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        self._view.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,282 @@
+import logging
+
+from .templates import compile_dash_template, compile_smooth_template
+from .timeline import SegmentTimeline
+
+logger = logging.getLogger(__name__)
+
+SMOOTH_TIMESCALE = 10000000
+FORMATS = ('hls', 'dash', 'smooth')
+
+
+def _scale_runs(runs, source_timescale, target_timescale):
+    """Converts (t, d, r) runs to another timescale.
+
+    Arguments:
+        runs {list} -- List of (t, d, r) tuples, t is None if not given
+        source_timescale {int} -- Timescale of runs
+        target_timescale {int} -- Timescale of the returned runs
+
+    Returns:
+        list -- List of (t, d, r) tuples
+
+    Raises:
+        ValueError -- A time is not a whole number in the target timescale
+    """
+
+    if source_timescale == target_timescale:
+        return runs
+
+    scaled = list()
+    for start, duration, repeat in runs:
+        values = list()
+        for value in (start, duration):
+            if value is None:
+                values.append(None)
+                continue
+            target, remainder = divmod(value * target_timescale, source_timescale)
+            if remainder:
+                raise ValueError('{} in timescale {} is no whole number in timescale {}'.format(
+                    value, source_timescale, target_timescale))
+            values.append(target)
+        scaled.append((values[0], values[1], repeat))
+    return scaled
+
+
+class UsoScheme():
+    """Synthesizes the segment URLs of every format USO serves for an ism out of a
+    single parsed DASH or Smooth manifest. USO derives all formats from the same
+    fragments and names them deterministically:
+
+    dash -- dash/{name}-{track}={bitrate}.dash and dash/{name}-{track}={bitrate}-{time}.dash
+    hls -- {name}-{track}={bitrate}.m3u8 with segments {name}-{track}={bitrate}-{number}.ts
+    smooth -- QualityLevels({bitrate})/Fragments({track}={time})
+
+    Smooth times use a timescale of 10000000, DASH times the timescale of the
+    media, which Smooth manifests do not contain, so synthesizing DASH out of a
+    Smooth manifest needs dash_timescale. The name of the segments is taken
+    from the MPD, Smooth manifests do not contain it. Synthesized URLs should be
+    checked once per library with SegGen.verify_synthesized_urls, e.g. USO
+    settings that change the HLS fragment length break the scheme.
+    Example:
+
+    from seg_gen import uso, dash
+    dash_client = dash.Dash()
+    base_url = 'http://www.example.com/path_to_video.ism/'
+    manifest = dash_client.get_mpd_manifest(dash_client.get_callable_url(base_url))
+    hls_timelines = uso.UsoScheme().get_timelines('hls', base_url, manifest, all_tracks=True)
+    """
+
+    def __init__(self, name=None, dash_path='dash/', dash_timescale=None, hls_start_number=1):
+        """Init method
+
+        Keyword Arguments:
+            name {string} -- Name of the segments, None takes it from the MPD
+                             and uses media for Smooth manifests (default: {None})
+            dash_path {string} -- Path of the DASH segments below the ism
+                                  (default: {'dash/'})
+            dash_timescale {int} -- Timescale of the DASH timelines USO packages, e.g.
+                                    1000 or 90000, needed to synthesize DASH out of
+                                    Smooth manifests (default: {None})
+            hls_start_number {int} -- Number of the first HLS segment (default: {1})
+        """
+
+        self.name = name
+        self.dash_path = dash_path
+        self.dash_timescale = dash_timescale
+        self.hls_start_number = hls_start_number
+
+    def get_name(self, manifest):
+        """Returns the name of the segments, e.g. media for media-video=400000-2000.dash.
+
+        Arguments:
+            manifest {Manifest} -- Parsed DASH or Smooth manifest
+
+        Returns:
+            string -- Name of the segments
+        """
+
+        if self.name:
+            return self.name
+        if manifest.format == 'dash':
+            for track in manifest.tracks:
+                if track.media and '-$RepresentationID$' in track.media:
+                    return track.media.split('-$RepresentationID$', 1)[0]
+        return 'media'
+
+    def get_representations(self, manifest, all_tracks=False):
+        """Returns the tracks and representations to synthesize, the same ones
+        the format clients use.
+
+        Arguments:
+            manifest {Manifest} -- Parsed DASH or Smooth manifest
+
+        Keyword Arguments:
+            all_tracks {bool} -- Every representation of every track instead of the
+                                 first representation of the last video track
+                                 (default: {False})
+
+        Returns:
+            list -- (Track, list of (representation id, bitrate, track name)) tuples
+                    in document order
+        """
+
+        if all_tracks:
+            selected = [(track, track.representations) for track in manifest.tracks]
+        else:
+            selected = [(track, track.representations[:1])
+                        for track in manifest.get_tracks('video')[-1:]]
+
+        result = list()
+        for track, representations in selected:
+            ids = list()
+            for representation in representations:
+                bitrate = representation['bandwidth']
+                if manifest.format == 'smooth':
+                    track_name = track.name or track.content_type
+                    ids.append((track_name + '=' + bitrate, bitrate, track_name))
+                else:
+                    ids.append((representation['id'], bitrate,
+                                representation['id'].partition('=')[0]))
+            result.append((track, ids))
+        return result
+
+    def get_dash_timelines(self, base_url, manifest, all_tracks=False):
+        """Synthesizes DASH timelines, initialization segments included.
+
+        Arguments:
+            base_url {string} -- URL that points to ism file on USO
+            manifest {Manifest} -- Parsed DASH or Smooth manifest
+
+        Keyword Arguments:
+            all_tracks {bool} -- See get_representations (default: {False})
+
+        Returns:
+            list -- List of SegmentTimeline objects
+
+        Raises:
+            ValueError -- manifest is a Smooth manifest and dash_timescale is not set
+        """
+
+        if manifest.format == 'smooth' and not self.dash_timescale:
+            raise ValueError('dash_timescale is needed to synthesize DASH out of Smooth')
+
+        name = self.get_name(manifest)
+        base = base_url + self.dash_path
+        timelines = list()
+        for track, representations in self.get_representations(manifest, all_tracks):
+            runs = track.runs
+            timescale = track.timescale
+            if manifest.format == 'smooth':
+                runs = _scale_runs(runs, track.timescale, self.dash_timescale)
+                timescale = self.dash_timescale
+            end_time = manifest.get_end_time(track, timescale)
+            shared = None
+            for representation_id, bitrate, _ in representations:
+                initialization = compile_dash_template(
+                    name + '-$RepresentationID$.dash', representation_id, bitrate, base)()
+                media = compile_dash_template(
+                    name + '-$RepresentationID$-$Time$.dash', representation_id, bitrate, base)
+                if shared is None:
+                    shared = SegmentTimeline.from_runs(
+                        media, runs, initialization=initialization, end_time=end_time)
+                    timelines.append(shared)
+                else:
+                    timelines.append(shared.share(media, initialization))
+        return timelines
+
+    def get_hls_timelines(self, base_url, manifest, all_tracks=False):
+        """Synthesizes the segments of the HLS media playlists, variants before
+        renditions like in the master playlist.
+
+        Arguments:
+            base_url {string} -- URL that points to ism file on USO
+            manifest {Manifest} -- Parsed DASH or Smooth manifest
+
+        Keyword Arguments:
+            all_tracks {bool} -- See get_representations (default: {False})
+
+        Returns:
+            list -- List of SegmentTimeline objects
+        """
+
+        name = self.get_name(manifest)
+        selected = self.get_representations(manifest, all_tracks)
+        # Video variants are listed before the audio and text renditions
+        selected = ([item for item in selected if 'video' in item[0].content_type] +
+                    [item for item in selected if 'video' not in item[0].content_type])
+        timelines = list()
+        for track, representations in selected:
+            shared = None
+            for representation_id, bitrate, _ in representations:
+                media = compile_dash_template(
+                    name + '-$RepresentationID$-$Number$.ts', representation_id, bitrate,
+                    base_url)
+                if shared is None:
+                    shared = SegmentTimeline.from_runs(
+                        media, track.runs, start_number=self.hls_start_number,
+                        end_time=manifest.get_end_time(track))
+                    timelines.append(shared)
+                else:
+                    timelines.append(shared.share(media, start_number=self.hls_start_number))
+        return timelines
+
+    def get_smooth_timelines(self, base_url, manifest, all_tracks=False):
+        """Synthesizes Smooth timelines.
+
+        Arguments:
+            base_url {string} -- URL that points to ism file on USO
+            manifest {Manifest} -- Parsed DASH or Smooth manifest
+
+        Keyword Arguments:
+            all_tracks {bool} -- See get_representations (default: {False})
+
+        Returns:
+            list -- List of SegmentTimeline objects
+
+        Raises:
+            ValueError -- A DASH time is no whole number of 100 ns
+        """
+
+        timelines = list()
+        for track, representations in self.get_representations(manifest, all_tracks):
+            runs = track.runs
+            timescale = track.timescale
+            if manifest.format == 'dash':
+                runs = _scale_runs(runs, track.timescale, SMOOTH_TIMESCALE)
+                timescale = SMOOTH_TIMESCALE
+            end_time = manifest.get_end_time(track, timescale)
+            shared = None
+            for _, bitrate, track_name in representations:
+                media = compile_smooth_template(
+                    'QualityLevels({bitrate})/Fragments(' + track_name + '={start time})',
+                    bitrate, base_url)
+                if shared is None:
+                    shared = SegmentTimeline.from_runs(media, runs, end_time=end_time)
+                    timelines.append(shared)
+                else:
+                    timelines.append(shared.share(media))
+        return timelines
+
+    def get_timelines(self, format_name, base_url, manifest, all_tracks=False):
+        """Synthesizes the timelines of format_name.
+
+        Arguments:
+            format_name {string} -- hls, dash or smooth
+            base_url {string} -- URL that points to ism file on USO
+            manifest {Manifest} -- Parsed DASH or Smooth manifest
+
+        Keyword Arguments:
+            all_tracks {bool} -- See get_representations (default: {False})
+
+        Returns:
+            list -- List of SegmentTimeline objects
+        """
+
+        if format_name == 'dash':
+            return self.get_dash_timelines(base_url, manifest, all_tracks)
+        if format_name == 'hls':
+            return self.get_hls_timelines(base_url, manifest, all_tracks)
+        if format_name == 'smooth':
+            return self.get_smooth_timelines(base_url, manifest, all_tracks)
+        raise ValueError('Unknown format ' + format_name)
@@ -0,0 +1,195 @@
+import collections
+import concurrent.futures
+import contextlib
+import logging
+import threading
+import zlib
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+def get_origin(url):
+    """Returns the origin (scheme://host:port) of an URL.
+
+    Arguments:
+        url {string} -- Any absolute URL
+
+    Returns:
+        string -- Origin part of the URL
+    """
+
+    parts = urlsplit(url)
+    return parts.scheme + '://' + parts.netloc
+
+
+class OriginLimiter():
+    """Limits the number of concurrent jobs that talk to the same origin.
+
+    Example:
+
+    limiter = OriginLimiter(limit=4)
+    with limiter.acquire('http://www.example.com/path_to_video.ism/'):
+        ...
+    """
+
+    def __init__(self, limit=None):
+        """Init method
+
+        Keyword Arguments:
+            limit {int} -- Maximum concurrent jobs per origin, None means unlimited
+                           (default: {None})
+        """
+
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._semaphores = dict()
+
+    def _get_semaphore(self, url):
+        """Returns the semaphore guarding the origin of url.
+
+        Arguments:
+            url {string} -- URL which is going to be requested
+
+        Returns:
+            threading.BoundedSemaphore -- Semaphore of the origin
+        """
+
+        origin = get_origin(url)
+        with self._lock:
+            if origin not in self._semaphores:
+                self._semaphores[origin] = threading.BoundedSemaphore(self.limit)
+            return self._semaphores[origin]
+
+    @contextlib.contextmanager
+    def acquire(self, url):
+        """Context manager that holds a slot of the origin of url.
+
+        Arguments:
+            url {string} -- URL which is going to be requested
+        """
+
+        if not self.limit:
+            yield
+            return
+
+        semaphore = self._get_semaphore(url)
+        with semaphore:
+            yield
+
+
+def ordered_map(func, items, workers=1):
+    """Calls func for every item and returns the results in order of items.
+
+    Arguments:
+        func {callable} -- Function that gets called with one item
+        items {iterable} -- Items to process
+
+    Keyword Arguments:
+        workers {int} -- Number of threads to use, 1 runs serially (default: {1})
+
+    Returns:
+        list -- Results of func in the same order as items
+    """
+
+    if workers <= 1:
+        return [func(item) for item in items]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, items))
+
+
+def ordered_imap(func, items, workers=1, window=None):
+    """Lazy version of ordered_map which yields results as soon as they are ready.
+
+    Items are consumed lazily, at most window items are in flight at once
+    and results are yielded in order of items.
+
+    Arguments:
+        func {callable} -- Function that gets called with one item
+        items {iterable} -- Items to process
+
+    Keyword Arguments:
+        workers {int} -- Number of threads to use, 1 runs serially (default: {1})
+        window {int} -- Maximum items in flight, defaults to twice the workers
+                        (default: {None})
+
+    Yields:
+        object -- Result of func for every item
+    """
+
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    window = window or workers * 2
+    pending = collections.deque()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for item in items:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def unordered_imap(func, items, workers=1, window=None):
+    """Like ordered_imap, but yields results as soon as they are done, in any order.
+
+    A slow item only occupies its own slot of the window instead of holding
+    back the results of all items submitted after it.
+
+    Arguments:
+        func {callable} -- Function that gets called with one item
+        items {iterable} -- Items to process
+
+    Keyword Arguments:
+        workers {int} -- Number of threads to use, 1 runs serially (default: {1})
+        window {int} -- Maximum items in flight, defaults to twice the workers
+                        (default: {None})
+
+    Yields:
+        object -- Result of func for every item
+    """
+
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    window = window or workers * 2
+    pending = set()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for item in items:
+                pending.add(executor.submit(func, item))
+                if len(pending) >= window:
+                    done, pending = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in concurrent.futures.as_completed(pending):
+                yield future.result()
+            pending = set()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def get_shard(key, shard_count):
+    """Returns the shard of a key, stable across processes and hosts.
+
+    Arguments:
+        key {string} -- Key to assign, e.g. an ism key
+        shard_count {int} -- Number of shards
+
+    Returns:
+        int -- Shard index between 0 and shard_count - 1
+    """
+
+    return zlib.crc32(key.encode('utf-8')) % shard_count
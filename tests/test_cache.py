@@ -0,0 +1,96 @@
+import sqlite3
+
+from seg_gen import cache, transport
+
+
+class FakeResponse():
+
+    def __init__(self, status_code, url, content=b'', headers=None):
+        self.status_code = status_code
+        self.url = url
+        self.content = content
+        self.headers = headers or dict()
+
+    def close(self):
+        pass
+
+
+class FakeSession():
+    """Answers with the queued responses and records the request headers."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = list()
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        self.requests.append((url, dict(headers or {})))
+        return self.responses.pop(0)
+
+
+def test_put_and_get(tmp_path):
+    manifest_cache = cache.ManifestCache(str(tmp_path / 'cache.sqlite'))
+    manifest_cache.put('http://a/x.mpd', '"1"', None, b'body', 'http://b/x.mpd')
+    manifest_cache.put('http://a/y.mpd', None, 'Mon', b'other')
+
+    assert manifest_cache.get('http://a/x.mpd') == ('"1"', None, b'body', 'http://b/x.mpd')
+    assert manifest_cache.get('http://a/y.mpd') == (None, 'Mon', b'other', 'http://a/y.mpd')
+    assert manifest_cache.get('http://a/z.mpd') is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    manifest_cache = cache.ManifestCache(
+        str(tmp_path / 'cache.sqlite'), max_bytes=30, touch_batch=1000)
+    manifest_cache.put('a', None, None, b'x' * 10)
+    manifest_cache.put('b', None, None, b'x' * 10)
+    manifest_cache.put('c', None, None, b'x' * 10)
+    # pending touches are written before evicting
+    manifest_cache.get('a')
+    manifest_cache.put('d', None, None, b'x' * 10)
+
+    assert manifest_cache.get('b') is None
+    assert manifest_cache.get('a') is not None
+    assert manifest_cache.get('c') is not None
+
+
+def test_size_survives_reopen_and_replace(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    manifest_cache = cache.ManifestCache(path, max_bytes=25)
+    manifest_cache.put('a', None, None, b'x' * 10)
+    manifest_cache.put('a', None, None, b'x' * 10)
+    manifest_cache.close()
+
+    manifest_cache = cache.ManifestCache(path, max_bytes=25)
+    manifest_cache.put('b', None, None, b'x' * 10)
+    assert manifest_cache.get('a') is not None
+    manifest_cache.put('c', None, None, b'x' * 10)
+    assert manifest_cache.get('b') is None
+    assert manifest_cache.get('a') is not None
+
+
+def test_reads_are_written_in_batches(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    manifest_cache = cache.ManifestCache(path, touch_batch=3)
+    manifest_cache.put('a', None, None, b'x')
+    with sqlite3.connect(path) as db:
+        before = db.execute('SELECT last_access FROM manifests').fetchone()[0]
+
+    manifest_cache.get('a')
+    manifest_cache.get('a')
+    with sqlite3.connect(path) as db:
+        assert db.execute('SELECT last_access FROM manifests').fetchone()[0] == before
+    manifest_cache.get('a')
+    with sqlite3.connect(path) as db:
+        assert db.execute('SELECT last_access FROM manifests').fetchone()[0] > before
+
+
+def test_not_modified_returns_url_after_redirect(tmp_path):
+    session = FakeSession([
+        FakeResponse(200, 'http://b/v.ism/.mpd', b'<MPD/>', {'ETag': '"1"'}),
+        FakeResponse(304, 'http://a/v.ism/.mpd'),
+        ])
+    shared = transport.Transport(
+        session=session, cache=cache.ManifestCache(str(tmp_path / 'cache.sqlite')))
+
+    assert shared.fetch('http://a/v.ism/.mpd') == (200, b'<MPD/>', 'http://b/v.ism/.mpd')
+    assert shared.fetch('http://a/v.ism/.mpd') == (200, b'<MPD/>', 'http://b/v.ism/.mpd')
+    assert session.requests[1][1] == {'If-None-Match': '"1"'}
@@ -0,0 +1,164 @@
+import sys
+
+import pytest
+
+import seg_gen
+from benchmarks import stand_in
+from seg_gen import checkpoint, dash, s3_ism_urls
+
+KEYS = stand_in.synthetic_ism_keys(8)
+ISMS = [key for key in KEYS if key.endswith('.ism')]
+FORMATS = {'hls': True, 'dash': True, 'smooth': True}
+
+
+@pytest.fixture(scope='module')
+def origin():
+    with stand_in.StandInOrigin(segments=20, tracks=2, audio_tracks=1) as server:
+        yield server
+
+
+def create(origin, **kwargs):
+    return seg_gen.SegGen(origin.url, 'bucket', s3_client=stand_in.StubS3Client(KEYS), **kwargs)
+
+
+def count_requests(origin, run):
+    before = dict(origin.requests)
+    result = run()
+    return result, sum(origin.requests.get(kind, 0) - before.get(kind, 0)
+                       for kind in ('mpd', 'm3u8', 'manifest'))
+
+
+def exit_on_ism(monkeypatch, number):
+    create_ism_url = s3_ism_urls.IsmUrls.create_ism_url
+    calls = {'count': 0}
+
+    def failing(self, base_url, ism_path):
+        calls['count'] += 1
+        if calls['count'] == number:
+            sys.exit(127)
+        return create_ism_url(self, base_url, ism_path)
+
+    monkeypatch.setattr(s3_ism_urls.IsmUrls, 'create_ism_url', failing)
+
+
+def test_store(tmp_path):
+    path = str(tmp_path / 'run.sqlite')
+    progress = checkpoint.Checkpoint(path, 'run')
+    assert progress.get_position() == (None, 0)
+    progress.add_group('b.ism', 0, 'dash', 'http://uso/b.ism/', ['1', '2'])
+    progress.add_group('a.ism', 1, 'hls', 'http://uso/a.ism/', [])
+    progress.add_group('a.ism', 0, 'dash', 'http://uso/a.ism/', ['3'])
+    progress.set_position('a.ism', 4)
+    progress.close()
+
+    progress = checkpoint.Checkpoint(path, 'run')
+    assert progress.get_position() == ('a.ism', 4)
+    assert progress.get_group('b.ism', 0) == ('dash', 'http://uso/b.ism/', ['1', '2'])
+    assert progress.get_group('b.ism', 1) is None
+    assert list(progress.iter_groups('a.ism')) == [
+        ('dash', 'http://uso/a.ism/', ['3']), ('hls', 'http://uso/a.ism/', [])]
+    assert list(progress.iter_groups(None)) == []
+    assert checkpoint.Checkpoint(path, 'other').get_position() == (None, 0)
+    progress.clear()
+    assert progress.get_position() == (None, 0)
+    assert progress.get_group('b.ism', 0) is None
+
+
+@pytest.mark.parametrize('source_manifest', [None, 'dash'])
+@pytest.mark.parametrize('workers', [1, 4])
+def test_resume_after_exit(origin, tmp_path, monkeypatch, source_manifest, workers):
+    path = str(tmp_path / 'run.sqlite')
+    expected = create(origin, source_manifest=source_manifest).get_format_segment_urls(**FORMATS)
+
+    exit_on_ism(monkeypatch, 5)
+    with pytest.raises(SystemExit):
+        create(origin, checkpoint_path=path, workers=workers,
+               source_manifest=source_manifest).get_format_segment_urls(**FORMATS)
+    monkeypatch.undo()
+
+    resumed = create(origin, checkpoint_path=path, workers=workers,
+                     source_manifest=source_manifest)
+    segments, requests = count_requests(
+        origin, lambda: resumed.get_format_segment_urls(**FORMATS))
+    assert segments == expected
+    manifests_per_ism = 1 if source_manifest else 4
+    # isms after the 4th completed one plus at most the ones cancelled in flight
+    assert requests <= manifests_per_ism * (len(ISMS) - 4 + 2 * workers)
+    if workers == 1:
+        assert requests == manifests_per_ism * (len(ISMS) - 4)
+
+    segments, requests = count_requests(
+        origin, lambda: resumed.get_format_segment_urls(**FORMATS))
+    assert segments == expected
+    assert requests == 0
+
+
+def test_groups_resume_with_count(origin, tmp_path):
+    path = str(tmp_path / 'run.sqlite')
+    expected = list(create(origin, count=5).iter_segment_groups(dash=True, hls=True))
+
+    groups = create(origin, count=5, checkpoint_path=path).iter_segment_groups(
+        dash=True, hls=True)
+    for _ in range(3):
+        next(groups)
+    groups.close()
+
+    assert list(create(origin, count=5, checkpoint_path=path).iter_segment_groups(
+        dash=True, hls=True)) == expected
+
+
+def test_failed_isms_are_retried(origin, tmp_path, monkeypatch):
+    path = str(tmp_path / 'run.sqlite')
+    expected = create(origin).get_format_segment_urls(dash=True, smooth=True)
+    get_mpd_manifest = dash.Dash.get_mpd_manifest
+
+    def failing(self, mpd_url):
+        if ISMS[2] in mpd_url:
+            self.failures.add('dash', mpd_url, 'fetch', IOError('failed'))
+            return None
+        return get_mpd_manifest(self, mpd_url)
+
+    monkeypatch.setattr(dash.Dash, 'get_mpd_manifest', failing)
+    failed_run = create(origin, checkpoint_path=path)
+    assert failed_run.get_format_segment_urls(dash=True, smooth=True) != expected
+    assert len(failed_run.failures) == 1
+    monkeypatch.undo()
+
+    segments, requests = count_requests(origin, lambda: create(
+        origin, checkpoint_path=path).get_format_segment_urls(dash=True, smooth=True))
+    assert segments == expected
+    assert requests == 1
+
+
+def test_completed_run_is_replayed_until_cleared(origin, tmp_path):
+    path = str(tmp_path / 'run.sqlite')
+    expected = create(origin).get_format_segment_urls(dash=True)
+    create(origin, checkpoint_path=path).get_format_segment_urls(dash=True)
+    create(origin, checkpoint_path=path).get_format_segment_urls(hls=True)
+
+    segments, requests = count_requests(origin, lambda: create(
+        origin, checkpoint_path=path).get_format_segment_urls(dash=True))
+    assert segments == expected
+    assert requests == 0
+
+    create(origin, checkpoint_path=path).clear_checkpoint(dash=True)
+    segments, requests = count_requests(origin, lambda: create(
+        origin, checkpoint_path=path).get_format_segment_urls(dash=True))
+    assert segments == expected
+    assert requests == len(ISMS)
+    # the hls run is kept
+    _, requests = count_requests(origin, lambda: create(
+        origin, checkpoint_path=path).get_format_segment_urls(hls=True))
+    assert requests == 0
+
+
+def test_reset_checkpoint(origin, tmp_path):
+    path = str(tmp_path / 'run.sqlite')
+    create(origin, checkpoint_path=path).get_format_segment_urls(dash=True)
+
+    generator = create(origin, checkpoint_path=path, reset_checkpoint=True)
+    _, requests = count_requests(origin, lambda: generator.get_format_segment_urls(dash=True))
+    assert requests == len(ISMS)
+    # the progress of the reset run is kept
+    _, requests = count_requests(origin, lambda: generator.get_format_segment_urls(dash=True))
+    assert requests == 0
@@ -0,0 +1,98 @@
+import pytest
+
+import seg_gen
+from benchmarks import stand_in
+from seg_gen import endpoints, templates
+from seg_gen.timeline import SegmentTimeline
+
+KEYS = stand_in.synthetic_ism_keys(3)
+ISMS = [key for key in KEYS if key.endswith('.ism')]
+FORMATS = {'hls': True, 'dash': True}
+CDN = 'http://cdn.example.com/'
+
+
+@pytest.fixture(scope='module')
+def origin():
+    with stand_in.StandInOrigin(segments=5, tracks=1, audio_tracks=1) as server:
+        yield server
+
+
+def create(origin, **kwargs):
+    return seg_gen.SegGen([origin.url, CDN], 'bucket',
+                          s3_client=stand_in.StubS3Client(KEYS), **kwargs)
+
+
+def test_rewrite_urls():
+    urls = ['http://uso/a.ism/1.ts', 'http://other/a.ism/2.ts']
+    assert endpoints.rewrite_urls(urls, 'http://uso/', CDN) == [
+        CDN + 'a.ism/1.ts', 'http://other/a.ism/2.ts']
+    assert endpoints.rewrite_urls(urls, 'http://uso/', 'http://uso/') is urls
+    assert endpoints.rewrite_url('http://uso/a.ism/', 'http://uso/', CDN) == CDN + 'a.ism/'
+
+
+def test_rewrite_timeline():
+    template = templates.compile_dash_template(
+        'media-$Time$.dash', base='http://uso/a.ism/dash/')
+    segment_timeline = SegmentTimeline.from_runs(
+        template, [(0, 2000, 2)], initialization='http://uso/a.ism/dash/init.dash')
+
+    moved = endpoints.rewrite_timeline(segment_timeline, 'http://uso/', CDN)
+
+    assert moved.initialization == CDN + 'a.ism/dash/init.dash'
+    assert list(moved) == [CDN + 'a.ism/dash/media-{}.dash'.format(time)
+                           for time in (0, 2000, 4000)]
+    assert list(segment_timeline)[0] == 'http://uso/a.ism/dash/media-0.dash'
+    custom = SegmentTimeline.from_runs(lambda time: 'http://uso/{}.ts'.format(time), [(0, 1, 1)])
+    assert list(endpoints.rewrite_timeline(custom, 'http://uso/', CDN)) == [
+        CDN + '0.ts', CDN + '1.ts']
+
+
+def test_interleave():
+    assert endpoints.interleave([['a1', 'a2'], ['b1', 'b2']]) == ['a1', 'b1', 'a2', 'b2']
+    assert endpoints.interleave([['a1']]) == ['a1']
+
+
+def test_per_endpoint_order(origin):
+    primary = seg_gen.SegGen(origin.url, 'bucket', s3_client=stand_in.StubS3Client(KEYS))
+    expected = primary.get_format_segment_urls(**FORMATS)
+    before = dict(origin.requests)
+
+    segments = create(origin).get_format_segment_urls(**FORMATS)
+
+    assert segments == expected + [CDN + url[len(origin.url):] for url in expected]
+    # the manifests are fetched once, from the primary endpoint
+    assert origin.requests['m3u8'] - before['m3u8'] == 2 * len(ISMS)
+    assert origin.requests['mpd'] - before['mpd'] == len(ISMS)
+
+
+def test_interleaved_order(origin):
+    primary = seg_gen.SegGen(origin.url, 'bucket', s3_client=stand_in.StubS3Client(KEYS))
+    expected = primary.get_format_segment_urls(**FORMATS)
+    generator = create(origin, endpoint_order='interleaved')
+
+    def interleave(urls):
+        return [url for primary_url in urls
+                for url in (primary_url, CDN + primary_url[len(origin.url):])]
+
+    assert generator.get_format_segment_urls(**FORMATS) == interleave(expected)
+    # iter_format_segment_urls goes ism by ism instead of format by format
+    assert list(generator.iter_format_segment_urls(**FORMATS)) == interleave(
+        primary.iter_format_segment_urls(**FORMATS))
+
+
+def test_segment_groups_per_endpoint(origin):
+    groups = list(create(origin).iter_segment_groups(dash=True))
+    assert len(groups) == 2 * len(ISMS)
+    for (_, primary_url, primary_segments), (_, cdn_url, cdn_segments) in zip(
+            groups[::2], groups[1::2]):
+        assert cdn_url == CDN + primary_url[len(origin.url):]
+        assert cdn_segments == [CDN + url[len(origin.url):] for url in primary_segments]
+    assert list(create(origin).iter_format_segment_urls(dash=True)) == [
+        url for _, _, segments in groups for url in segments]
+
+
+def test_invalid_endpoints():
+    with pytest.raises(SystemExit):
+        seg_gen.SegGen([], 'bucket')
+    with pytest.raises(SystemExit):
+        seg_gen.SegGen(['http://uso/'], 'bucket', endpoint_order='random')
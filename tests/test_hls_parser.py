@@ -0,0 +1,87 @@
+import m3u8
+import pytest
+
+from benchmarks import stand_in
+from seg_gen import hls_parser
+
+URL = 'http://uso/vod/a.ism/.m3u8'
+
+MEDIA = b'''#EXTM3U
+#EXT-X-VERSION:4
+#EXT-X-TARGETDURATION:4
+#EXT-X-MEDIA-SEQUENCE:7
+#EXTINF:4, no desc
+media-video=400000-7.ts
+#EXTINF:4,
+../other.ism/media-video=400000-8.ts
+#EXTINF:4,
+/root/a.ism/media-video=400000-9.ts?token=x
+#EXTINF:4,
+http://cdn/a.ism/media-video=400000-10.ts
+#EXT-X-ENDLIST
+'''
+
+LOW_LATENCY = b'''#EXTM3U
+#EXT-X-TARGETDURATION:4
+#EXT-X-PART-INF:PART-TARGET=1.0
+#EXT-X-MEDIA-SEQUENCE:1
+#EXTINF:4,
+media-1.ts
+#EXT-X-PART:DURATION=1.0,URI="media-2.0.mp4"
+#EXT-X-PRELOAD-HINT:TYPE=PART,URI="media-2.1.mp4"
+'''
+
+
+def chunked(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def fields(playlist):
+    return (playlist.is_variant,
+            [(entry.uri, entry.absolute_uri, entry.bandwidth, entry.resolution)
+             for entry in playlist.playlists],
+            [(entry.uri, entry.absolute_uri, entry.media_type) for entry in playlist.media],
+            playlist.segment_uris, playlist.media_sequence, playlist.target_duration,
+            playlist.is_endlist)
+
+
+def with_m3u8(body):
+    return hls_parser.Playlist.from_m3u8(m3u8.loads(body.decode('utf-8'), uri=URL))
+
+
+@pytest.mark.parametrize('body', [
+    stand_in.synthetic_master_m3u8(3, 2),
+    stand_in.synthetic_media_m3u8(segments=50),
+    MEDIA,
+    MEDIA.replace(b'\n', b'\r\n'),
+    ])
+@pytest.mark.parametrize('chunk_size', [1, 7, 64 * 1024])
+def test_fast_path_matches_m3u8(body, chunk_size, monkeypatch):
+    expected = fields(with_m3u8(body))
+    monkeypatch.setattr(m3u8, 'loads', None)
+    assert fields(hls_parser.parse_playlist(chunked(body, chunk_size), URL)) == expected
+
+
+@pytest.mark.parametrize('body', [LOW_LATENCY, MEDIA[len(b'#EXTM3U\n'):]])
+def test_falls_back_to_m3u8(body, monkeypatch):
+    expected = fields(with_m3u8(body))
+    loads = m3u8.loads
+    calls = list()
+
+    def counting_loads(content, uri=None):
+        calls.append(uri)
+        return loads(content, uri=uri)
+
+    monkeypatch.setattr(m3u8, 'loads', counting_loads)
+    assert fields(hls_parser.parse_playlist(chunked(body, 16), URL)) == expected
+    assert calls == [URL]
+
+
+def test_select_variant():
+    body = stand_in.synthetic_master_m3u8(3, 2)
+    entry = hls_parser.select_variant(
+        chunked(body, 32), URL, lambda playlist: playlist.bandwidth > 600000)
+    assert entry.uri == 'media-video=800000.m3u8'
+    assert entry.absolute_uri == 'http://uso/vod/a.ism/media-video=800000.m3u8'
+    assert entry.resolution == (1280, 720)
+    assert hls_parser.select_variant([body], URL, lambda playlist: False) is None
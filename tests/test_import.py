@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import seg_gen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('boto3', 'botocore', 'requests', 'm3u8', 'xmltodict')
+
+SCRIPT = '''
+import sys
+import {module}
+print(' '.join(sorted(name for name in sys.modules
+                      if name in {heavy!r} or name.startswith('seg_gen.'))))
+'''
+
+
+def import_fresh(module):
+    """Imports module in a fresh interpreter.
+
+    Returns:
+        set -- Loaded heavy modules and seg_gen submodules
+    """
+
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.run(
+        [sys.executable, '-c', SCRIPT.format(module=module, heavy=HEAVY_MODULES)],
+        check=True, stdout=subprocess.PIPE, universal_newlines=True, env=env,
+        cwd=ROOT).stdout
+    return set(output.split())
+
+
+@pytest.mark.parametrize('module', ['seg_gen'] + ['seg_gen.' + name
+                                                  for name in seg_gen._SUBMODULES])
+def test_import_loads_no_heavy_modules(module):
+    assert import_fresh(module).isdisjoint(HEAVY_MODULES)
+
+
+def test_package_import_loads_no_submodules():
+    assert import_fresh('seg_gen') == set()
+
+
+def test_submodules_are_imported_lazily():
+    code = 'import sys, seg_gen; print("seg_gen.dash" in sys.modules); seg_gen.dash; ' \
+           'print("seg_gen.dash" in sys.modules)'
+    output = subprocess.run(
+        [sys.executable, '-c', code], check=True, stdout=subprocess.PIPE,
+        universal_newlines=True, env=dict(os.environ, PYTHONPATH=ROOT), cwd=ROOT).stdout
+    assert output.split() == ['False', 'True']
@@ -0,0 +1,75 @@
+import seg_gen
+from benchmarks import stand_in
+from seg_gen import ism_index, s3_ism_urls
+
+KEYS = stand_in.synthetic_ism_keys(20)
+ISMS = [key for key in KEYS if key.endswith('.ism')]
+
+
+def create(tmp_path, s3, bucket='bucket', prefix=''):
+    index = ism_index.IsmIndex(str(tmp_path / 'isms.sqlite'), bucket, prefix=prefix)
+    return index, s3_ism_urls.IsmUrls(s3_client=s3)
+
+
+def test_incremental_refresh_lists_only_new_keys(tmp_path):
+    s3 = stand_in.StubS3Client(KEYS)
+    index, ism_urls = create(tmp_path, s3)
+    assert index.refresh(ism_urls) == len(ISMS)
+    assert list(index.get_keys()) == ISMS
+    assert index.last_key() == ISMS[-1]
+
+    s3.add_keys(['vod99/new1.ism', 'vod99/new2.ism', 'vod99/new2-0.ismv'])
+    assert index.refresh(ism_urls) == 2
+    assert list(index.get_keys()) == ISMS + ['vod99/new1.ism', 'vod99/new2.ism']
+    assert list(index.get_keys(count=2, start_after=ISMS[-1])) == [
+        'vod99/new1.ism', 'vod99/new2.ism']
+
+    # nothing after the last key
+    assert index.refresh(ism_urls) == 0
+    assert len(index) == len(ISMS) + 2
+
+
+def test_full_refresh_reconciles(tmp_path):
+    s3 = stand_in.StubS3Client(KEYS)
+    index, ism_urls = create(tmp_path, s3)
+    index.refresh(ism_urls)
+
+    s3.keys = sorted([key for key in KEYS if key != ISMS[3]] + ['vod00/aaa.ism'])
+    # keys before the last indexed key and deletions are only found by a full refresh
+    assert index.refresh(ism_urls) == 0
+    assert ISMS[3] in index.get_keys()
+    assert index.refresh(ism_urls, full=True) == len(ISMS)
+    assert list(index.get_keys()) == sorted(
+        [key for key in ISMS if key != ISMS[3]] + ['vod00/aaa.ism'])
+
+
+def test_indexes_are_kept_per_bucket_and_prefix(tmp_path):
+    s3 = stand_in.StubS3Client(KEYS)
+    index, ism_urls = create(tmp_path, s3)
+    index.refresh(ism_urls)
+    index.close()
+
+    vod01, ism_urls = create(tmp_path, s3, prefix='vod01/')
+    vod01.refresh(ism_urls)
+    assert list(vod01.get_keys()) == [key for key in ISMS if key.startswith('vod01/')]
+    other, _ = create(tmp_path, s3, bucket='other')
+    assert len(other) == 0
+    index, _ = create(tmp_path, s3)
+    assert list(index.get_keys()) == ISMS
+
+
+def test_seg_gen_refresh_modes(tmp_path):
+    path = str(tmp_path / 'isms.sqlite')
+    s3 = stand_in.StubS3Client(KEYS)
+
+    def list_isms(refresh_index):
+        generator = seg_gen.SegGen('http://uso/', 'bucket', s3_client=s3, index_path=path,
+                                   refresh_index=refresh_index)
+        return [url[len('http://uso/'):-1] for url in generator._get_ism_path()]
+
+    assert list_isms('incremental') == ISMS
+    s3.add_keys(['vod99/new.ism'])
+    calls = s3.calls
+    assert list_isms('none') == ISMS
+    assert s3.calls == calls
+    assert list_isms('incremental') == ISMS + ['vod99/new.ism']
@@ -0,0 +1,138 @@
+from seg_gen import dash, hls, live, smooth
+from seg_gen.timeline import SegmentTimeline
+
+BASE_URL = 'http://uso/live.ism/'
+
+MPD = '''<?xml version="1.0" encoding="utf-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="{type}" minimumUpdatePeriod="PT2S"
+  availabilityStartTime="1970-01-01T00:00:00Z">
+<Period id="1" start="PT0S">
+<BaseURL>dash/</BaseURL>
+<AdaptationSet contentType="video" mimeType="video/mp4">
+<SegmentTemplate timescale="1000" initialization="live-$RepresentationID$.dash"
+  media="live-$RepresentationID$-$Time$.dash">
+<SegmentTimeline>
+<S t="{start}" d="2000" r="{repeat}"/>
+</SegmentTimeline>
+</SegmentTemplate>
+<Representation id="video=400000" bandwidth="400000" width="1280" height="720"/>
+</AdaptationSet>
+</Period>
+</MPD>
+'''
+
+SMOOTH = '''<?xml version="1.0" encoding="utf-8"?>
+<SmoothStreamingMedia MajorVersion="2" MinorVersion="2" TimeScale="10000000" Duration="0"
+  IsLive="{live}" LookAheadFragmentCount="2">
+<StreamIndex Type="video" QualityLevels="1" TimeScale="10000000" Name="video"
+  Url="QualityLevels({{bitrate}})/Fragments(video={{start time}})">
+<QualityLevel Index="0" Bitrate="400000" FourCC="AVC1" MaxWidth="1280" MaxHeight="720"/>
+<c t="{start}" d="20000000" r="{count}"/>
+</StreamIndex>
+</SmoothStreamingMedia>
+'''
+
+MASTER = '''#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=400000,RESOLUTION=1280x720
+live-video=400000.m3u8
+'''
+
+
+def media_playlist(sequence, count, ended=False):
+    lines = ['#EXTM3U', '#EXT-X-TARGETDURATION:4', '#EXT-X-MEDIA-SEQUENCE:{}'.format(sequence)]
+    for number in range(sequence, sequence + count):
+        lines.extend(['#EXTINF:4,', 'live-video=400000-{}.ts'.format(number)])
+    if ended:
+        lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines) + '\n'
+
+
+class FakeTransport():
+    """Answers every URL with the next of its bodies, the last one is repeated."""
+
+    def __init__(self, bodies):
+        self.bodies = dict((url, list(texts)) for url, texts in bodies.items())
+
+    def __next_body(self, url):
+        texts = self.bodies[url]
+        text = texts.pop(0) if len(texts) > 1 else texts[0]
+        return [text.encode('utf-8')]
+
+    def stream(self, url):
+        return iter(self.__next_body(url))
+
+    def open_stream(self, url):
+        return url, iter(self.__next_body(url))
+
+
+def test_cursor_returns_only_new_segments():
+    cursor = live.TimelineCursor()
+    first = SegmentTimeline.from_runs(str, [(0, 2, 2)], initialization='init')
+    assert cursor.advance('video', first) == ['init', '0', '2', '4']
+    # the window slid by one segment and two segments were appended
+    second = SegmentTimeline.from_runs(str, [(2, 2, 3)], initialization='init')
+    assert cursor.advance('video', second) == ['6', '8']
+    assert cursor.advance('video', second) == []
+
+
+def test_follow_mpd():
+    client = dash.Dash(transport=FakeTransport({BASE_URL + '.mpd': [
+        MPD.format(type='dynamic', start=0, repeat=2),
+        MPD.format(type='dynamic', start=2000, repeat=3),
+        MPD.format(type='static', start=2000, repeat=4),
+        ]}))
+    slept = list()
+
+    segments = list(client.follow_mpd_segment_urls(BASE_URL, sleep=slept.append))
+
+    assert segments == [BASE_URL + 'dash/live-video=400000.dash'] + [
+        BASE_URL + 'dash/live-video=400000-{}.dash'.format(time)
+        for time in (0, 2000, 4000, 6000, 8000, 10000)]
+    assert slept == [2.0, 2.0]
+
+
+def test_follow_smooth():
+    url = BASE_URL + 'manifest'
+    client = smooth.Smooth(transport=FakeTransport({url: [
+        SMOOTH.format(live='TRUE', start=0, count=1),
+        SMOOTH.format(live='TRUE', start=20000000, count=2),
+        SMOOTH.format(live='FALSE', start=20000000, count=2),
+        ]}))
+    slept = list()
+
+    segments = list(client.follow_smooth_segment_urls(BASE_URL, sleep=slept.append))
+
+    assert segments == [BASE_URL + 'QualityLevels(400000)/Fragments(video={})'.format(time)
+                        for time in (0, 20000000, 40000000, 60000000)]
+    # two fragments of lookahead
+    assert slept == [4.0, 4.0]
+
+
+def test_follow_hls_playlists():
+    playlist_url = BASE_URL + 'live-video=400000.m3u8'
+    client = hls.Hls(transport=FakeTransport({
+        BASE_URL + '.m3u8': [MASTER],
+        playlist_url: [media_playlist(1, 3), media_playlist(1, 3), media_playlist(2, 4),
+                       media_playlist(2, 5, ended=True)],
+        }))
+    slept = list()
+
+    segments = list(client.follow_segments(BASE_URL + '.m3u8', sleep=slept.append))
+
+    assert segments == [BASE_URL + 'live-video=400000-{}.ts'.format(number)
+                        for number in range(1, 7)]
+    # a reload without new segments waits half the target duration
+    assert slept == [4, 2.0, 4]
+
+
+def test_follow_stops_after_max_polls():
+    polls = list()
+
+    def poll():
+        polls.append(len(polls))
+        return [str(len(polls))], 1.0
+
+    assert list(live.follow(poll, sleep=lambda seconds: None, max_polls=3)) == ['1', '2', '3']
+    slept = list()
+    list(live.follow(lambda: ([], 0.01), sleep=slept.append, max_polls=2))
+    assert slept == [live.MIN_INTERVAL]
@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+import seg_gen
+from benchmarks import stand_in
+from seg_gen import probe, workers
+
+KEYS = stand_in.synthetic_ism_keys(3)
+
+
+@pytest.fixture(scope='module')
+def origin():
+    with stand_in.StandInOrigin(segments=10, tracks=1, audio_tracks=1,
+                               missing_share=0.2) as server:
+        yield server
+
+
+def get_groups(origin):
+    generator = seg_gen.SegGen(origin.url, 'bucket', s3_client=stand_in.StubS3Client(KEYS))
+    return list(generator.iter_segment_groups(dash=True, smooth=True))
+
+
+def test_head_probes(origin):
+    groups = get_groups(origin)
+    urls = [url for _, _, segments in groups for url in segments]
+    before = origin.requests.get('segment', 0)
+
+    report = probe.SegmentProber(workers=4).run(iter(groups))
+
+    assert origin.requests['segment'] - before == len(urls)
+    merged = report.by_format()
+    assert sorted(merged) == ['dash', 'smooth']
+    assert sum(stats.count for stats in merged.values()) == len(urls)
+    status_codes = {code for stats in merged.values() for code in stats.status_codes}
+    assert status_codes == {200, 404}
+    assert sum(stats.bytes for stats in merged.values()) == 0
+    assert report.failed_isms()
+    summary = merged['dash'].summary()
+    assert summary['ttfb_p50'] is not None
+    assert summary['latency_max'] > 0
+    assert 'dash' in report.format_summary()
+
+
+def test_ranged_get(origin):
+    groups = get_groups(origin)
+    prober = probe.SegmentProber(method='GET', range_bytes=1, workers=2)
+    stats = prober.run(groups).by_format()['dash']
+    assert set(stats.status_codes) <= {206, 404}
+    assert stats.bytes == stats.status_codes[206]
+
+
+def test_connection_errors():
+    with stand_in.StandInOrigin() as server:
+        url = server.url
+    report = probe.SegmentProber(workers=2).run([('hls', url + 'a.ism/', [url + 'a.ts'] * 3)])
+    stats = report.by_ism()[('hls', url + 'a.ism/')]
+    assert stats.errors == {'connection': 3}
+    assert report.failed_isms() == [('hls', url + 'a.ism/')]
+
+
+def test_rate_limiter_spaces_calls():
+    now = [0.0]
+    slept = list()
+
+    def sleep(seconds):
+        slept.append(seconds)
+
+    limiter = probe.RateLimiter(4, clock=lambda: now[0], sleep=sleep)
+    for _ in range(3):
+        limiter.acquire()
+    assert slept == [0.25, 0.5]
+    now[0] = 10.0
+    limiter.acquire()
+    assert slept == [0.25, 0.5]
+
+
+def test_unordered_imap_does_not_wait_for_slow_items():
+    release = threading.Event()
+
+    def run(item):
+        if item == 0:
+            assert release.wait(5)
+        return item
+
+    results = list()
+    for result in workers.unordered_imap(run, range(20), workers=4):
+        results.append(result)
+        if len(results) == 19:
+            release.set()
+    assert results[-1] == 0
+    assert sorted(results) == list(range(20))
@@ -0,0 +1,169 @@
+import pytest
+import requests
+
+from seg_gen import resilience, transport
+
+
+class Clock():
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Response():
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.url = 'http://uso/v.ism/.mpd'
+
+    def close(self):
+        pass
+
+
+class Session():
+    """Returns the queued responses and raises the queued exceptions."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return Response(outcome)
+
+
+ORIGIN = 'http://uso'
+URL = 'http://uso/v.ism/.mpd'
+
+
+def open_breaker(clock, failures=2):
+    breaker = resilience.CircuitBreaker(failures=failures, reset_timeout=10.0, clock=clock)
+    for _ in range(failures):
+        breaker.before_request(ORIGIN)
+        breaker.record(ORIGIN, False)
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = resilience.CircuitBreaker(failures=3, reset_timeout=10.0, clock=Clock())
+    for success in (False, False, True, False, False):
+        breaker.before_request(ORIGIN)
+        breaker.record(ORIGIN, success)
+    assert not breaker.is_open(ORIGIN)
+
+    breaker.record(ORIGIN, False)
+    assert breaker.is_open(ORIGIN)
+    with pytest.raises(resilience.CircuitOpenError):
+        breaker.before_request(ORIGIN)
+    # other origins are not affected
+    breaker.before_request('http://other')
+
+
+def test_half_open_trial_closes_on_success():
+    clock = Clock()
+    breaker = open_breaker(clock)
+    clock.now = 10.0
+    assert not breaker.is_open(ORIGIN)
+
+    breaker.before_request(ORIGIN)
+    # only one trial at a time
+    with pytest.raises(resilience.CircuitOpenError):
+        breaker.before_request(ORIGIN)
+    breaker.record(ORIGIN, True)
+    breaker.before_request(ORIGIN)
+    breaker.before_request(ORIGIN)
+
+
+def test_half_open_trial_reopens_on_failure():
+    clock = Clock()
+    breaker = open_breaker(clock)
+    clock.now = 10.0
+    breaker.before_request(ORIGIN)
+    breaker.record(ORIGIN, False)
+    assert breaker.is_open(ORIGIN)
+
+    clock.now = 19.0
+    with pytest.raises(resilience.CircuitOpenError):
+        breaker.before_request(ORIGIN)
+    clock.now = 20.0
+    breaker.before_request(ORIGIN)
+
+
+def test_released_trial_lets_next_trial_through():
+    clock = Clock()
+    breaker = open_breaker(clock)
+    clock.now = 10.0
+    breaker.before_request(ORIGIN)
+    breaker.release(ORIGIN)
+    breaker.before_request(ORIGIN)
+
+
+def test_disabled_breaker():
+    breaker = resilience.CircuitBreaker(failures=0)
+    for _ in range(10):
+        breaker.before_request(ORIGIN)
+        breaker.record(ORIGIN, False)
+    assert not breaker.is_open(ORIGIN)
+
+
+def create_transport(outcomes, clock, retries=0, failures=2):
+    return transport.Transport(
+        session=Session(outcomes),
+        retry=resilience.RetryPolicy(retries=retries, sleep=lambda seconds: None),
+        breaker=resilience.CircuitBreaker(failures=failures, reset_timeout=10.0, clock=clock))
+
+
+def test_transport_trial_raising_other_error_is_released():
+    clock = Clock()
+    shared = create_transport([
+        requests.ConnectionError(), requests.ConnectionError(),
+        requests.TooManyRedirects(), 200], clock)
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            shared.get(URL)
+    with pytest.raises(resilience.CircuitOpenError):
+        shared.get(URL)
+
+    clock.now = 10.0
+    with pytest.raises(requests.TooManyRedirects):
+        shared.get(URL)
+    # the trial ended without an outcome, the next request is the next trial
+    assert shared.get(URL).status_code == 200
+    assert not shared.breaker.is_open(ORIGIN)
+    shared.breaker.before_request(ORIGIN)
+
+
+def test_transport_retries_retryable_status_codes():
+    clock = Clock()
+    shared = create_transport([503, requests.Timeout(), 200], clock, retries=2, failures=5)
+    assert shared.get(URL).status_code == 200
+    assert shared.session.calls == 3
+
+    shared = create_transport([503, 503], clock, retries=1, failures=5)
+    assert shared.get(URL).status_code == 503
+
+
+def test_retry_policy_backoff():
+    waits = list()
+    policy = resilience.RetryPolicy(backoff=1.0, backoff_max=3.0, sleep=waits.append, seed=1)
+    for attempt in range(4):
+        policy.wait(attempt)
+    assert all(0 <= wait <= bound for wait, bound in zip(waits, (1.0, 2.0, 3.0, 3.0)))
+
+
+def test_failure_report():
+    report = resilience.FailureReport()
+    assert len(report) == 0
+    report.add('dash', 'http://uso/a.ism/.mpd', 'fetch', requests.Timeout('slow'))
+    report.add('hls', 'http://uso/b.ism/', 'expand', ValueError('bad'))
+
+    assert report.has_failed('dash', 'http://uso/a.ism/')
+    assert not report.has_failed('hls', 'http://uso/a.ism/')
+    assert report.counts() == {('dash', 'timeout'): 1, ('hls', 'error'): 1}
+    assert sorted(report.by_ism()) == ['http://uso/a.ism/', 'http://uso/b.ism/']
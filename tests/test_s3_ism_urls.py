@@ -0,0 +1,50 @@
+import pytest
+
+from benchmarks import stand_in
+from seg_gen import s3_ism_urls
+
+KEYS = stand_in.synthetic_ism_keys(3000, folders=100)
+
+
+def list_keys(list_workers, count=-1, start_after=None, keys=KEYS):
+    s3 = stand_in.StubS3Client(keys)
+    ism_urls = s3_ism_urls.IsmUrls(s3_client=s3, list_workers=list_workers)
+    listed = [obj['Key'] for obj in ism_urls.get_matching_s3_objects(
+        'bucket', count=count, start_after=start_after)]
+    return listed, s3.calls
+
+
+@pytest.mark.parametrize('count', [-1, 3, 1000, 1001, 1500])
+def test_parallel_listing_matches_serial(count):
+    serial, _ = list_keys(1, count)
+    parallel, _ = list_keys(4, count)
+    assert parallel == serial
+    assert len(serial) == (3000 if count < 0 else count)
+
+
+def test_parallel_listing_with_prefix():
+    s3 = stand_in.StubS3Client(KEYS)
+    serial = list(s3_ism_urls.IsmUrls(s3_client=s3).get_matching_s3_keys('bucket', 'vod1'))
+    parallel = list(s3_ism_urls.IsmUrls(s3_client=s3, list_workers=4).get_matching_s3_keys(
+        'bucket', 'vod1'))
+    assert parallel == serial
+    assert all(key.startswith('vod1') and key.endswith('.ism') for key in serial)
+
+
+def test_small_count_is_pushed_down():
+    _, serial_calls = list_keys(1, 3)
+    _, parallel_calls = list_keys(4, 3)
+    assert serial_calls <= 2
+    assert parallel_calls == serial_calls
+
+
+def test_large_count_stops_listing_prefixes():
+    _, all_calls = list_keys(4)
+    _, count_calls = list_keys(4, 1001)
+    assert count_calls < all_calls / 2
+
+
+def test_start_after():
+    serial, _ = list_keys(1)
+    listed, _ = list_keys(4, start_after=serial[99])
+    assert listed == serial[100:]
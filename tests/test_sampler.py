@@ -0,0 +1,77 @@
+import collections
+
+import pytest
+
+from seg_gen import sampler
+from seg_gen.timeline import SegmentTimeline
+
+
+def timeline(name, count=10):
+    segments = SegmentTimeline(lambda time: '{}-{}'.format(name, time))
+    segments.append(0, 1, count - 1)
+    return segments
+
+
+def shares_of(segment_sampler, count=20000):
+    draws = collections.Counter(url.split('-')[0] for url in segment_sampler.sample(count))
+    return dict((name, hits / float(count)) for name, hits in draws.items())
+
+
+def test_alias_table_follows_weights():
+    import random
+    table = sampler.AliasTable([1.0, 3.0, 0.0])
+    rng = random.Random(1)
+    draws = collections.Counter(table.draw(rng) for _ in range(20000))
+    assert draws[2] == 0
+    assert draws[1] / 20000.0 == pytest.approx(0.75, abs=0.02)
+
+
+def test_bitrate_shares():
+    segment_sampler = sampler.SegmentSampler(
+        seed=1, bitrate_shares={400000: 0.2, 1500000: 0.8})
+    added = segment_sampler.add_ism(
+        'a', [timeline('low'), timeline('high'), timeline('other')], [400000, 1500000, 800000])
+    assert added == 2
+    shares = shares_of(segment_sampler)
+    assert shares['low'] == pytest.approx(0.2, abs=0.02)
+    assert shares['high'] == pytest.approx(0.8, abs=0.02)
+
+
+def test_timelines_without_bitrate_are_not_drawn_with_shares():
+    segment_sampler = sampler.SegmentSampler(
+        seed=1, bitrate_shares={400000: 0.2, 1500000: 0.8})
+    segment_sampler.add_ism(
+        'a', [timeline('low'), timeline('high'), timeline('audio')], [400000, 1500000, None])
+    shares = shares_of(segment_sampler)
+    assert 'audio' not in shares
+    assert shares['low'] == pytest.approx(0.2, abs=0.02)
+
+
+def test_timelines_without_bitrate_are_drawn_without_shares():
+    segment_sampler = sampler.SegmentSampler(seed=1)
+    segment_sampler.add_ism('a', [timeline('video'), timeline('audio')], [400000, None])
+    shares = shares_of(segment_sampler)
+    assert shares['audio'] == pytest.approx(0.5, abs=0.02)
+
+
+def test_zipf_weights_of_isms():
+    segment_sampler = sampler.SegmentSampler(seed=1)
+    segment_sampler.add_ism('first', [timeline('first')])
+    segment_sampler.add_ism('second', [timeline('second')])
+    shares = shares_of(segment_sampler)
+    assert shares['first'] == pytest.approx(2 / 3.0, abs=0.02)
+
+
+def test_position_half_life():
+    segment_sampler = sampler.SegmentSampler(seed=1, position_half_life=1)
+    segment_sampler.add_ism('a', [timeline('a', count=1000)])
+    positions = collections.Counter(
+        int(url.split('-')[1]) for url in segment_sampler.sample(20000))
+    assert positions[0] / 20000.0 == pytest.approx(0.5, abs=0.02)
+    assert positions[1] / 20000.0 == pytest.approx(0.25, abs=0.02)
+
+
+def test_no_drawable_timeline():
+    segment_sampler = sampler.SegmentSampler(bitrate_shares={400000: 1.0})
+    assert segment_sampler.add_ism('a', [timeline('audio')], [None]) == 0
+    assert len(segment_sampler) == 0
@@ -0,0 +1,61 @@
+import collections
+
+import pytest
+
+import seg_gen
+from benchmarks import stand_in
+from seg_gen import workers
+
+KEYS = stand_in.synthetic_ism_keys(12)
+FORMATS = {'hls': True, 'dash': True}
+
+
+@pytest.fixture(scope='module')
+def origin():
+    with stand_in.StandInOrigin(segments=10, tracks=1, audio_tracks=1) as server:
+        yield server
+
+
+def create(origin, **kwargs):
+    return seg_gen.SegGen(origin.url, 'bucket', s3_client=stand_in.StubS3Client(KEYS), **kwargs)
+
+
+def as_counter(groups):
+    return collections.Counter(
+        (format_name, base_url, tuple(segments)) for format_name, base_url, segments in groups)
+
+
+@pytest.mark.parametrize('count', [None, 5])
+@pytest.mark.parametrize('shard_count', [2, 3])
+def test_shards_cover_the_unsharded_run(origin, count, shard_count):
+    kwargs = {'count': count} if count else {}
+    expected = list(create(origin, **kwargs).iter_segment_groups(**FORMATS))
+
+    shards = [list(create(origin, shard_index=index, shard_count=shard_count,
+                          **kwargs).iter_segment_groups(**FORMATS))
+              for index in range(shard_count)]
+
+    assert sum(map(as_counter, shards), collections.Counter()) == as_counter(expected)
+    isms = [{base_url for _, base_url, _ in shard} for shard in shards]
+    for index, shard_isms in enumerate(isms):
+        assert all(shard_isms.isdisjoint(other) for other in isms[index + 1:])
+
+
+def test_shard_union_of_segment_urls(origin):
+    expected = create(origin).get_format_segment_urls(**FORMATS)
+    segments = [segment for index in range(3)
+                for segment in create(origin, shard_index=index, shard_count=3)
+                .get_format_segment_urls(**FORMATS)]
+    assert sorted(segments) == sorted(expected)
+
+
+def test_get_shard_is_stable():
+    # crc32 of the UTF-8 key, the same in every process and on every host
+    assert workers.get_shard('a.ism', 1000) == 1384822418 % 1000
+    assert {workers.get_shard(key, 3) for key in KEYS} == {0, 1, 2}
+
+
+@pytest.mark.parametrize('shard_index', [-1, 3])
+def test_invalid_shard_index(origin, shard_index):
+    with pytest.raises(SystemExit):
+        create(origin, shard_index=shard_index, shard_count=3)
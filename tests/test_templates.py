@@ -0,0 +1,53 @@
+import pytest
+
+from seg_gen import templates
+
+BASE = 'http://uso/a.ism/dash/'
+
+
+@pytest.mark.parametrize('template, value, expected', [
+    ('media-$RepresentationID$-$Time$.dash', 2000, 'media-video=400000-2000.dash'),
+    ('seg-$Number%05d$.m4s', 42, 'seg-00042.m4s'),
+    ('seg-$Number%05d$.m4s', 1234567, 'seg-1234567.m4s'),
+    ('$Bandwidth$/$Time%03d$.m4s', 7, '400000/007.m4s'),
+    ('$Bandwidth%08d$-$Number$.m4s', 3, '00400000-3.m4s'),
+    ('cost$$-$Number$.m4s', 1, 'cost$-1.m4s'),
+    ('$RepresentationID$/$SubNumber$.m4s', 2, 'video=400000/2.m4s'),
+    ])
+def test_dash_template(template, value, expected):
+    compiled = templates.compile_dash_template(
+        template, representation_id='video=400000', bandwidth='400000', base=BASE)
+    assert compiled(value) == BASE + expected
+
+
+def test_constant_dash_template():
+    compiled = templates.compile_dash_template(
+        'init-$RepresentationID$.mp4', representation_id='audio=128000', base=BASE)
+    assert compiled.variable is None
+    assert compiled() == BASE + 'init-audio=128000.mp4'
+
+
+def test_dash_template_with_two_variables():
+    with pytest.raises(ValueError):
+        templates.compile_dash_template('$Number$-$Time$.m4s')
+
+
+def test_with_prefix():
+    compiled = templates.compile_dash_template('seg-$Number%03d$.m4s', base=BASE)
+    assert compiled.with_prefix('http://cdn/seg-')(5) == 'http://cdn/seg-005.m4s'
+    assert compiled(5) == BASE + 'seg-005.m4s'
+
+
+@pytest.mark.parametrize('template', [
+    'QualityLevels({bitrate})/Fragments(video={start time})',
+    'QualityLevels({Bitrate})/Fragments(video={start_time})',
+    ])
+def test_smooth_template(template):
+    compiled = templates.compile_smooth_template(template, '400000', base='http://uso/a.ism/')
+    assert compiled(20000000) == 'http://uso/a.ism/QualityLevels(400000)/Fragments(video=20000000)'
+
+
+def test_constant_smooth_template():
+    compiled = templates.compile_smooth_template('QualityLevels({bitrate})/init', 128000)
+    assert compiled.variable is None
+    assert compiled() == 'QualityLevels(128000)/init'
@@ -0,0 +1,103 @@
+import pytest
+
+from seg_gen import manifest_parser
+from seg_gen.timeline import SegmentTimeline
+
+MPD = b'''<?xml version="1.0"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="{type}" {mpd_attributes}>
+  <Period id="1" {period_attributes}>
+    <AdaptationSet contentType="video">
+      <SegmentTemplate timescale="1000" presentationTimeOffset="{offset}"
+                       media="v-$RepresentationID$-$Time$.dash">
+        <SegmentTimeline>
+          <S t="{offset}" d="2000" r="-1"/>
+        </SegmentTimeline>
+      </SegmentTemplate>
+      <Representation id="video=400000" bandwidth="400000"/>
+    </AdaptationSet>
+  </Period>
+</MPD>
+'''
+
+
+def parse(type='static', mpd_attributes='', period_attributes='', offset=0):
+    body = MPD.replace(b'{type}', type.encode()).replace(
+        b'{mpd_attributes}', mpd_attributes.encode()).replace(
+        b'{period_attributes}', period_attributes.encode()).replace(
+        b'{offset}', str(offset).encode())
+    return manifest_parser.parse_manifest([body])
+
+
+def test_runs():
+    segments = SegmentTimeline.from_runs(str, [(0, 2, 2), (None, 3, 0), (20, 1, 1)])
+    assert list(segments) == ['0', '2', '4', '6', '20', '21']
+    assert len(segments) == 6
+    assert segments[-2] == '20'
+    assert list(segments[1:3]) == ['2', '4']
+
+
+@pytest.mark.parametrize('runs, expected', [
+    ([(0, 2, -1), (6, 1, 0)], ['0', '2', '4', '6']),
+    # the last repetition before the next start time is partial
+    ([(0, 10, -1), (35, 10, 0)], ['0', '10', '20', '30', '35']),
+    ([(0, 2, -1), (7, 1, 0)], ['0', '2', '4', '6', '7']),
+    ])
+def test_negative_repeat_until_next_start(runs, expected):
+    assert list(SegmentTimeline.from_runs(str, runs)) == expected
+
+
+def test_negative_repeat_until_end_time():
+    segments = SegmentTimeline.from_runs(str, [(0, 2, 1), (None, 3, -1)], end_time=11)
+    # the last segment may end after the Period
+    assert list(segments) == ['0', '2', '4', '7', '10']
+
+
+def test_negative_repeat_without_end_time_raises():
+    with pytest.raises(ValueError):
+        SegmentTimeline.from_runs(str, [(0, 2, -1)])
+
+
+def test_parse_duration():
+    assert manifest_parser.parse_duration('PT1H2M3.5S') == 3723.5
+    assert manifest_parser.parse_duration('P1DT1S') == 86401
+    assert manifest_parser.parse_duration('P1Y') == 365 * 86400
+    assert manifest_parser.parse_duration(None) is None
+    assert manifest_parser.parse_duration('PT') is None
+    assert manifest_parser.parse_duration('2S') is None
+
+
+@pytest.mark.parametrize('mpd_attributes, period_attributes, expected', [
+    ('mediaPresentationDuration="PT10S"', '', 5),
+    ('mediaPresentationDuration="PT1M"', 'start="PT50S"', 5),
+    ('mediaPresentationDuration="PT1M"', 'duration="PT9S"', 5),
+    ])
+def test_static_period_end(mpd_attributes, period_attributes, expected):
+    manifest = parse(mpd_attributes=mpd_attributes, period_attributes=period_attributes,
+                     offset=3000)
+    track = manifest.tracks[0]
+    segments = SegmentTimeline.from_runs(
+        str, track.runs, end_time=manifest.get_end_time(track))
+    assert len(segments) == expected
+    assert segments[0] == '3000'
+
+
+def test_dynamic_period_end():
+    manifest = parse(type='dynamic',
+                     mpd_attributes='availabilityStartTime="1970-01-01T00:00:00Z"')
+    track = manifest.tracks[0]
+    assert manifest.get_end_time(track, now=60.0) == 60000
+    assert len(SegmentTimeline.from_runs(
+        str, track.runs, end_time=manifest.get_end_time(track, now=60.0))) == 30
+
+
+def test_unknown_period_end():
+    manifest = parse()
+    assert manifest.get_end_time(manifest.tracks[0]) is None
+
+
+def test_dash_client_reports_unknown_period_end():
+    from seg_gen import dash, resilience, transport
+    failures = resilience.FailureReport()
+    client = dash.Dash(transport.Transport(session=object()), failures=failures)
+    assert client.get_mpd_timeline('http://uso/v.ism/', parse()) is None
+    assert len(failures) == 1
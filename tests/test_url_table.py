@@ -0,0 +1,77 @@
+import os
+import sys
+
+import pytest
+
+import seg_gen
+from seg_gen import url_table
+
+GROUPS = [
+    ('dash', 'http://uso/a.ism/', ['http://uso/a.ism/dash/v-{}.dash'.format(i) for i in range(5)]),
+    ('hls', 'http://uso/a.ism/', []),
+    ('smooth', 'http://uso/b.ism/', ['http://uso/b.ism/QualityLevels(1)/Fragments(é=0)']),
+    ]
+
+
+def write(path, groups=GROUPS):
+    with url_table.UrlTableWriter(path) as writer:
+        for format_name, ism, urls in groups:
+            writer.add_group(format_name, ism, urls)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'segments.sgut')
+    write(path)
+
+    with url_table.UrlTable(path) as table:
+        urls = [url for _, _, group_urls in GROUPS for url in group_urls]
+        assert len(table) == len(urls)
+        assert list(table) == urls
+        assert table[-1] == urls[-1]
+        assert list(table.get_group('dash', 'http://uso/a.ism/')) == list(range(5))
+        assert len(table.get_group('hls', 'http://uso/a.ism/')) == 0
+        assert len(table.get_group('dash', 'http://uso/b.ism/')) == 0
+        with pytest.raises(IndexError):
+            table[len(urls)]
+    assert os.listdir(str(tmp_path)) == ['segments.sgut']
+
+
+def test_interrupted_write_keeps_previous_table(tmp_path):
+    path = str(tmp_path / 'segments.sgut')
+    write(path)
+
+    with url_table.UrlTable(path) as table:
+        with pytest.raises(RuntimeError):
+            with url_table.UrlTableWriter(path) as writer:
+                writer.add_group('dash', 'http://uso/c.ism/', ['http://uso/c.ism/1'])
+                raise RuntimeError('interrupted')
+        assert table[0] == GROUPS[0][2][0]
+
+    assert os.listdir(str(tmp_path)) == ['segments.sgut']
+    with url_table.UrlTable(path) as table:
+        assert len(table) == 6
+
+
+def test_rewrite_while_mapped(tmp_path):
+    path = str(tmp_path / 'segments.sgut')
+    write(path)
+
+    with url_table.UrlTable(path) as table:
+        write(path, [('dash', 'http://uso/c.ism/', ['http://uso/c.ism/1'])])
+        assert list(table)[:2] == GROUPS[0][2][:2]
+
+    with url_table.UrlTable(path) as table:
+        assert list(table) == ['http://uso/c.ism/1']
+
+
+def test_export_interrupted_by_exit(tmp_path, monkeypatch):
+    path = str(tmp_path / 'segments.sgut')
+
+    def groups(self, **kwargs):
+        yield GROUPS[0]
+        sys.exit(127)
+
+    monkeypatch.setattr(seg_gen.SegGen, 'iter_segment_groups', groups)
+    with pytest.raises(SystemExit):
+        seg_gen.SegGen('http://uso/', 'bucket').export_url_table(path, dash=True)
+    assert os.listdir(str(tmp_path)) == []
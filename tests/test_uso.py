@@ -0,0 +1,124 @@
+import pytest
+
+import seg_gen
+from benchmarks import stand_in
+from seg_gen import dash, manifest_parser, smooth, uso
+
+KEYS = stand_in.synthetic_ism_keys(4)
+FORMATS = {'hls': True, 'dash': True, 'smooth': True}
+
+
+@pytest.fixture(scope='module', params=[0.0, 0.3])
+def origin(request):
+    with stand_in.StandInOrigin(segments=30, repeat_density=request.param) as server:
+        yield server
+
+
+def create(origin, **kwargs):
+    return seg_gen.SegGen(origin.url, 'bucket', s3_client=stand_in.StubS3Client(KEYS), **kwargs)
+
+
+@pytest.mark.parametrize('all_tracks', [False, True])
+def test_default_scheme_from_dash(origin, all_tracks):
+    expected = create(origin, all_tracks=all_tracks).get_format_segment_urls(**FORMATS)
+    generator = create(origin, all_tracks=all_tracks, source_manifest='dash')
+    assert generator.uso_scheme.dash_timescale is None
+    assert generator.get_format_segment_urls(**FORMATS) == expected
+
+
+@pytest.mark.parametrize('all_tracks', [False, True])
+def test_smooth_with_dash_timescale(origin, all_tracks):
+    expected = create(origin, all_tracks=all_tracks).get_format_segment_urls(**FORMATS)
+    generator = create(origin, all_tracks=all_tracks, source_manifest='smooth',
+                       dash_timescale=1000)
+    assert generator.get_format_segment_urls(**FORMATS) == expected
+
+
+def test_smooth_needs_dash_timescale(origin):
+    with pytest.raises(SystemExit):
+        create(origin, source_manifest='smooth')
+    with pytest.raises(SystemExit):
+        create(origin, source_manifest='smooth', uso_scheme=uso.UsoScheme())
+
+
+def test_scheme_needs_dash_timescale(origin):
+    client = smooth.Smooth()
+    base_url = origin.url + KEYS[1] + '/'
+    manifest = client.get_smooth_manifest(client.get_smooth_url(base_url))
+    with pytest.raises(ValueError):
+        uso.UsoScheme().get_dash_timelines(base_url, manifest)
+
+    mpd = dash.Dash()
+    expected = mpd.get_mpd_timelines(base_url, mpd.get_mpd_manifest(mpd.get_callable_url(base_url)))
+    timelines = uso.UsoScheme(dash_timescale=1000).get_dash_timelines(
+        base_url, manifest, all_tracks=True)
+    assert sorted(url for timeline in timelines for url in timeline) == sorted(
+        url for timeline in expected for url in timeline)
+
+
+def test_scheme_urls():
+    manifest = manifest_parser.parse_manifest([stand_in.synthetic_mpd(1, 1, 3)])
+    scheme = uso.UsoScheme()
+    base_url = 'http://uso/a.ism/'
+
+    hls, = scheme.get_timelines('hls', base_url, manifest)
+    assert list(hls) == ['http://uso/a.ism/media-video=400000-{}.ts'.format(number)
+                         for number in (1, 2, 3)]
+    mpd, = scheme.get_timelines('dash', base_url, manifest)
+    assert mpd.initialization == 'http://uso/a.ism/dash/media-video=400000.dash'
+    assert list(mpd) == ['http://uso/a.ism/dash/media-video=400000-{}.dash'.format(time)
+                         for time in (0, 2000, 4001)]
+    ism, = scheme.get_timelines('smooth', base_url, manifest)
+    assert list(ism) == [
+        'http://uso/a.ism/QualityLevels(400000)/Fragments(video={})'.format(time)
+        for time in (0, 20000000, 40010000)]
+
+
+class LongHlsFragments(stand_in.StandInOrigin):
+    """Stand-in whose HLS fragments are twice as long as the DASH and Smooth ones."""
+
+    def get_manifest(self, path):
+        if path.endswith('.m3u8') and not path.endswith('.ism/.m3u8'):
+            name = path.rsplit('/', 1)[1][:-len('.m3u8')]
+            return stand_in.synthetic_media_m3u8(name, self.segments // 2, duration=4)
+        return super().get_manifest(path)
+
+
+def test_verify_synthesized_urls(origin):
+    assert create(origin, source_manifest='dash').verify_synthesized_urls(**FORMATS) == []
+    assert create(origin, source_manifest='smooth', dash_timescale=1000).verify_synthesized_urls(
+        **FORMATS) == []
+
+
+def test_verify_hls_numbering_mismatch(origin):
+    generator = create(origin, source_manifest='dash',
+                       uso_scheme=uso.UsoScheme(hls_start_number=0))
+    mismatches = generator.verify_synthesized_urls(**FORMATS)
+
+    assert [mismatch['format'] for mismatch in mismatches] == ['hls'] * 4
+    mismatch = mismatches[0]
+    assert mismatch['ism_url'] == origin.url + KEYS[1] + '/'
+    assert mismatch['synthesized'] == mismatch['fetched'] == 30
+    assert mismatch['index'] == 0
+    assert mismatch['synthesized_url'].endswith('-0.ts')
+    assert mismatch['fetched_url'].endswith('-1.ts')
+
+
+def test_verify_hls_fragment_length_mismatch():
+    with LongHlsFragments(segments=30) as server:
+        mismatches = create(server, source_manifest='smooth', dash_timescale=1000
+                            ).verify_synthesized_urls(**FORMATS)
+    assert {mismatch['format'] for mismatch in mismatches} == {'hls'}
+    assert all(mismatch['synthesized'] == 30 and mismatch['fetched'] == 15
+               for mismatch in mismatches)
+
+
+def test_verify_dash_timescale_mismatch(origin):
+    generator = create(origin, source_manifest='smooth', dash_timescale=10000)
+    mismatches = generator.verify_synthesized_urls(**FORMATS)
+    assert {mismatch['format'] for mismatch in mismatches} == {'dash'}
+    # index 0 is the initialization segment, index 1 starts at time 0 in both
+    mismatch = mismatches[0]
+    assert mismatch['index'] == 2
+    assert mismatch['synthesized_url'].endswith('-20000.dash')
+    assert mismatch['fetched_url'].endswith('-2000.dash')